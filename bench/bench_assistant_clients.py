@@ -0,0 +1,125 @@
+"""Measures what reusing the assistant's AI client saves per call, against a
+local stand-in for an OpenAI-compatible server that answers instantly. The
+cold path creates a new client per call, like prompt_assistant used to.
+
+    python -m bench.bench_assistant_clients [call_count]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from src.recipe_box import Component, Recipe, Step
+from src.recipe_box import assistant, telemetry
+from src.recipe_box.assistant import (
+    ResponseCache,
+    _to_pydantic_recipe,
+    prompt_assistant,
+)
+
+RECIPE = Recipe(
+    title="Pancakes",
+    components=[
+        Component(steps=[Step("Whisk.", ["1 cup flour", "1 egg"]), Step("Fry.")])
+    ],
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, delayed ACKs
+    # add ~40 ms to every response on a kept-alive connection.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        arguments = _to_pydantic_recipe(RECIPE).model_dump_json()
+        body = json.dumps(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "bench",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "tool_calls",
+                        "message": {
+                            "role": "assistant",
+                            "content": None,
+                            "tool_calls": [
+                                {
+                                    "id": "call_0",
+                                    "type": "function",
+                                    "function": {
+                                        "name": "PydanticRecipe",
+                                        "arguments": arguments,
+                                    },
+                                }
+                            ],
+                        },
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 1,
+                    "completion_tokens": 1,
+                    "total_tokens": 2,
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    cache_dir = tempfile.TemporaryDirectory()
+    assistant._response_cache = ResponseCache(Path(cache_dir.name) / "cache.db")
+    telemetry._telemetry_log = telemetry.TelemetryLog(
+        Path(cache_dir.name) / "telemetry.db"
+    )
+
+    def timed_calls(clear_cache: bool) -> list[float]:
+        timings = []
+        for i in range(call_count):
+            if clear_cache:
+                assistant._clients.clear()
+            start = time.perf_counter()
+            # A distinct prompt per call keeps the response cache out of it.
+            prompt = f"No changes ({clear_cache}, {i})."
+            prompt_assistant(RECIPE, prompt, "openai/bench", "bench-key")
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    cold = timed_calls(clear_cache=True)
+    warm = timed_calls(clear_cache=False)[1:]
+    server.shutdown()
+    assistant._response_cache.close()
+    telemetry._telemetry_log.close()
+    cache_dir.cleanup()
+
+    cold_ms = statistics.median(cold) * 1000
+    warm_ms = statistics.median(warm) * 1000
+    print(f"{call_count} calls to a local stand-in server")
+    print(f"new client per call, median:  {cold_ms:8.2f} ms")
+    print(f"cached client, median:        {warm_ms:8.2f} ms")
+    print(f"saved per call:               {cold_ms - warm_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compares the single-pass, memoized TypstRenderer._fancy against the
+previous chain of one str.replace and three regex substitutions, over the
+step and ingredient strings of a synthetic cookbook.
+
+    python -m bench.bench_fancy [recipe_count]
+"""
+
+import random
+import re
+import sys
+import timeit
+
+from src.recipe_box import Component, Recipe, Step
+from src.recipe_box.rendering import TypstRenderer
+
+_FRACTION_SLASH_REGEX = re.compile(r"(?<=\d)/(?=\d)")
+_MULTIPLICATION_SIGN_REGEX = re.compile(r"(?<=\d)x(?=\d)")
+_EN_DASH_REGEX = re.compile(r"(?<=\d)-(?=\d)")
+
+INGREDIENTS = [
+    "1/2 cup sugar",
+    "2 eggs",
+    "1 1/2 cups flour",
+    "1 tsp salt",
+    "3-4 cloves garlic",
+    "1 9x13 pan",
+    "2 tbsp olive oil",
+    "1 can crushed tomatoes",
+]
+STEPS = [
+    "Preheat the oven to 350°F.",
+    "Whisk the eggs and sugar until pale, 3-4 minutes.",
+    "Fold in the flour in 2 additions.",
+    "Pour into a 9x13 pan and bake 25-30 minutes.",
+    "Let cool completely before slicing.",
+]
+
+
+def fancy_sequential(text: str | None) -> str:
+    if not text or not text.strip():
+        return ""
+    processed_text = text.replace("°F", "\u202f°F")
+    processed_text = _FRACTION_SLASH_REGEX.sub("\u2044", processed_text)
+    processed_text = _MULTIPLICATION_SIGN_REGEX.sub("\u00d7", processed_text)
+    return _EN_DASH_REGEX.sub("\u2013", processed_text)
+
+
+def synthetic_cookbook(recipe_count: int, seed: int = 0) -> list[Recipe]:
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(recipe_count):
+        steps = [
+            Step(
+                text=f"{rng.choice(STEPS)} Step {j + 1}.",
+                ingredients=rng.sample(INGREDIENTS, rng.randint(0, 4)) or None,
+            )
+            for j in range(rng.randint(3, 10))
+        ]
+        recipes.append(
+            Recipe(
+                title=f"Recipe {i}",
+                metadata={"category": f"Category {i % 12}"},
+                components=[Component(steps=steps)],
+            )
+        )
+    return recipes
+
+
+def main():
+    recipe_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    recipes = synthetic_cookbook(recipe_count)
+    texts = [
+        text
+        for recipe in recipes
+        for component in recipe.components
+        for step in component.steps
+        for text in [step.text, *(step.ingredients or [])]
+    ]
+
+    def run_cached():
+        TypstRenderer._fancy.cache_clear()
+        for text in texts:
+            TypstRenderer._fancy(text)
+
+    def run_single_pass():
+        for text in texts:
+            TypstRenderer._fancy.__wrapped__(text)
+
+    def run_sequential():
+        for text in texts:
+            fancy_sequential(text)
+
+    sequential = min(timeit.repeat(run_sequential, number=1, repeat=5))
+    single_pass = min(timeit.repeat(run_single_pass, number=1, repeat=5))
+    cached = min(timeit.repeat(run_cached, number=1, repeat=5))
+    render = min(
+        timeit.repeat(lambda: TypstRenderer.render(recipes), number=1, repeat=3)
+    )
+
+    print(f"{recipe_count} recipes, {len(texts)} strings")
+    print(f"_fancy, sequential passes: {sequential * 1000:8.1f} ms")
+    print(f"_fancy, single pass:       {single_pass * 1000:8.1f} ms")
+    print(f"_fancy, memoized:          {cached * 1000:8.1f} ms")
+    print(f"saved per cookbook:        {(sequential - cached) * 1000:8.1f} ms")
+    print(f"full TypstRenderer.render: {render * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Times RecipeHighlighter on a large recipe: the first full highlight, a
+preference change that keeps the theme, a theme switch, and one edit.
+The previous highlighter, which rebuilt its formats and rehighlighted on
+every update and used chained `if` tests per block, is kept for comparison.
+
+    python -m bench.bench_highlight [line_count]
+"""
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QGuiApplication, QTextCursor, QTextDocument
+
+from bench.bench_fancy import synthetic_cookbook
+from src.recipe_box.editor import HighlightPalette, RecipeHighlighter
+from src.recipe_box.theme import DEFAULT_THEME
+
+
+class ChainedIfHighlighter(RecipeHighlighter):
+    def update_colors(self, colors):
+        self.colors = colors
+        self.palette = HighlightPalette(colors)
+        self.rehighlight()
+
+    def highlightBlock(self, text: str):
+        palette = self.palette
+        if palette is None or len(text) == 0:
+            return
+
+        is_delimiter = text.strip() == "---"
+        is_in_metadata = self.previousBlockState() == self._in_metadata_state
+        if is_in_metadata or is_delimiter:
+            self.setFormat(0, len(text), palette.metadata_format)
+            if is_delimiter:
+                if not is_in_metadata:
+                    self.setCurrentBlockState(self._in_metadata_state)
+            else:
+                self.setCurrentBlockState(self._in_metadata_state)
+            return
+
+        prefix = text[0]
+        if prefix in [self.ADDED_MARKER, self.DELETED_MARKER]:
+            fmt = None
+            prefix_fmt = None
+            if text.startswith(self.ADDED_MARKER):
+                fmt = palette.diff_added_format
+                prefix_fmt = palette.diff_added_prefix_format
+            elif text.startswith(self.DELETED_MARKER):
+                fmt = palette.diff_deleted_format
+                prefix_fmt = palette.diff_deleted_prefix_format
+            self.setFormat(0, len(text), fmt)
+            self.setFormat(1, 1, prefix_fmt)
+        elif prefix in ["=", ">", "+", "#", "-"]:
+            fmt = None
+            if prefix == "=":
+                fmt = palette.title_format
+            elif prefix == ">":
+                fmt = palette.notes_format
+            elif prefix == "+":
+                fmt = palette.component_format
+            elif prefix == "#":
+                fmt = palette.step_format
+            elif prefix == "-":
+                fmt = palette.ingredient_format
+            self.setFormat(0, len(text), fmt)
+            self.setFormat(0, 1, palette.prefix_format)
+
+        self.setCurrentBlockState(0)
+
+
+def large_recipe_text(line_count: int) -> str:
+    lines = []
+    for recipe in synthetic_cookbook(line_count // 8 + 1):
+        lines.extend(recipe.serialize().splitlines())
+        if len(lines) >= line_count:
+            break
+    return "\n".join(lines[:line_count])
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = QGuiApplication(sys.argv)  # noqa: F841
+    text = large_recipe_text(line_count)
+    light, dark = (theme["colors"] for theme in DEFAULT_THEME["themes"][:2])
+
+    print(f"{line_count} lines")
+    for highlighter_class in (ChainedIfHighlighter, RecipeHighlighter):
+        document = QTextDocument()
+        document.setPlainText(text)
+        highlighter = highlighter_class(document)
+        highlighter.update_colors(light)
+
+        def edit_one_line(document=document):
+            cursor = QTextCursor(document.findBlockByNumber(line_count // 2))
+            cursor.insertText("x")
+            cursor.deletePreviousChar()
+
+        def switch_theme(highlighter=highlighter):
+            highlighter.update_colors(dark)
+            highlighter.update_colors(light)
+
+        full = min(timeit.repeat(highlighter.rehighlight, number=1, repeat=5))
+        unchanged = min(
+            timeit.repeat(
+                lambda highlighter=highlighter: highlighter.update_colors(dict(light)),
+                number=1,
+                repeat=5,
+            )
+        )
+        switch = min(timeit.repeat(switch_theme, number=1, repeat=5)) / 2
+        edit = min(timeit.repeat(edit_one_line, number=1, repeat=5))
+
+        name = highlighter_class.__name__
+        for label, seconds in [
+            ("full highlight", full),
+            ("unchanged theme", unchanged),
+            ("theme switch", switch),
+            ("single-line edit", edit),
+        ]:
+            print(f"{f'{name}, {label}:':42} {seconds * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Estimates the prompt tokens the assistant sends for synthetic recipes:
+the old indented whole-recipe payload, the compact one, and the compact one
+focused on the component the request names.
+
+    python -m bench.bench_payload [recipe_count]
+"""
+
+import statistics
+import sys
+
+from bench.bench_fancy import synthetic_cookbook
+from src.recipe_box import Component, Recipe
+from src.recipe_box.assistant import prepare_request
+
+COMPONENT_NAMES = ["Dough", "Filling", "Sauce", "Topping"]
+
+
+def with_components(recipe: Recipe) -> Recipe:
+    # Splits the synthetic recipe's steps across named components, like a
+    # longer recipe would have.
+    steps = recipe.components[0].steps
+    size = -(-len(steps) // len(COMPONENT_NAMES))
+    return Recipe(
+        title=recipe.title,
+        metadata=recipe.metadata,
+        components=[
+            Component(name=name, steps=steps[i * size : (i + 1) * size])
+            for i, name in enumerate(COMPONENT_NAMES)
+        ],
+    )
+
+
+def main():
+    recipe_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    recipes = [with_components(recipe) for recipe in synthetic_cookbook(recipe_count)]
+
+    baseline = []
+    compact = []
+    focused = []
+    for recipe in recipes:
+        whole = prepare_request(recipe, "Convert to metric units.", focus=False)
+        baseline.append(whole.baseline_tokens)
+        compact.append(whole.prompt_tokens)
+        focused.append(prepare_request(recipe, "Make the sauce spicier.").prompt_tokens)
+
+    print(f"{recipe_count} recipes, estimated prompt tokens per request")
+    for label, tokens in [
+        ("indented, whole recipe", baseline),
+        ("compact, whole recipe", compact),
+        ("compact, named component only", focused),
+    ]:
+        saved = 1 - sum(tokens) / sum(baseline)
+        print(f"{label + ':':32} {statistics.median(tokens):8.0f} ({saved:6.1%} saved)")
+
+
+if __name__ == "__main__":
+    main()
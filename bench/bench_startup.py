@@ -0,0 +1,60 @@
+"""Measures import time at startup with `python -X importtime`, in fresh
+interpreters: the models alone, the main window module, and the main window
+module together with the assistant and importer it now loads on first use.
+
+    python -m bench.bench_startup [repeat]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = [
+    ("models only", "from src.recipe_box import Recipe"),
+    ("main window", "import src.recipe_box.main"),
+    (
+        "main window, assistant and importer",
+        "import src.recipe_box.main, src.recipe_box.assistant, src.recipe_box.jsonld",
+    ),
+]
+HEAVY_PACKAGES = ["PySide6", "instructor", "pydantic", "httpx", "bs4"]
+
+
+def import_times(statement: str) -> tuple[int, set[str]]:
+    """Returns the total import time in microseconds of running statement in
+    a fresh interpreter, and the names of the modules it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "QT_QPA_PLATFORM": "offscreen", "PYTHONPATH": "."},
+    )
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        # Nested imports are indented; the top-level ones add up to the total.
+        if not module.startswith("   "):
+            total += int(cumulative)
+        modules.add(module.strip())
+    return total, modules
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # What the interpreter imports before running anything, e.g. site.
+    baseline = statistics.median(import_times("pass")[0] for _ in range(repeat))
+    for label, statement in SCENARIOS:
+        runs = [import_times(statement) for _ in range(repeat)]
+        total = statistics.median(run[0] for run in runs) - baseline
+        loaded = [package for package in HEAVY_PACKAGES if package in runs[0][1]]
+        print(f"{label + ':':40} {total / 1000:8.1f} ms")
+        print(f"{'':40} loads {', '.join(loaded) or 'none of them'}")
+
+
+if __name__ == "__main__":
+    main()
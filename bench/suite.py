@@ -0,0 +1,210 @@
+"""Times the library's main operations on seeded synthetic libraries of
+several sizes and saves the results as JSON. Given an earlier results file,
+it also reports each case's change and exits non-zero on regressions.
+
+    python -m bench.suite [--sizes 1000 10000 100000] [--repeat 3]
+                          [--output bench_results.json]
+                          [--compare OLD.json] [--threshold 0.1]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QGuiApplication
+
+from bench.synthetic import synthetic_library
+from src.recipe_box import Recipe
+from src.recipe_box.archive import read_zip_archive, write_zip_archive
+from src.recipe_box.browser import RecipeTreeModel
+from src.recipe_box.library import Library, RecipeSummary
+from src.recipe_box.rendering import TypstRenderer
+
+# Recipes fetched one by one in the "library get" case.
+GET_COUNT = 1000
+
+
+class Case:
+    """A benchmark: setup builds its input untimed, then run is timed.
+    items is how many recipes one run handles, for the per-recipe time."""
+
+    def __init__(
+        self,
+        name: str,
+        setup: Callable[[], object],
+        run: Callable,
+        items: int | None = None,
+    ):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.items = items
+
+
+def build_cases(recipes: list[Recipe], filled: Library, workdir: Path) -> list[Case]:
+    """filled is an empty library, which the read cases use once the recipes
+    are added to it. The caller closes it."""
+    texts = [recipe.serialize() for recipe in recipes]
+    counter = iter(range(1_000_000))
+
+    def fresh_db() -> Library:
+        return Library(workdir / f"library-{next(counter)}.db")
+
+    ids = filled.add_recipes(recipes)
+    get_ids = random.Random(0).sample(ids, min(GET_COUNT, len(ids)))
+    archive = workdir / "library.zip"
+    write_zip_archive(archive, recipes)
+    summaries = [RecipeSummary.of(recipe) for recipe in filled.iter_recipes()]
+
+    def insert(library: Library):
+        library.add_recipes(recipes)
+        library.close()
+
+    def import_zip(library: Library):
+        read_zip_archive(library, archive)
+        library.close()
+
+    return [
+        Case("parse", lambda: None, lambda _: [Recipe.parse(t) for t in texts]),
+        Case("serialize", lambda: None, lambda _: [r.serialize() for r in recipes]),
+        Case("library insert", fresh_db, insert),
+        Case("library list", lambda: None, lambda _: filled.list_recipes()),
+        Case(
+            "library get",
+            lambda: None,
+            lambda _: [filled.get_recipe(i) for i in get_ids],
+            items=len(get_ids),
+        ),
+        Case(
+            "zip export",
+            lambda: None,
+            lambda _: write_zip_archive(workdir / "export.zip", recipes),
+        ),
+        Case("zip import", fresh_db, import_zip),
+        Case(
+            "typst source",
+            lambda: None,
+            lambda _: TypstRenderer.render_to(io.StringIO(), recipes, title="Bench"),
+        ),
+        Case("browser populate", RecipeTreeModel, lambda m: m.populate(summaries)),
+    ]
+
+
+def time_case(case: Case, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        state = case.setup()
+        start = time.perf_counter()
+        case.run(state)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """Prints each case's change against the baseline; returns whether any
+    got slower by more than the threshold."""
+    regressed = False
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'}:")
+    for size, cases in results["sizes"].items():
+        for name, result in cases.items():
+            old = baseline.get("sizes", {}).get(size, {}).get(name)
+            if old is None:
+                continue
+            change = result["min"] / old["min"] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"{size:>7} {name:18} {change:+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--compare", type=Path, help="earlier results to compare")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown counted as a regression (default: 0.1, i.e. 10%%)",
+    )
+    args = parser.parse_args()
+    # Read before the output is written, which may be the same file.
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    app = QGuiApplication(sys.argv)  # noqa: F841
+
+    results = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        recipes = synthetic_library(size, args.seed)
+        size_results = results["sizes"][str(size)] = {}
+        print(f"\n{size} recipes")
+        with tempfile.TemporaryDirectory() as workdir:
+            # Closed before the directory is removed, which fails on Windows
+            # while the database is open.
+            filled = Library(Path(workdir) / "filled.db")
+            try:
+                for case in build_cases(recipes, filled, Path(workdir)):
+                    timings = time_case(case, args.repeat)
+                    per_recipe = min(timings) / (case.items or size)
+                    size_results[case.name] = {
+                        "min": min(timings),
+                        "median": statistics.median(timings),
+                        "per_recipe": per_recipe,
+                    }
+                    print(
+                        f"  {case.name + ':':18} {min(timings) * 1000:10.1f} ms"
+                        f"  {per_recipe * 1e6:8.1f} µs/recipe"
+                    )
+            finally:
+                filled.close()
+
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nSaved to {args.output}")
+
+    if baseline is not None and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
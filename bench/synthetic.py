@@ -0,0 +1,103 @@
+"""A seeded generator of synthetic recipe libraries, varied enough to
+exercise every part of the recipe format: metadata, notes, several named
+components, and steps with and without ingredients.
+"""
+
+import random
+
+from src.recipe_box import Component, Recipe, Step
+
+CATEGORIES = [
+    "Baking",
+    "Breakfast",
+    "Desserts",
+    "Drinks",
+    "Mains",
+    "Salads",
+    "Sauces",
+    "Sides",
+    "Snacks",
+    "Soups",
+]
+CUISINES = ["French", "Italian", "Japanese", "Mexican", "Indian", "Thai"]
+DISHES = ["Soup", "Tart", "Stew", "Salad", "Bread", "Curry", "Cake", "Pasta"]
+ADJECTIVES = ["Smoky", "Roasted", "Spiced", "Creamy", "Crispy", "Braised"]
+COMPONENTS = ["Dough", "Filling", "Sauce", "Topping", "Dressing", "Garnish"]
+UNITS = ["cup", "cups", "tbsp", "tsp", "g", "ml", "cloves", "cans"]
+FOODS = [
+    "flour",
+    "sugar",
+    "butter",
+    "eggs",
+    "olive oil",
+    "garlic",
+    "crushed tomatoes",
+    "heavy cream",
+    "salt",
+    "black pepper",
+    "onions",
+    "carrots",
+]
+ACTIONS = [
+    "Preheat the oven to 350°F.",
+    "Whisk until pale, 3-4 minutes.",
+    "Fold in gently in 2 additions.",
+    "Pour into a 9x13 pan and bake 25-30 minutes.",
+    "Simmer uncovered until reduced by 1/2.",
+    "Season to taste and let rest 10 minutes.",
+    "Let cool completely before slicing.",
+]
+
+
+def _ingredient(rng: random.Random) -> str:
+    amount = rng.choice(["1", "2", "1/2", "1 1/2", "3-4", "250"])
+    return f"{amount} {rng.choice(UNITS)} {rng.choice(FOODS)}"
+
+
+def _steps(rng: random.Random, count: int) -> list[Step]:
+    return [
+        Step(
+            text=rng.choice(ACTIONS),
+            ingredients=[_ingredient(rng) for _ in range(rng.randint(0, 5))] or None,
+        )
+        for _ in range(count)
+    ]
+
+
+def synthetic_library(recipe_count: int, seed: int = 0) -> list[Recipe]:
+    """Returns recipe_count recipes; the same count and seed always give the
+    same recipes."""
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(recipe_count):
+        metadata = {
+            "category": rng.choice(CATEGORIES),
+            "cuisine": rng.choice(CUISINES),
+            "prep_time": str(rng.randint(5, 60)),
+            "cook_time": str(rng.randint(0, 180)),
+            "yields": f"{rng.randint(2, 12)} servings",
+        }
+        if rng.random() < 0.1:
+            metadata["draft"] = "true"
+        if rng.random() < 0.15:
+            metadata["favorite"] = "true"
+        if rng.random() < 0.3:
+            metadata["notes"] = "Keeps for 3 days in the fridge."
+
+        component_count = rng.choices([1, 2, 3], weights=[6, 3, 1])[0]
+        if component_count == 1:
+            components = [Component(steps=_steps(rng, rng.randint(3, 10)))]
+        else:
+            components = [
+                Component(name=name, steps=_steps(rng, rng.randint(2, 6)))
+                for name in rng.sample(COMPONENTS, component_count)
+            ]
+
+        recipes.append(
+            Recipe(
+                title=f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {i}",
+                metadata=metadata,
+                components=components,
+            )
+        )
+    return recipes
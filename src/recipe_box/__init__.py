@@ -1,11 +1,49 @@
+from __future__ import annotations
+
+import importlib
+
 from src.recipe_box.models import Recipe, Component, Step
-from src.recipe_box.library import Library
-from src.recipe_box.browser import RecipeTreeView, RecipeTreeModel, RecipeBrowser
-from src.recipe_box.editor import RecipeEditor
-from src.recipe_box.diff import DiffViewer
-from src.recipe_box.assistant import AssistantDialog
-from src.recipe_box.rendering import TypstRenderer
-
-# from src.recipe_box.theme import Theme
-from src.recipe_box.jsonld import recipe_from_url
-from src.recipe_box.preferences import Preferences
+
+# Everything else is imported on first access, so using the models doesn't
+# load Qt, instructor, httpx or bs4.
+_LAZY_ATTRIBUTES = {
+    "Library": "library",
+    "RecipeTreeView": "browser",
+    "RecipeTreeModel": "browser",
+    "RecipeBrowser": "browser",
+    "RecipeEditor": "editor",
+    "DiffViewer": "diff",
+    "AssistantDialog": "assistant",
+    "TypstRenderer": "rendering",
+    "recipe_from_url": "jsonld",
+    "Preferences": "preferences",
+}
+
+__all__ = [
+    "Recipe",
+    "Component",
+    "Step",
+    "Library",
+    "RecipeTreeView",
+    "RecipeTreeModel",
+    "RecipeBrowser",
+    "RecipeEditor",
+    "DiffViewer",
+    "AssistantDialog",
+    "TypstRenderer",
+    "recipe_from_url",
+    "Preferences",
+]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
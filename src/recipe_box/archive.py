@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import re
+import zipfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from src.recipe_box.library import Library
+from src.recipe_box.models import Recipe
+
+# Imported recipes are added to the library this many per transaction.
+IMPORT_BATCH_SIZE = 500
+
+
+def slugify(value: str) -> str:
+    value = re.sub(r"[^\w\s-]", "", value).strip().lower()
+    value = re.sub(r"[-\s]+", "-", value)
+    return value
+
+
+def write_zip_archive(filepath: str | Path, recipes: Iterable[Recipe]) -> int:
+    """Writes each recipe to the archive as a text file, returning how many
+    were written."""
+    count = 0
+    with zipfile.ZipFile(filepath, "w", zipfile.ZIP_DEFLATED) as zf:
+        for recipe in recipes:
+            if recipe.title:
+                filename = f"{slugify(recipe.title)}.txt"
+            else:
+                # Fallback for untitled recipes
+                filename = f"recipe-{recipe.id}.txt"
+            content = recipe.serialize()
+            zf.writestr(filename, content)
+            count += 1
+    return count
+
+
+def _iter_zip_recipes(filepath: str | Path, failures: list[str]) -> Iterator[Recipe]:
+    with zipfile.ZipFile(filepath, "r") as zf:
+        for filename in zf.namelist():
+            if not filename.lower().endswith(".txt"):
+                continue
+            try:
+                content = zf.read(filename).decode("utf-8")
+                if content.strip():
+                    yield Recipe.parse(content)
+            except Exception as e:
+                print(f"Warning: Skipping {filename}: {e}")
+                failures.append(filename)
+
+
+def read_zip_archive(library: Library, filepath: str | Path) -> tuple[int, int]:
+    """Adds the recipes in an archive written by write_zip_archive to the
+    library. Returns the number imported and the number of files that
+    couldn't be read."""
+    imported_count = 0
+    failures: list[str] = []
+    batch: list[Recipe] = []
+    for recipe in _iter_zip_recipes(filepath, failures):
+        batch.append(recipe)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            imported_count += len(library.add_recipes(batch))
+            batch.clear()
+    imported_count += len(library.add_recipes(batch))
+    return imported_count, len(failures)
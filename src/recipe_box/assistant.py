@@ -1,13 +1,27 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import replace
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from pathlib import Path
 
 import instructor
+from instructor.core.hooks import Hooks
 from pydantic import BaseModel
-from PySide6.QtCore import Signal, QSize
+from PySide6.QtCore import Qt, Signal, QSize
 from PySide6.QtWidgets import (
     QDialog,
+    QListWidget,
+    QListWidgetItem,
+    QSpinBox,
+    QSplitter,
     QVBoxLayout,
     QDialogButtonBox,
     QHBoxLayout,
@@ -22,7 +36,8 @@ from PySide6.QtWidgets import (
 from src.recipe_box.theme import MARGIN
 from src.recipe_box.models import Recipe, Step, Component
 from src.recipe_box.diff import DiffViewer
-from src.recipe_box.preferences import Preferences
+from src.recipe_box.preferences import AIProvider, Preferences, get_config_dir
+from src.recipe_box.telemetry import AssistantCall, record_call
 
 
 class PydanticStep(BaseModel):
@@ -40,11 +55,87 @@ class PydanticRecipe(BaseModel):
     components: list[PydanticComponent]
 
 
-def prompt_assistant(recipe: Recipe, prompt: str, model: str, api_key: str) -> Recipe:
-    client = instructor.from_provider(model, api_key=api_key)
+_clients: dict[tuple[str, str], instructor.Instructor] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(model: str, api_key: str) -> instructor.Instructor:
+    """Returns the client for a provider, creating it on first use. Reusing
+    it keeps the provider setup and the HTTP connection pool warm."""
+    with _clients_lock:
+        client = _clients.get((model, api_key))
+        if client is None:
+            client = instructor.from_provider(model, api_key=api_key)
+            _clients[(model, api_key)] = client
+        return client
+
+
+def prune_clients(providers: Iterable[AIProvider]):
+    """Drops cached clients for providers that are no longer configured."""
+    configured = {(provider.model, provider.api_key) for provider in providers}
+    with _clients_lock:
+        for key in list(_clients):
+            if key not in configured:
+                del _clients[key]
+
+
+# Requests estimated above this many tokens are refused before sending.
+PROMPT_TOKEN_BUDGET = 32_000
+
+_TOKEN_REGEX = re.compile(r"\w+|[^\w\s]|\n\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    """A provider-independent estimate: one token per punctuation mark, line
+    break with its indentation, and word, plus one for every four characters
+    past a word's first four."""
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_REGEX.findall(text))
+
+
+@dataclass(frozen=True)
+class AssistantRequest:
+    messages: list[dict[str, str]]
+    pydantic_recipe: PydanticRecipe
+    # Indexes of the components sent, or None if the whole recipe was.
+    component_indexes: list[int] | None
+    prompt_tokens: int
+    # What the request would have cost as the whole recipe, indented.
+    baseline_tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.baseline_tokens - self.prompt_tokens
+
+
+_token_totals = {"requests": 0, "prompt_tokens": 0, "baseline_tokens": 0}
+_token_totals_lock = threading.Lock()
+
+
+def _record_tokens(request: AssistantRequest):
+    with _token_totals_lock:
+        _token_totals["requests"] += 1
+        _token_totals["prompt_tokens"] += request.prompt_tokens
+        _token_totals["baseline_tokens"] += request.baseline_tokens
+
+
+def token_savings() -> dict[str, int]:
+    """Estimated prompt tokens sent to providers this session, against what
+    the same requests would have cost as whole, indented recipes."""
+    with _token_totals_lock:
+        totals = dict(_token_totals)
+    totals["tokens_saved"] = totals["baseline_tokens"] - totals["prompt_tokens"]
+    return totals
+
+
+def _to_pydantic_recipe(
+    recipe: Recipe, component_indexes: list[int] | None = None
+) -> PydanticRecipe:
+    components = recipe.components
+    if component_indexes is not None:
+        components = [components[i] for i in component_indexes]
 
     pydantic_components = []
-    for component in recipe.components:
+    for component in components:
         pydantic_steps = [
             PydanticStep(text=step.text, ingredients=step.ingredients or [])
             for step in component.steps
@@ -53,32 +144,468 @@ def prompt_assistant(recipe: Recipe, prompt: str, model: str, api_key: str) -> R
             PydanticComponent(name=component.name, steps=pydantic_steps)
         )
 
-    pydantic_recipe = PydanticRecipe(title=recipe.title, components=pydantic_components)
+    return PydanticRecipe(title=recipe.title, components=pydantic_components)
 
-    user_message = f"""
+
+_INSTRUCTIONS = (
+    "Edit the recipe as requested, changing nothing else. "
+    "Return the whole recipe in the same JSON shape."
+)
+_FOCUSED_INSTRUCTIONS = (
+    "Edit the recipe as requested, changing nothing else. Only the components "
+    "relevant to the request are included; return just those, in order."
+)
+_BASELINE_MESSAGE = """
     You are a recipe editor. Modify this recipe based on the request below. Only make the specific changes requested - do not alter anything else.
 
     Request: {prompt}
 
     Recipe:
-    {pydantic_recipe.model_dump_json(indent=2)}
+    {recipe_json}
     """
 
-    updated_pydantic_recipe = client.chat.completions.create(
-        response_model=PydanticRecipe,
+
+def _relevant_components(recipe: Recipe, prompt: str) -> list[int] | None:
+    # A request that names components only needs those; anything else may
+    # touch the whole recipe.
+    if len(recipe.components) < 2:
+        return None
+    prompt = prompt.casefold()
+    indexes = [
+        i
+        for i, component in enumerate(recipe.components)
+        if component.name
+        and re.search(rf"\b{re.escape(component.name.casefold())}\b", prompt)
+    ]
+    return indexes or None
+
+
+def prepare_request(
+    recipe: Recipe, prompt: str, focus: bool = True
+) -> AssistantRequest:
+    """Builds the messages for a request in a compact form: unindented JSON,
+    short instructions and, with focus, only the components the prompt
+    names. Raises ValueError if the result is over PROMPT_TOKEN_BUDGET."""
+    component_indexes = _relevant_components(recipe, prompt) if focus else None
+    pydantic_recipe = _to_pydantic_recipe(recipe, component_indexes)
+    instructions = _INSTRUCTIONS if component_indexes is None else _FOCUSED_INSTRUCTIONS
+    user_message = (
+        f"{instructions}\nRequest: {prompt}\n"
+        f"Recipe: {pydantic_recipe.model_dump_json()}"
+    )
+    prompt_tokens = estimate_tokens(user_message)
+    if prompt_tokens > PROMPT_TOKEN_BUDGET:
+        raise ValueError(
+            f"The recipe is too long for the assistant (about {prompt_tokens} "
+            f"tokens, the limit is {PROMPT_TOKEN_BUDGET})."
+        )
+
+    baseline_message = _BASELINE_MESSAGE.format(
+        prompt=prompt,
+        recipe_json=(
+            pydantic_recipe
+            if component_indexes is None
+            else _to_pydantic_recipe(recipe)
+        ).model_dump_json(indent=2),
+    )
+    return AssistantRequest(
         messages=[{"role": "user", "content": user_message}],
+        pydantic_recipe=pydantic_recipe,
+        component_indexes=component_indexes,
+        prompt_tokens=prompt_tokens,
+        baseline_tokens=estimate_tokens(baseline_message),
     )
 
-    new_title = updated_pydantic_recipe.title
+
+def _merge_components(
+    recipe: Recipe,
+    component_indexes: list[int] | None,
+    components: list[Component],
+    partial: bool = False,
+) -> list[Component]:
+    """Puts the components returned for a focused request back in place.
+    While streaming, components that haven't arrived keep their original."""
+    if component_indexes is None:
+        if partial:
+            return components + recipe.components[len(components) :]
+        return components
+
+    merged = list(recipe.components)
+    if partial or len(components) == len(component_indexes):
+        for index, component in zip(component_indexes, components):
+            merged[index] = component
+        return merged
+
+    # The assistant split or merged components; replace them as a block.
+    for index in reversed(component_indexes):
+        del merged[index]
+    merged[component_indexes[0] : component_indexes[0]] = components
+    return merged
+
+
+def _from_pydantic_recipe(recipe: Recipe, updated: PydanticRecipe) -> Recipe:
+    # Partial responses leave fields that haven't arrived yet as None.
     new_components = []
-    for p_component in updated_pydantic_recipe.components:
+    for p_component in updated.components or []:
         new_steps = [
             Step(text=p_step.text, ingredients=p_step.ingredients or None)
-            for p_step in p_component.steps
+            for p_step in p_component.steps or []
+            if p_step.text
         ]
         new_components.append(Component(name=p_component.name, steps=new_steps))
 
-    return replace(recipe, title=new_title, components=new_components)
+    return replace(
+        recipe, title=updated.title or recipe.title, components=new_components
+    )
+
+
+class ResponseCache:
+    """Persists assistant responses, so repeating a request returns at once
+    instead of waiting on and paying for the provider again. Entries expire
+    after ttl seconds, and the least recently used are evicted beyond
+    max_entries."""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        ttl: float = 7 * 24 * 60 * 60,
+        max_entries: int = 1000,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        db_path = Path(db_path).expanduser()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Batch requests use the cache from several worker threads.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                "response TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key(model: str, prompt: str, pydantic_recipe: PydanticRecipe) -> str:
+        request = json.dumps([model, prompt, pydantic_recipe.model_dump_json()])
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> PydanticRecipe | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET used = ? WHERE key = ?", (now, key)
+            )
+        try:
+            return PydanticRecipe.model_validate_json(row[0])
+        except ValueError:
+            return None
+
+    def put(self, key: str, response: PydanticRecipe):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response.model_dump_json(), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE created <= ?", (now - self.ttl,)
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache: ResponseCache | None = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(get_config_dir() / "assistant_cache.db")
+        return _response_cache
+
+
+def _cached_response(key: str) -> PydanticRecipe | None:
+    try:
+        return get_response_cache().get(key)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not read the assistant cache: {e}")
+        return None
+
+
+def _cache_response(key: str, response: PydanticRecipe):
+    try:
+        get_response_cache().put(key, response)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not write the assistant cache: {e}")
+
+
+def clear_response_cache() -> bool:
+    """Forgets every cached response; returns whether that worked."""
+    try:
+        get_response_cache().clear()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not clear the assistant cache: {e}")
+        return False
+    return True
+
+
+def _apply_response(
+    recipe: Recipe,
+    request: AssistantRequest,
+    response: PydanticRecipe,
+    partial: bool = False,
+) -> Recipe:
+    updated = _from_pydantic_recipe(recipe, response)
+    components = updated.components[:-1] if partial else updated.components
+    return replace(
+        updated,
+        title=updated.title if not partial or response.components else recipe.title,
+        components=_merge_components(
+            recipe, request.component_indexes, components, partial
+        ),
+    )
+
+
+def _telemetry_hooks(call: AssistantCall) -> Hooks:
+    def on_attempt(*args, **kwargs):
+        call.attempts += 1
+
+    def on_response(response):
+        # create_partial passes the stream here, which has no usage; streamed
+        # calls go without completion token counts.
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            call.usage_prompt_tokens = getattr(usage, "prompt_tokens", None)
+            call.usage_completion_tokens = getattr(usage, "completion_tokens", None)
+
+    hooks = Hooks()
+    hooks.on("completion:kwargs", on_attempt)
+    hooks.on("completion:response", on_response)
+    return hooks
+
+
+def prompt_assistant(
+    recipe: Recipe,
+    prompt: str,
+    model: str,
+    api_key: str,
+    focus: bool = True,
+    use_cache: bool = True,
+) -> Recipe:
+    """Applies the prompt to the recipe. A cached response to the same
+    request is returned unless use_cache is False; the new response then
+    replaces it."""
+    request = prepare_request(recipe, prompt, focus)
+    call = AssistantCall(model=model, prompt_tokens=request.prompt_tokens)
+    start = time.perf_counter()
+    cache_key = ResponseCache.key(model, prompt, request.pydantic_recipe)
+    if use_cache and (cached := _cached_response(cache_key)) is not None:
+        call.cached = True
+        record_call(call)
+        return _apply_response(recipe, request, cached)
+
+    client = get_client(model, api_key)
+    call.client_setup = time.perf_counter() - start
+    _record_tokens(request)
+
+    start = time.perf_counter()
+    try:
+        updated_pydantic_recipe = client.chat.completions.create(
+            response_model=PydanticRecipe,
+            messages=request.messages,
+            hooks=_telemetry_hooks(call),
+        )
+    except Exception as e:
+        call.error = str(e)
+        raise
+    finally:
+        call.request = time.perf_counter() - start
+        record_call(call)
+
+    _cache_response(cache_key, updated_pydantic_recipe)
+    return _apply_response(recipe, request, updated_pydantic_recipe)
+
+
+def stream_assistant(
+    recipe: Recipe,
+    prompt: str,
+    model: str,
+    api_key: str,
+    focus: bool = True,
+    call: AssistantCall | None = None,
+    use_cache: bool = True,
+) -> Iterator[Recipe]:
+    """Like prompt_assistant, but yields the recipe as it streams in. Each
+    yield has the components that are complete so far followed by the rest
+    of the original recipe; the last yield is the finished result.
+
+    Timings are recorded when the stream ends, unless a call is passed in;
+    then it is filled in for the caller to add to and record."""
+    request = prepare_request(recipe, prompt, focus)
+    record = call is None
+    if call is None:
+        call = AssistantCall(model=model)
+    call.streamed = True
+    call.prompt_tokens = request.prompt_tokens
+    start = time.perf_counter()
+    cache_key = ResponseCache.key(model, prompt, request.pydantic_recipe)
+    if use_cache and (cached := _cached_response(cache_key)) is not None:
+        call.cached = True
+        if record:
+            record_call(call)
+        yield _apply_response(recipe, request, cached)
+        return
+
+    client = get_client(model, api_key)
+    call.client_setup = time.perf_counter() - start
+    _record_tokens(request)
+
+    start = time.perf_counter()
+    partial_recipe = None
+    try:
+        stream = client.chat.completions.create_partial(
+            response_model=PydanticRecipe,
+            messages=request.messages,
+            hooks=_telemetry_hooks(call),
+        )
+        try:
+            for partial_recipe in stream:
+                if call.first_response is None:
+                    call.first_response = time.perf_counter() - start
+                # The last component may still be streaming; the ones before
+                # it are final.
+                yield _apply_response(recipe, request, partial_recipe, partial=True)
+        finally:
+            stream.close()
+    except Exception as e:
+        call.error = str(e)
+        raise
+    finally:
+        call.request = time.perf_counter() - start
+        if record:
+            record_call(call)
+
+    if partial_recipe is None:
+        raise RuntimeError("The assistant returned an empty response.")
+    # Only a stream that ran to completion, into a valid recipe, is cached.
+    try:
+        final_recipe = PydanticRecipe.model_validate(partial_recipe.model_dump())
+    except ValueError:
+        final_recipe = None
+    if final_recipe is not None:
+        _cache_response(cache_key, final_recipe)
+    yield _apply_response(recipe, request, partial_recipe)
+
+
+class RateLimiter:
+    """Spaces out calls so no more than requests_per_minute start in any
+    minute, across all threads sharing the limiter."""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+        # The latest slot a caller started in, and the slots of callers
+        # still waiting for theirs.
+        self._last_used = float("-inf")
+        self._waiting: set[float] = set()
+        self._lock = threading.Lock()
+
+    def wait(self, cancel_event: threading.Event | None = None):
+        """Blocks until the caller may start a request. A wait that's
+        cancelled gives its slot back, so the limiter shared with later
+        batches isn't pushed back by requests nobody sent."""
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            if slot <= now:
+                self._last_used = slot
+                return
+            self._waiting.add(slot)
+
+        if cancel_event is None:
+            time.sleep(slot - now)
+            cancelled = False
+        else:
+            cancelled = cancel_event.wait(slot - now)
+
+        with self._lock:
+            self._waiting.discard(slot)
+            if not cancelled:
+                self._last_used = max(self._last_used, slot)
+                return
+            # Later callers still waiting keep their slots; new ones follow
+            # the last slot that's taken.
+            self._next_slot = max([self._last_used, *self._waiting]) + self.interval
+
+
+_rate_limiters: dict[tuple[str, str, int], RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: AIProvider) -> RateLimiter | None:
+    if not provider.requests_per_minute:
+        return None
+    key = (provider.model, provider.api_key, provider.requests_per_minute)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(provider.requests_per_minute)
+        return _rate_limiters[key]
+
+
+def prompt_assistant_batch(
+    recipes: Iterable[Recipe],
+    prompt: str,
+    provider: AIProvider,
+    max_workers: int = 4,
+    cancel_event: threading.Event | None = None,
+) -> Iterator[tuple[Recipe, Recipe | Exception]]:
+    """Applies one prompt to many recipes, with at most max_workers requests
+    in flight and the provider's rate limit respected. Yields each original
+    recipe with its result, or the error it failed with, as they finish."""
+    cancel_event = cancel_event or threading.Event()
+    rate_limiter = get_rate_limiter(provider)
+
+    def run(recipe: Recipe) -> Recipe:
+        if rate_limiter is not None:
+            rate_limiter.wait(cancel_event)
+        if cancel_event.is_set():
+            raise RuntimeError("Cancelled.")
+        return prompt_assistant(recipe, prompt, provider.model, provider.api_key)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(run, recipe): recipe for recipe in recipes}
+        for future in as_completed(futures):
+            if cancel_event.is_set():
+                return
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 class AssistantDialog(QDialog):
@@ -92,6 +619,9 @@ class AssistantDialog(QDialog):
         self.original_text = original_text
         self.modified_text = self.original_text
         self.prefs = Preferences.instance()
+        self._cancel_event: threading.Event | None = None
+        self._streamed_text: str | None = None
+        self._stream_refresh: asyncio.Future | None = None
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
@@ -107,8 +637,14 @@ class AssistantDialog(QDialog):
         self.update_button.setSizePolicy(
             QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred
         )
+        # Asks the provider again rather than reusing a cached answer.
+        self.regenerate_button = QPushButton("Regenerate")
+        self.regenerate_button.setSizePolicy(
+            QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred
+        )
         prompt_layout.addWidget(self.prompt_input)
         prompt_layout.addWidget(self.update_button)
+        prompt_layout.addWidget(self.regenerate_button)
         main_layout.addLayout(prompt_layout)
 
         self.diff_viewer = DiffViewer(self.original_text, self.modified_text)
@@ -129,14 +665,26 @@ class AssistantDialog(QDialog):
         bottom_layout.addWidget(self.button_box)
         main_layout.addLayout(bottom_layout)
 
-        self.update_button.clicked.connect(self.run_assistant_update)
+        self.update_button.clicked.connect(lambda: self.run_assistant_update())
+        self.regenerate_button.clicked.connect(
+            lambda: self.run_assistant_update(use_cache=False)
+        )
         self.button_box.accepted.connect(self.accept_and_emit)
         self.button_box.rejected.connect(self.reject)
 
-    def run_assistant_update(self):
-        asyncio.create_task(self._run_assistant_update_async())
+    def run_assistant_update(self, use_cache: bool = True):
+        if self._cancel_event is not None:
+            self.cancel_assistant_update()
+            return
+        asyncio.create_task(self._run_assistant_update_async(use_cache))
+
+    def cancel_assistant_update(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.update_button.setEnabled(False)
+            self.update_button.setText("Stopping...")
 
-    async def _run_assistant_update_async(self):
+    async def _run_assistant_update_async(self, use_cache: bool = True):
         user_prompt = self.prompt_input.toPlainText().strip()
         if not user_prompt:
             return
@@ -162,27 +710,84 @@ class AssistantDialog(QDialog):
             return
 
         self._set_controls_enabled(False)
-        self.update_button.setText("Updating...")
+        self.update_button.setEnabled(True)
+        self.update_button.setText("Stop")
+        cancel_event = threading.Event()
+        self._cancel_event = cancel_event
+        loop = asyncio.get_running_loop()
+        call = AssistantCall(model=model)
+
+        def consume_stream() -> Recipe | None:
+            # Runs on a worker thread; partial results are handed to the
+            # event loop, and a cancel is noticed between streamed chunks.
+            result = None
+            stream = stream_assistant(
+                recipe, user_prompt, model, api_key, call=call, use_cache=use_cache
+            )
+            try:
+                for result in stream:
+                    if cancel_event.is_set():
+                        return None
+                    loop.call_soon_threadsafe(self._show_streamed, result)
+            finally:
+                stream.close()
+            return result
 
         try:
             recipe = Recipe.parse(self.original_text)
-            modified_recipe = await asyncio.to_thread(
-                prompt_assistant, recipe, user_prompt, model, api_key
-            )
+            modified_recipe = await asyncio.to_thread(consume_stream)
+            self._streamed_text = None
+            if self._stream_refresh is not None:
+                await self._stream_refresh
+            if modified_recipe is None:
+                await self.diff_viewer.update_texts(
+                    self.original_text, self.modified_text
+                )
+                return
             self.modified_text = modified_recipe.serialize()
-            self.diff_viewer.set_texts(self.original_text, self.modified_text)
+            start = time.perf_counter()
+            await self.diff_viewer.update_texts(self.original_text, self.modified_text)
+            call.diff_render = time.perf_counter() - start
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An unexpected error occurred:\n{e}")
             print(f"An error occurred: {e}")
             self.modified_text = self.original_text
             self.diff_viewer.set_texts(self.original_text, self.original_text)
         finally:
+            # Requests that never got as far as the provider aren't recorded.
+            if call.cached or call.client_setup is not None:
+                record_call(call)
+            self._cancel_event = None
+            self._streamed_text = None
             self._set_controls_enabled(True)
             self.update_button.setText("Update")
 
+    def _show_streamed(self, recipe: Recipe):
+        if self._cancel_event is None or self._cancel_event.is_set():
+            return
+        self._streamed_text = recipe.serialize()
+        if self._stream_refresh is None:
+            self._stream_refresh = asyncio.ensure_future(self._refresh_streamed_diff())
+
+    async def _refresh_streamed_diff(self):
+        # Diffs only the newest partial result; any that arrive while a diff
+        # is being computed are skipped.
+        shown_text = None
+        try:
+            while self._streamed_text is not None and self._streamed_text != shown_text:
+                shown_text = self._streamed_text
+                await self.diff_viewer.update_texts(self.original_text, shown_text)
+        finally:
+            self._stream_refresh = None
+
+    def reject(self):
+        self.cancel_assistant_update()
+        super().reject()
+
     def _set_controls_enabled(self, enabled: bool):
         self.prompt_input.setEnabled(enabled)
         self.update_button.setEnabled(enabled)
+        self.regenerate_button.setEnabled(enabled)
         self.diff_viewer.setEnabled(enabled)
         self.button_box.setEnabled(enabled)
         self.provider_combo.setEnabled(enabled)
@@ -190,3 +795,184 @@ class AssistantDialog(QDialog):
     def accept_and_emit(self):
         self.accepted_with_text.emit(self.modified_text)
         self.accept()
+
+
+class BatchAssistantDialog(QDialog):
+    """Applies one prompt to many recipes, then lets the user review each
+    diff and choose which results to keep."""
+
+    accepted_recipes = Signal(list)
+
+    def __init__(self, recipes: list[Recipe], parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Batch AI Assistant")
+        self.resize(QSize(1000, 700))
+
+        self.recipes = recipes
+        self.results: dict[int, Recipe] = {}
+        self.prefs = Preferences.instance()
+        self._cancel_event: threading.Event | None = None
+
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
+        main_layout.setSpacing(MARGIN)
+
+        prompt_layout = QHBoxLayout()
+        self.prompt_input = QTextEdit()
+        self.prompt_input.setPlaceholderText(
+            f"Enter instructions to apply to {len(recipes)} recipes, e.g., 'convert to metric'."
+        )
+        self.prompt_input.setFixedHeight(60)
+        self.run_button = QPushButton("Run")
+        self.run_button.setSizePolicy(
+            QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred
+        )
+        prompt_layout.addWidget(self.prompt_input)
+        prompt_layout.addWidget(self.run_button)
+        main_layout.addLayout(prompt_layout)
+
+        splitter = QSplitter()
+        self.recipe_list = QListWidget()
+        self._populate_list()
+        self.diff_viewer = DiffViewer()
+        splitter.addWidget(self.recipe_list)
+        splitter.addWidget(self.diff_viewer)
+        splitter.setSizes([300, 700])
+        main_layout.addWidget(splitter)
+
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addWidget(QLabel("Provider:"))
+        self.provider_combo = QComboBox()
+        for provider in self.prefs.data.ai_providers:
+            if provider.model:
+                self.provider_combo.addItem(provider.model, userData=provider)
+        bottom_layout.addWidget(self.provider_combo)
+        bottom_layout.addWidget(QLabel("Parallel requests:"))
+        self.concurrency_spinbox = QSpinBox()
+        self.concurrency_spinbox.setRange(1, 16)
+        self.concurrency_spinbox.setValue(4)
+        bottom_layout.addWidget(self.concurrency_spinbox)
+        self.progress_label = QLabel()
+        bottom_layout.addWidget(self.progress_label)
+        bottom_layout.addStretch()
+
+        self.button_box = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Apply
+            | QDialogButtonBox.StandardButton.Cancel
+        )
+        self.apply_button = self.button_box.button(
+            QDialogButtonBox.StandardButton.Apply
+        )
+        self.apply_button.setEnabled(False)
+        bottom_layout.addWidget(self.button_box)
+        main_layout.addLayout(bottom_layout)
+
+        self.run_button.clicked.connect(self.run_batch)
+        self.recipe_list.currentRowChanged.connect(self.show_diff)
+        self.apply_button.clicked.connect(self.accept_and_emit)
+        self.button_box.rejected.connect(self.reject)
+
+    def run_batch(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.run_button.setEnabled(False)
+            self.run_button.setText("Stopping...")
+            return
+        asyncio.create_task(self._run_batch_async())
+
+    async def _run_batch_async(self):
+        user_prompt = self.prompt_input.toPlainText().strip()
+        if not user_prompt:
+            return
+
+        provider = self.provider_combo.currentData()
+        if provider is None or not provider.model or not provider.api_key:
+            QMessageBox.warning(
+                self,
+                "Provider Not Configured",
+                "Select a provider with a model and API key. Please check your preferences.",
+            )
+            return
+
+        self.results.clear()
+        self._populate_list()
+        self._update_progress()
+
+        cancel_event = threading.Event()
+        self._cancel_event = cancel_event
+        self.prompt_input.setEnabled(False)
+        self.provider_combo.setEnabled(False)
+        self.concurrency_spinbox.setEnabled(False)
+        self.apply_button.setEnabled(False)
+        self.run_button.setText("Stop")
+        loop = asyncio.get_running_loop()
+        rows = {id(recipe): row for row, recipe in enumerate(self.recipes)}
+        max_workers = self.concurrency_spinbox.value()
+
+        def consume():
+            for recipe, result in prompt_assistant_batch(
+                self.recipes, user_prompt, provider, max_workers, cancel_event
+            ):
+                loop.call_soon_threadsafe(self._show_result, rows[id(recipe)], result)
+
+        try:
+            await asyncio.to_thread(consume)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"An unexpected error occurred:\n{e}")
+        finally:
+            self._cancel_event = None
+            self.prompt_input.setEnabled(True)
+            self.provider_combo.setEnabled(True)
+            self.concurrency_spinbox.setEnabled(True)
+            self.run_button.setEnabled(True)
+            self.run_button.setText("Run")
+            self.apply_button.setEnabled(bool(self.results))
+
+    def _populate_list(self):
+        self.recipe_list.clear()
+        for recipe in self.recipes:
+            self.recipe_list.addItem(QListWidgetItem(recipe.title))
+
+    def _show_result(self, row: int, result: Recipe | Exception):
+        item = self.recipe_list.item(row)
+        original = self.recipes[row]
+        if isinstance(result, Exception):
+            item.setText(f"{original.title} (failed: {result})")
+        elif result.serialize() == original.serialize():
+            item.setText(f"{original.title} (unchanged)")
+        else:
+            self.results[row] = result
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+        self._update_progress()
+        if row == self.recipe_list.currentRow():
+            self.show_diff(row)
+
+    def _update_progress(self):
+        self.progress_label.setText(
+            f"{len(self.results)} of {len(self.recipes)} changed"
+        )
+
+    def show_diff(self, row: int):
+        if row < 0:
+            return
+        original_text = self.recipes[row].serialize()
+        result = self.results.get(row)
+        modified_text = result.serialize() if result else original_text
+        asyncio.ensure_future(
+            self.diff_viewer.update_texts(original_text, modified_text)
+        )
+
+    def accept_and_emit(self):
+        accepted = [
+            result
+            for row, result in sorted(self.results.items())
+            if self.recipe_list.item(row).checkState() == Qt.CheckState.Checked
+        ]
+        self.accepted_recipes.emit(accepted)
+        self.accept()
+
+    def reject(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        super().reject()
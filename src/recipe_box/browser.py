@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import bisect
+from collections.abc import Iterable
+
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QStandardItem, QStandardItemModel, QBrush
 from PySide6.QtWidgets import (
@@ -10,6 +13,7 @@ from PySide6.QtWidgets import (
 )
 
 from src.recipe_box import Recipe
+from src.recipe_box.library import RecipeSummary
 from src.recipe_box.theme import MARGIN
 
 
@@ -22,18 +26,41 @@ class RecipeTreeView(QTreeView):
 class RecipeTreeModel(QStandardItemModel):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._category_names: list[str] = []
+        # Per category, the sort keys of its recipe rows, in row order.
+        self._sort_keys: dict[str, list[tuple[bool, str]]] = {}
 
-    def populate(self, recipes: list[Recipe]):
+    def populate(self, recipes: Iterable[Recipe | RecipeSummary]):
         self.clear()
+        self._category_names.clear()
+        self._sort_keys.clear()
+        self.add_recipes(recipes)
+
+    def add_recipes(
+        self, recipes: Iterable[Recipe | RecipeSummary]
+    ) -> list[QStandardItem]:
+        """Inserts recipes into their categories in sorted order, creating
+        categories as needed. Returns the category items that were created."""
         root_node = self.invisibleRootItem()
         categories = {}
         for r in recipes:
             categories.setdefault(r.category, []).append(r)
+
+        new_category_items = []
         for category_name in sorted(categories.keys()):
-            category_item = QStandardItem(category_name)
-            category_item.setEditable(False)
-            category_item.setSelectable(False)
-            root_node.appendRow(category_item)
+            row = bisect.bisect_left(self._category_names, category_name)
+            if category_name in self._sort_keys:
+                category_item = root_node.child(row)
+            else:
+                category_item = QStandardItem(category_name)
+                category_item.setEditable(False)
+                category_item.setSelectable(False)
+                self._category_names.insert(row, category_name)
+                self._sort_keys[category_name] = []
+                root_node.insertRow(row, [category_item])
+                new_category_items.append(category_item)
+
+            sort_keys = self._sort_keys[category_name]
             for recipe in sorted(
                 categories[category_name], key=lambda r: (r.draft is not None, r.title)
             ):
@@ -49,7 +76,11 @@ class RecipeTreeModel(QStandardItemModel):
                     font.setBold(True)
                     recipe_item.setFont(font)
 
-                category_item.appendRow(recipe_item)
+                key = (recipe.draft is not None, recipe.title)
+                row = bisect.bisect_right(sort_keys, key)
+                sort_keys.insert(row, key)
+                category_item.insertRow(row, [recipe_item])
+        return new_category_items
 
     def find_item_by_id(self, recipe_id: int) -> QStandardItem | None:
         root = self.invisibleRootItem()
@@ -108,6 +139,14 @@ class RecipeBrowser(QWidget):
         self._tree_view.horizontalScrollBar().setValue(h_scroll_val)
         self._tree_view.selectionModel().blockSignals(False)
 
+    def add_recipes(self, recipes: Iterable[Recipe | RecipeSummary]):
+        """Adds recipes without rebuilding the tree, for filling it in as a
+        library loads."""
+        for category_item in self._tree_model.add_recipes(recipes):
+            self._tree_view.expand(category_item.index())
+        if self._filter_edit.text():
+            self._filter_recipes(self._filter_edit.text())
+
     def selected_recipe_id(self) -> int | None:
         current_index = self._tree_view.currentIndex()
         if not current_index.isValid():
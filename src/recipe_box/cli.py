@@ -0,0 +1,249 @@
+"""Library operations without the GUI, for scripts and scheduled jobs.
+
+    python -m src.recipe_box.cli [--db PATH] COMMAND ...
+
+Nothing here imports Qt; the URL importer's dependencies are only loaded
+by import-url.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import zipfile
+from collections import Counter
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+
+from src.recipe_box.archive import read_zip_archive, write_zip_archive
+from src.recipe_box.compiler import TypstCompiler
+from src.recipe_box.library import Library, get_db_path
+from src.recipe_box.models import Recipe
+from src.recipe_box.profiling import start_profiling
+
+
+def _error(message: str):
+    print(f"recipe-box: {message}", file=sys.stderr)
+
+
+def _filtered(library: Library, category: str | None) -> Callable[[], Iterable[Recipe]]:
+    def recipes() -> Iterable[Recipe]:
+        for recipe in library.iter_recipes():
+            if category is None or recipe.category == category:
+                yield recipe
+
+    return recipes
+
+
+def _import_zip(library: Library, args: argparse.Namespace) -> int:
+    failed_total = 0
+    for archive in args.archives:
+        try:
+            imported_count, failed_count = read_zip_archive(library, archive)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            _error(f"{archive}: {e}")
+            failed_total += 1
+            continue
+        failed_total += failed_count
+        summary = f"{archive}: imported {imported_count} recipes."
+        if failed_count:
+            summary += f" {failed_count} files failed to import."
+        print(summary)
+    return 1 if failed_total else 0
+
+
+def _export_zip(library: Library, args: argparse.Namespace) -> int:
+    count = write_zip_archive(args.archive, _filtered(library, args.category)())
+    print(f"Exported {count} recipes to {args.archive}.")
+    return 0
+
+
+def _import_url(library: Library, args: argparse.Namespace) -> int:
+    from src.recipe_box.jsonld import recipe_from_url
+
+    failed_count = 0
+    for url in args.urls:
+        try:
+            recipe = recipe_from_url(url)
+        except ValueError as e:
+            _error(f"{url}: {e}")
+            failed_count += 1
+            continue
+        recipe_id = library.add_recipe(recipe)
+        print(f"{recipe_id}\t{recipe.title}")
+    return 1 if failed_count else 0
+
+
+def _export_pdf(library: Library, args: argparse.Namespace) -> int:
+    if args.ids:
+        recipes = []
+        for recipe_id in args.ids:
+            recipe = library.get_recipe(recipe_id)
+            if recipe is None:
+                _error(f"No recipe with ID {recipe_id}.")
+                return 1
+            recipes.append(recipe)
+        recipe_count = len(recipes)
+
+        def recipe_source() -> Iterable[Recipe]:
+            return recipes
+
+    else:
+        recipe_source = _filtered(library, args.category)
+        recipe_count = sum(1 for _ in recipe_source())
+    if not recipe_count:
+        _error("There are no recipes to export.")
+        return 1
+
+    # A one-off compile gains nothing from starting a watcher. The workspace
+    # is kept next to the library, so unchanged recipes reuse their rendered
+    # fragments.
+    compiler = TypstCompiler(
+        typst_path=args.typst,
+        workspace=(args.db or get_db_path()).parent / "typst-cli",
+        watch=False,
+    )
+    try:
+        pdf_data = compiler.compile_recipes(
+            recipe_source, recipe_count, args.title, args.subtitle
+        )
+    except FileNotFoundError:
+        _error("Typst command not found. Please ensure it is in your system's PATH.")
+        return 1
+    except RuntimeError as e:
+        _error(str(e))
+        return 1
+    finally:
+        compiler.close()
+
+    try:
+        Path(args.output).write_bytes(pdf_data)
+    except OSError as e:
+        _error(f"Could not write {args.output}: {e}")
+        return 1
+    print(f"Exported {recipe_count} recipes to {args.output}.")
+    return 0
+
+
+def _search(library: Library, args: argparse.Namespace) -> int:
+    recipes = library.search_recipes(" ".join(args.query))
+    if args.category is not None:
+        recipes = (recipe for recipe in recipes if recipe.category == args.category)
+    if args.json:
+        json.dump(
+            [{"id": r.id, "title": r.title, "category": r.category} for r in recipes],
+            sys.stdout,
+            indent=2,
+        )
+        print()
+        return 0
+    for recipe in recipes:
+        print(f"{recipe.id}\t{recipe.title}\t{recipe.category}")
+    return 0
+
+
+def _stats(library: Library, args: argparse.Namespace) -> int:
+    categories = Counter()
+    totals = Counter()
+    for recipe in library.iter_recipes():
+        categories[recipe.category] += 1
+        totals["components"] += len(recipe.components)
+        for component in recipe.components:
+            totals["steps"] += len(component.steps)
+            totals["ingredients"] += sum(
+                len(step.ingredients or []) for step in component.steps
+            )
+
+    stats = {
+        "recipes": sum(categories.values()),
+        **totals,
+        "categories": dict(sorted(categories.items())),
+    }
+    if args.json:
+        json.dump(stats, sys.stdout, indent=2)
+        print()
+        return 0
+    for key in ("recipes", "components", "steps", "ingredients"):
+        print(f"{key.capitalize() + ':':13} {stats.get(key, 0)}")
+    print("Categories:")
+    for category, count in stats["categories"].items():
+        print(f"  {category}: {count}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="recipe-box", description="Manage a Recipe Box library."
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help=f"library database (default: {get_db_path()})",
+    )
+    parser.add_argument("--profile", action="store_true", help="print timings at exit")
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="also write a cProfile of the run to PATH",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("import-zip", help="import recipes from .zip files")
+    command.add_argument("archives", nargs="+", type=Path)
+    command.set_defaults(run=_import_zip)
+
+    command = commands.add_parser("export-zip", help="export recipes to a .zip file")
+    command.add_argument("archive", type=Path)
+    command.add_argument("--category", help="only export this category")
+    command.set_defaults(run=_export_zip)
+
+    command = commands.add_parser(
+        "import-url", help="import recipes from web pages with recipe JSON-LD"
+    )
+    command.add_argument("urls", nargs="+")
+    command.set_defaults(run=_import_url)
+
+    command = commands.add_parser("export-pdf", help="export recipes to a PDF")
+    command.add_argument("output", type=Path)
+    command.add_argument(
+        "--id",
+        dest="ids",
+        type=int,
+        action="append",
+        help="export this recipe; may be repeated (default: the whole library)",
+    )
+    command.add_argument("--category", help="only export this category")
+    command.add_argument("--title", help="cookbook title")
+    command.add_argument("--subtitle", help="cookbook subtitle")
+    command.add_argument("--typst", default="typst", help="typst executable")
+    command.set_defaults(run=_export_pdf)
+
+    command = commands.add_parser(
+        "search", help="list recipes containing all the given words"
+    )
+    command.add_argument("query", nargs="*")
+    command.add_argument("--category", help="only search this category")
+    command.add_argument("--json", action="store_true", help="print JSON")
+    command.set_defaults(run=_search)
+
+    command = commands.add_parser("stats", help="summarize the library")
+    command.add_argument("--json", action="store_true", help="print JSON")
+    command.set_defaults(run=_stats)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    start_profiling(args.profile, args.profile_output)
+    library = Library(args.db or get_db_path())
+    try:
+        return args.run(library, args)
+    finally:
+        library.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
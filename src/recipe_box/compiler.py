@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TextIO
+
+from src.recipe_box.models import Recipe
+from src.recipe_box.rendering import FragmentCache, TypstRenderer
+
+
+# Cookbooks at least this large are compiled as per-category chunks in
+# parallel and merged, rather than as one Typst document, when Typst can
+# embed the chunk PDFs.
+PARALLEL_COOKBOOK_THRESHOLD = 200
+
+
+class TypstCompiler:
+    """Compiles Typst sources through a long-lived `typst watch` process, so
+    fonts are discovered once and repeat compiles stay warm. Falls back to a
+    one-shot `typst compile` when the watcher can't be used, or when watch
+    is False, as suits a process that compiles only once."""
+
+    _ANSI_ESCAPE_REGEX = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+    _STATUS_REGEX = re.compile(r"compiled (successfully|with warnings|with errors)")
+
+    def __init__(
+        self,
+        typst_path: str = "typst",
+        workspace: str | Path | None = None,
+        startup_timeout: float = 30.0,
+        watch: bool = True,
+    ):
+        self.typst_path = typst_path
+        self.startup_timeout = startup_timeout
+        self._owns_workspace = workspace is None
+        self._workspace = Path(workspace).expanduser() if workspace else None
+        self._fragments: FragmentCache | None = None
+        self._watch_process: subprocess.Popen | None = None
+        self._processes: set[subprocess.Popen] = set()
+        self._processes_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._watch_supported = watch
+        self._last_digest: str | None = None
+        self._lock = threading.Lock()
+        self._status_changed = threading.Condition()
+        self._generation = 0
+        self._last_status: str | None = None
+        self._pdf_images_supported: bool | None = None
+
+    @property
+    def workspace(self) -> Path:
+        if self._workspace is None:
+            self._workspace = Path(tempfile.mkdtemp(prefix="recipe-box-typst-"))
+        self._workspace.mkdir(parents=True, exist_ok=True)
+        return self._workspace
+
+    @property
+    def fragments(self) -> FragmentCache:
+        # Fragments live inside the workspace, which is the Typst project
+        # root for every compile, so rendered sources can include them.
+        if self._fragments is None:
+            self._fragments = FragmentCache(
+                self.workspace / "fragments", root=self.workspace
+            )
+        return self._fragments
+
+    def compile(self, source: str) -> bytes:
+        return self.compile_with(lambda stream: stream.write(source))
+
+    def compile_with(self, write_source: Callable[[TextIO], object]) -> bytes:
+        """Compiles the source that `write_source` writes to the given text
+        stream, so large documents never need to be held in memory."""
+        with self._lock:
+            self._check_cancelled()
+            source_path = self.workspace / ".source.tmp"
+            with open(source_path, "w", encoding="utf-8") as f:
+                write_source(f)
+            # A cancel while the source was being written stops here.
+            self._check_cancelled()
+
+            if self._watch_supported and self._ensure_watcher():
+                pdf_data = self._compile_watched(source_path)
+                if pdf_data is not None:
+                    return pdf_data
+            self._check_cancelled()
+            return self._compile_once(source_path)
+
+    def compile_recipes(
+        self,
+        recipes: Callable[[], Iterable[Recipe]],
+        recipe_count: int,
+        title: str | None = None,
+        subtitle: str | None = None,
+    ) -> bytes:
+        """Compiles recipes into one document, as a parallel cookbook when
+        there are enough of them. `recipes` is called for each pass over the
+        recipes, so they can be streamed from a library."""
+        try:
+            if (
+                recipe_count >= PARALLEL_COOKBOOK_THRESHOLD
+                and self.supports_pdf_images()
+            ):
+                try:
+                    return self.compile_cookbook(
+                        recipes(), title=title, subtitle=subtitle
+                    )
+                except (RuntimeError, FileNotFoundError) as e:
+                    if self._cancelled.is_set():
+                        raise
+                    print(f"Warning: Parallel cookbook export failed, retrying: {e}")
+
+            return self.compile_with(
+                lambda stream: TypstRenderer.render_to(
+                    stream,
+                    recipes(),
+                    title=title,
+                    subtitle=subtitle,
+                    fragment_cache=self.fragments,
+                )
+            )
+        finally:
+            # This export's fragments are the most recently used, so only
+            # ones no recent export needed are dropped.
+            self.fragments.prune()
+
+    def compile_cookbook(
+        self,
+        recipes: Iterable[Recipe],
+        title: str | None = None,
+        subtitle: str | None = None,
+        chunk_size: int = 100,
+        max_workers: int | None = None,
+    ) -> bytes:
+        """Compiles a cookbook as independent chunks in parallel, then merges
+        the chunk PDFs into one document with a shared outline and page
+        numbers. Needs a Typst version that can embed PDF pages as images."""
+        with self._lock:
+            self._check_cancelled()
+            build_dir = self.workspace / "cookbook"
+            build_dir.mkdir(exist_ok=True)
+
+            def compile_chunk(name: str) -> list[int]:
+                pages_path = build_dir / f"{name}.json"
+                if pages_path.exists() and (build_dir / f"{name}.pdf").exists():
+                    return json.loads(pages_path.read_text(encoding="utf-8"))
+
+                source_name = f"{name}.typ"
+                self._run_typst(build_dir, "compile", source_name, f"{name}.pdf")
+                entry_pages = self._run_typst(
+                    build_dir,
+                    "query",
+                    source_name,
+                    "<cookbook-entry>",
+                    "--field",
+                    "value",
+                )
+                pages_path.write_text(entry_pages, encoding="utf-8")
+                return json.loads(entry_pages)
+
+            # Chunks are rendered one at a time and their sources written
+            # straight to disk, so neither the recipes nor the sources are
+            # all held in memory. Chunk PDFs are kept between exports, named
+            # by a hash of their source, so only chunks whose recipes changed
+            # are recompiled.
+            chunk_names: list[str] = []
+            chunk_entries: list[list[tuple[int, str, str | None]]] = []
+            futures: dict[str, Future[list[int]]] = {}
+            max_workers = max_workers or os.process_cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for chunk in TypstRenderer.split_cookbook(recipes, chunk_size):
+                    self._check_cancelled()
+                    source = TypstRenderer.render_chunk(chunk, self.fragments)
+                    name = (
+                        "chunk-"
+                        + hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+                    )
+                    chunk_names.append(name)
+                    chunk_entries.append(chunk.outline_entries())
+                    if name not in futures:
+                        (build_dir / f"{name}.typ").write_text(source, encoding="utf-8")
+                        futures[name] = executor.submit(compile_chunk, name)
+                chunk_entry_pages = [futures[name].result() for name in chunk_names]
+
+            for path in build_dir.glob("chunk-*"):
+                if path.stem not in futures:
+                    path.unlink(missing_ok=True)
+
+            self._check_cancelled()
+            merged_source = TypstRenderer.render_merged_cookbook(
+                chunk_entries,
+                chunk_entry_pages,
+                [f"{name}.pdf" for name in chunk_names],
+                title,
+                subtitle,
+            )
+            (build_dir / "cookbook.typ").write_text(merged_source, encoding="utf-8")
+            self._run_typst(build_dir, "compile", "cookbook.typ", "cookbook.pdf")
+            return (build_dir / "cookbook.pdf").read_bytes()
+
+    def supports_pdf_images(self) -> bool:
+        """Whether this Typst can embed PDF pages as images, which merging a
+        parallel cookbook needs. Checked once, with a compile of a blank page
+        and one that embeds it."""
+        with self._lock:
+            if self._pdf_images_supported is None:
+                probe_dir = self.workspace / "pdf-probe"
+                probe_dir.mkdir(exist_ok=True)
+                (probe_dir / "page.typ").write_text(
+                    "#set page(width: 1cm, height: 1cm)\n", encoding="utf-8"
+                )
+                (probe_dir / "embed.typ").write_text(
+                    '#image("page.pdf")\n', encoding="utf-8"
+                )
+                try:
+                    self._run_typst(probe_dir, "compile", "page.typ", "page.pdf")
+                    self._run_typst(probe_dir, "compile", "embed.typ", "embed.pdf")
+                except RuntimeError:
+                    # A cancelled probe says nothing about Typst.
+                    self._check_cancelled()
+                    self._pdf_images_supported = False
+                else:
+                    self._pdf_images_supported = True
+            return self._pdf_images_supported
+
+    def reset_cancel(self):
+        """Clears an earlier cancel. Call it before starting a job that
+        cancel() should be able to stop at any point."""
+        self._cancelled.clear()
+
+    def cancel(self):
+        # Called from other threads while a compile holds the lock, so only
+        # kill the processes here; the compile cleans up after itself.
+        self._cancelled.set()
+        with self._processes_lock:
+            processes = [self._watch_process, *self._processes]
+        for process in processes:
+            if process is not None and process.poll() is None:
+                process.kill()
+
+    def close(self):
+        with self._lock:
+            self._stop_watcher()
+            if self._owns_workspace and self._workspace is not None:
+                shutil.rmtree(self._workspace, ignore_errors=True)
+                self._workspace = None
+
+    def _ensure_watcher(self) -> bool:
+        if self._watch_process is not None and self._watch_process.poll() is None:
+            return True
+
+        source_path = self.workspace / "main.typ"
+        source_path.write_text("", encoding="utf-8")
+        self._last_digest = self._digest(source_path)
+        generation = self._current_generation()
+
+        self._watch_process = subprocess.Popen(
+            [self.typst_path, "watch", "--root", ".", source_path.name, "main.pdf"],
+            cwd=self.workspace,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        threading.Thread(
+            target=self._read_watch_output, args=(self._watch_process,), daemon=True
+        ).start()
+
+        # The initial compile proves the watcher speaks the status protocol
+        # we expect; otherwise stick to one-shot compiles for this session.
+        if not self._wait_for_status(generation, timeout=self.startup_timeout):
+            self._stop_watcher()
+            self._check_cancelled()
+            self._watch_supported = False
+            return False
+        return True
+
+    def _compile_watched(self, source_path: Path) -> bytes | None:
+        main_path = self.workspace / "main.typ"
+        pdf_path = self.workspace / "main.pdf"
+        digest = self._digest(source_path)
+        if digest == self._last_digest:
+            # Rewriting main.typ would make the watcher compile and report
+            # again, and a later compile could take that stale report as its
+            # own.
+            source_path.unlink()
+            with self._status_changed:
+                failed = self._last_status == "error"
+            return None if failed else pdf_path.read_bytes()
+
+        generation = self._current_generation()
+        source_path.replace(main_path)
+        self._last_digest = digest
+
+        if not self._wait_for_status(generation):
+            self._stop_watcher()
+            self._check_cancelled()
+            return None
+        with self._status_changed:
+            failed = self._last_status == "error"
+        if failed:
+            # The watcher's diagnostics are interleaved with status output;
+            # a one-shot compile reports the error cleanly.
+            return None
+        return pdf_path.read_bytes()
+
+    def _compile_once(self, source_path: Path) -> bytes:
+        if source_path.exists():
+            source_path = source_path.replace(self.workspace / "oneshot.typ")
+        else:
+            # The watcher already took the source as main.typ.
+            source_path = self.workspace / "main.typ"
+        pdf_path = self.workspace / "oneshot.pdf"
+        self._run_typst(
+            self.workspace, "compile", "--root", ".", source_path.name, pdf_path.name
+        )
+        return pdf_path.read_bytes()
+
+    def _run_typst(self, cwd: Path, *args: str) -> str:
+        self._check_cancelled()
+        process = subprocess.Popen(
+            [self.typst_path, *args],
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
+        with self._processes_lock:
+            self._processes.add(process)
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            with self._processes_lock:
+                self._processes.discard(process)
+
+        self._check_cancelled()
+        if process.returncode != 0:
+            raise RuntimeError(f"Typst error: {stderr}")
+        return stdout
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise RuntimeError("Typst compile was cancelled.")
+
+    def _read_watch_output(self, process: subprocess.Popen):
+        for line in process.stdout:
+            line = self._ANSI_ESCAPE_REGEX.sub("", line)
+            if match := self._STATUS_REGEX.search(line):
+                with self._status_changed:
+                    self._generation += 1
+                    self._last_status = (
+                        "error" if match.group(1) == "with errors" else "success"
+                    )
+                    self._status_changed.notify_all()
+        process.wait()
+        with self._status_changed:
+            self._status_changed.notify_all()
+
+    def _current_generation(self) -> int:
+        with self._status_changed:
+            return self._generation
+
+    def _wait_for_status(self, generation: int, timeout: float | None = None) -> bool:
+        process = self._watch_process
+        with self._status_changed:
+            self._status_changed.wait_for(
+                lambda: self._generation > generation or process.poll() is not None,
+                timeout=timeout,
+            )
+            return self._generation > generation
+
+    def _stop_watcher(self):
+        if self._watch_process is not None:
+            self._watch_process.kill()
+            self._watch_process.wait()
+            self._watch_process = None
+        self._last_digest = None
+
+    @staticmethod
+    def _digest(path: Path) -> str:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import bisect
 import difflib
+import functools
+import itertools
+import re
+from dataclasses import dataclass, field
 
 from PySide6.QtGui import QFont
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit
@@ -8,6 +14,13 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit
 from src.recipe_box.editor import RecipeHighlighter
 from src.recipe_box.preferences import Preferences
 
+# Gaps between diff anchors up to this many line pairs are matched exactly.
+_MAX_GAP_COMPARISONS = 10_000
+# Word-level diffs are skipped for line pairs with more word pairs than this,
+# or whose words are less alike than this ratio.
+_MAX_LINE_COMPARISONS = 40_000
+_MIN_LINE_SIMILARITY = 0.5
+
 
 class DiffViewer(QWidget):
     def __init__(self, text1: str = "", text2: str = ""):
@@ -17,6 +30,7 @@ class DiffViewer(QWidget):
         self.setWindowTitle("Diff Viewer")
         self.setGeometry(100, 100, 800, 800)
 
+        self._diff_generation = 0
         self.editor = QTextEdit()
         self.highlighter = RecipeHighlighter(self.editor.document())
 
@@ -42,10 +56,12 @@ class DiffViewer(QWidget):
         self.editor.setFont(font)
 
         colors = self.prefs.get_theme_colors()
-        self.editor.setStyleSheet(
-            f"QTextEdit {{ background-color: {colors['background']}; color: {colors['text']};}}"
-        )
-        self.highlighter.update_colors(colors)
+        # The colors are cached, so an unchanged theme needs no restyle.
+        if colors is not self.highlighter.colors:
+            self.editor.setStyleSheet(
+                f"QTextEdit {{ background-color: {colors['background']}; color: {colors['text']};}}"
+            )
+            self.highlighter.update_colors(colors)
 
     def setEnabled(self, enabled: bool) -> None:
         self.editor.setEnabled(enabled)
@@ -56,39 +72,259 @@ class DiffViewer(QWidget):
         self.populate_diff()
 
     def populate_diff(self):
+        self._diff_generation += 1
+        if not self.text2 or self.text1 == self.text2:
+            self._show_diff(RecipeDiff(self.text1))
+        else:
+            self._show_diff(diff_recipe_texts(self.text1, self.text2))
+
+    async def update_texts(self, text1: str, text2: str):
+        """Like set_texts, but diffs on a worker thread. If the texts change
+        again before the diff is done, its result is dropped."""
+        self.text1 = text1
+        self.text2 = text2
+        self._diff_generation += 1
+        generation = self._diff_generation
+        if not text2 or text1 == text2:
+            self._show_diff(RecipeDiff(text1))
+            return
+
+        diff = await asyncio.to_thread(diff_recipe_texts, text1, text2)
+        if generation == self._diff_generation:
+            self._show_diff(diff)
+
+    def _show_diff(self, diff: RecipeDiff):
         self.editor.blockSignals(True)
+        self.highlighter.changed_spans = diff.changed_spans
+        self.editor.setPlainText(diff.text)
+        self.editor.blockSignals(False)
 
-        if not self.text2 or self.text1 == self.text2:
-            self.editor.setText(self.text1)
+
+@dataclass(frozen=True)
+class RecipeDiff:
+    text: str
+    # Character spans that changed within a deleted or added line, keyed by
+    # line number. Lines without an entry changed as a whole.
+    changed_spans: dict[int, list[tuple[int, int]]] = field(default_factory=dict)
+
+
+class _DiffNode:
+    """A line of a recipe together with the lines that belong to it: the
+    steps of a component, or the ingredients of a step."""
+
+    __slots__ = ("line", "children", "_key")
+
+    def __init__(self, line: str):
+        self.line = line
+        self.children: list[_DiffNode] = []
+        self._key: str | None = None
+
+    @property
+    def key(self) -> str:
+        # The node's full text, so equal keys mean equal subtrees.
+        if self._key is None:
+            self._key = "\n".join(self.lines())
+        return self._key
+
+    def lines(self) -> list[str]:
+        lines = [self.line]
+        for child in self.children:
+            lines.extend(child.lines())
+        return lines
+
+
+def _parse_diff_tree(lines: list[str]) -> list[_DiffNode]:
+    roots: list[_DiffNode] = []
+    component: _DiffNode | None = None
+    step: _DiffNode | None = None
+    for line in lines:
+        node = _DiffNode(line)
+        prefix = line.lstrip()[:1]
+        if prefix == "+":
+            roots.append(node)
+            component, step = node, None
+        elif prefix == "#":
+            (component.children if component else roots).append(node)
+            step = node
+        elif step is not None:
+            step.children.append(node)
+        elif component is not None:
+            component.children.append(node)
         else:
-            diff_lines = list(
-                difflib.unified_diff(
-                    self.text1.splitlines(),
-                    self.text2.splitlines(),
-                    fromfile="Original",
-                    tofile="Modified",
-                    lineterm="",
-                    n=max(len(self.text1.splitlines()), len(self.text2.splitlines())),
+            roots.append(node)
+    return roots
+
+
+def _matching_pairs(a: list[str], b: list[str]) -> list[tuple[int, int]]:
+    """Patience diff: pairs up indexes of a and b holding equal keys, anchored
+    on keys that occur exactly once on both sides."""
+    pairs = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        alo, ahi, blo, bhi = ranges.pop()
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+
+        occurrences: dict[str, list[int]] = {}
+        for i in range(alo, ahi):
+            occurrences.setdefault(a[i], [0, i, 0, -1])[0] += 1
+        for j in range(blo, bhi):
+            if (occurrence := occurrences.get(b[j])) is not None:
+                occurrence[2] += 1
+                occurrence[3] = j
+        unique = sorted(
+            (i, j)
+            for count_a, i, count_b, j in occurrences.values()
+            if count_a == 1 and count_b == 1
+        )
+
+        # The longest run of unique pairs in order on both sides, found by
+        # patience sorting; those become the anchors.
+        tails: list[int] = []
+        tail_indexes: list[int] = []
+        previous = [-1] * len(unique)
+        for index, (_, j) in enumerate(unique):
+            position = bisect.bisect_left(tails, j)
+            if position:
+                previous[index] = tail_indexes[position - 1]
+            if position == len(tails):
+                tails.append(j)
+                tail_indexes.append(index)
+            else:
+                tails[position] = j
+                tail_indexes[position] = index
+        anchors = []
+        index = tail_indexes[-1] if tail_indexes else -1
+        while index >= 0:
+            anchors.append(unique[index])
+            index = previous[index]
+        anchors.reverse()
+
+        if not anchors:
+            # Nothing unique to anchor on, typically blank lines or repeated
+            # steps. Small gaps get an exact match; large ones stay unmatched
+            # to keep the work bounded.
+            if (ahi - alo) * (bhi - blo) <= _MAX_GAP_COMPARISONS:
+                matcher = difflib.SequenceMatcher(
+                    None, a[alo:ahi], b[blo:bhi], autojunk=False
                 )
-            )
+                for block in matcher.get_matching_blocks():
+                    pairs.extend(
+                        (alo + block.a + k, blo + block.b + k)
+                        for k in range(block.size)
+                    )
+            continue
 
-            processed_lines = []
-            for line in diff_lines:
-                if (
-                    line.startswith("--- ")
-                    or line.startswith("+++ ")
-                    or line.startswith("@@")
-                ):
-                    continue
-                elif line.startswith("+"):
-                    processed_lines.append(RecipeHighlighter.ADDED_MARKER + line[1:])
-                elif line.startswith("-"):
-                    processed_lines.append(RecipeHighlighter.DELETED_MARKER + line[1:])
-                elif line.startswith(" "):
-                    processed_lines.append(line[1:])
-                else:
-                    processed_lines.append(line)
-
-            self.editor.setText("\n".join(processed_lines))
+        for i, j in anchors:
+            pairs.append((i, j))
+            ranges.append((alo, i, blo, j))
+            alo, blo = i + 1, j + 1
+        ranges.append((alo, ahi, blo, bhi))
+    pairs.sort()
+    return pairs
 
-        self.editor.blockSignals(False)
+
+class _DiffWriter:
+    def __init__(self):
+        self.lines: list[str] = []
+        self.changed_spans: dict[int, list[tuple[int, int]]] = {}
+
+    def diff_nodes(self, a: list[_DiffNode], b: list[_DiffNode]):
+        # Whole subtrees are matched first; the leftovers are then matched on
+        # their first line alone, so a step whose ingredients changed is
+        # diffed inside rather than replaced wholesale.
+        i = j = 0
+        pairs = _matching_pairs([node.key for node in a], [node.key for node in b])
+        for next_i, next_j in [*pairs, (len(a), len(b))]:
+            self.diff_unmatched(a[i:next_i], b[j:next_j])
+            if next_i < len(a):
+                self.lines.extend(a[next_i].lines())
+            i, j = next_i + 1, next_j + 1
+
+    def diff_unmatched(self, a: list[_DiffNode], b: list[_DiffNode]):
+        if not a or not b:
+            self.emit_changed(a, b)
+            return
+        i = j = 0
+        pairs = _matching_pairs([node.line for node in a], [node.line for node in b])
+        for next_i, next_j in [*pairs, (len(a), len(b))]:
+            self.emit_changed(a[i:next_i], b[j:next_j])
+            if next_i < len(a):
+                self.lines.append(a[next_i].line)
+                self.diff_nodes(a[next_i].children, b[next_j].children)
+            i, j = next_i + 1, next_j + 1
+
+    def emit_changed(self, deleted: list[_DiffNode], added: list[_DiffNode]):
+        deleted_lines = [line for node in deleted for line in node.lines()]
+        added_lines = [line for node in added for line in node.lines()]
+
+        # Lines replaced one for one by a line of the same kind, like a
+        # reworded step, are diffed word by word.
+        spans = [None] * len(deleted_lines)
+        if len(deleted_lines) == len(added_lines):
+            spans = [
+                _changed_spans(old, new) if old[:1] == new[:1] else None
+                for old, new in zip(deleted_lines, added_lines)
+            ]
+
+        first_deleted = len(self.lines)
+        first_added = first_deleted + len(deleted_lines)
+        for index, line_spans in enumerate(spans):
+            if line_spans is not None:
+                self.changed_spans[first_deleted + index] = line_spans[0]
+                self.changed_spans[first_added + index] = line_spans[1]
+
+        self.lines.extend(
+            RecipeHighlighter.DELETED_MARKER + line for line in deleted_lines
+        )
+        self.lines.extend(RecipeHighlighter.ADDED_MARKER + line for line in added_lines)
+
+
+_WORD_REGEX = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+@functools.lru_cache(maxsize=4096)
+def _changed_spans(
+    old: str, new: str
+) -> tuple[list[tuple[int, int]], list[tuple[int, int]]] | None:
+    """Returns the spans of old and new, offset by the diff marker, that
+    differ word by word, or None if the lines are better shown as replaced
+    outright."""
+    old_words = _WORD_REGEX.findall(old)
+    new_words = _WORD_REGEX.findall(new)
+    if len(old_words) * len(new_words) > _MAX_LINE_COMPARISONS:
+        return None
+
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    if matcher.ratio() < _MIN_LINE_SIMILARITY:
+        return None
+
+    old_offsets = list(itertools.accumulate(map(len, old_words), initial=1))
+    new_offsets = list(itertools.accumulate(map(len, new_words), initial=1))
+    old_spans = []
+    new_spans = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if i1 < i2:
+            old_spans.append((old_offsets[i1], old_offsets[i2] - old_offsets[i1]))
+        if j1 < j2:
+            new_spans.append((new_offsets[j1], new_offsets[j2] - new_offsets[j1]))
+    return old_spans, new_spans
+
+
+def diff_recipe_texts(text1: str, text2: str) -> RecipeDiff:
+    """Merges text1 and text2 into one text, with lines only in one of them
+    marked as deleted or added. Recipes are compared as a tree of components,
+    steps and ingredients, so edits stay local to the parts that changed."""
+    writer = _DiffWriter()
+    writer.diff_nodes(
+        _parse_diff_tree(text1.splitlines()), _parse_diff_tree(text2.splitlines())
+    )
+    return RecipeDiff("\n".join(writer.lines), writer.changed_spans)
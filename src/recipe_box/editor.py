@@ -1,106 +1,171 @@
 from __future__ import annotations
 
-from PySide6.QtCore import Signal, QMimeData
-from PySide6.QtGui import QSyntaxHighlighter, QFont, QTextCharFormat, QColor
-from PySide6.QtWidgets import QTextEdit
+import functools
+
+from PySide6.QtCore import QEvent, Signal, QMimeData
+from PySide6.QtGui import (
+    QSyntaxHighlighter,
+    QFont,
+    QTextBlockUserData,
+    QTextCharFormat,
+    QColor,
+)
+from PySide6.QtWidgets import QTextEdit, QToolTip
 
 from src.recipe_box.preferences import Preferences
 
 
-class RecipeHighlighter(QSyntaxHighlighter):
-    ADDED_MARKER = "\u200b"
-    DELETED_MARKER = "\u200c"
+class HighlightPalette:
+    """The character formats for one set of theme colors. Palettes are cached
+    by color, so every highlighter showing the same theme shares one."""
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self._in_metadata_state = 1
-        self.colors = None
-        self.metadata_format = None
-        self.diff_added_format = None
-        self.diff_added_prefix_format = None
-        self.diff_deleted_format = None
-        self.diff_deleted_prefix_format = None
-        self.prefix_format = None
-        self.title_format = None
-        self.notes_format = None
-        self.component_format = None
-        self.step_format = None
-        self.ingredient_format = None
-
-    def update_colors(self, colors):
+    def __init__(self, colors: dict[str, str]):
         self.colors = colors
 
         self.metadata_format = QTextCharFormat()
-        self.metadata_format.setForeground(QColor(self.colors["metadata"]))
+        self.metadata_format.setForeground(QColor(colors["metadata"]))
         self.metadata_format.setFontFamily("Source Code Pro")
 
         self.diff_added_format = QTextCharFormat()
-        self.diff_added_format.setForeground(
-            QColor(self.colors["diff_added_foreground"])
-        )
-        self.diff_added_format.setBackground(
-            QColor(self.colors["diff_added_background"])
-        )
+        self.diff_added_format.setForeground(QColor(colors["diff_added_foreground"]))
+        self.diff_added_format.setBackground(QColor(colors["diff_added_background"]))
 
-        self.diff_added_prefix_format = QTextCharFormat()
-        self.diff_added_prefix_format.setForeground(
-            QColor(self.colors["diff_added_foreground"])
-        )
-        self.diff_added_prefix_format.setBackground(
-            QColor(self.colors["diff_added_background"])
-        )
+        self.diff_added_prefix_format = QTextCharFormat(self.diff_added_format)
         self.diff_added_prefix_format.setFontFamily("Source Code Pro")
 
         self.diff_deleted_format = QTextCharFormat()
         self.diff_deleted_format.setForeground(
-            QColor(self.colors["diff_deleted_foreground"])
+            QColor(colors["diff_deleted_foreground"])
         )
         self.diff_deleted_format.setBackground(
-            QColor(self.colors["diff_deleted_background"])
+            QColor(colors["diff_deleted_background"])
         )
         self.diff_deleted_format.setFontStrikeOut(True)
 
-        self.diff_deleted_prefix_format = QTextCharFormat()
-        self.diff_deleted_prefix_format.setForeground(
-            QColor(self.colors["diff_deleted_foreground"])
-        )
-        self.diff_deleted_prefix_format.setBackground(
-            QColor(self.colors["diff_deleted_background"])
-        )
+        self.diff_deleted_prefix_format = QTextCharFormat(self.diff_deleted_format)
         self.diff_deleted_prefix_format.setFontFamily("Source Code Pro")
-        self.diff_deleted_prefix_format.setFontStrikeOut(True)
 
         self.prefix_format = QTextCharFormat()
-        self.prefix_format.setForeground(QColor(self.colors["prefix"]))
+        self.prefix_format.setForeground(QColor(colors["prefix"]))
         self.prefix_format.setFontFamily("Source Code Pro")
 
         self.title_format = QTextCharFormat()
-        self.title_format.setForeground(QColor(self.colors["title"]))
+        self.title_format.setForeground(QColor(colors["title"]))
         self.title_format.setFontWeight(QFont.Weight.Bold)
 
         self.notes_format = QTextCharFormat()
-        self.notes_format.setForeground(QColor(self.colors["notes"]))
+        self.notes_format.setForeground(QColor(colors["notes"]))
 
         self.component_format = QTextCharFormat()
-        self.component_format.setForeground(QColor(self.colors["component"]))
+        self.component_format.setForeground(QColor(colors["component"]))
         self.component_format.setFontWeight(QFont.Weight.DemiBold)
 
         self.step_format = QTextCharFormat()
-        self.step_format.setForeground(QColor(self.colors["step"]))
+        self.step_format.setForeground(QColor(colors["step"]))
 
         self.ingredient_format = QTextCharFormat()
-        self.ingredient_format.setForeground(QColor(self.colors["ingredient"]))
+        self.ingredient_format.setForeground(QColor(colors["ingredient"]))
+
+        # Themes written before validation existed have no error color.
+        self.error_format = QTextCharFormat()
+        self.error_format.setUnderlineStyle(
+            QTextCharFormat.UnderlineStyle.SpellCheckUnderline
+        )
+        self.error_format.setUnderlineColor(QColor(colors.get("error", "#cc0000")))
+
+        # Dispatch tables from a line's first character to its formats.
+        self.line_formats = {
+            "=": self.title_format,
+            ">": self.notes_format,
+            "+": self.component_format,
+            "#": self.step_format,
+            "-": self.ingredient_format,
+        }
+        self.diff_formats = {
+            RecipeHighlighter.ADDED_MARKER: (
+                self.diff_added_format,
+                self.diff_added_prefix_format,
+            ),
+            RecipeHighlighter.DELETED_MARKER: (
+                self.diff_deleted_format,
+                self.diff_deleted_prefix_format,
+            ),
+        }
+        self.error_formats = {}
+        for prefix, fmt in self.line_formats.items():
+            self.error_formats[prefix] = QTextCharFormat(fmt)
+            self.error_formats[prefix].merge(self.error_format)
+
+    @staticmethod
+    def for_colors(colors: dict[str, str]) -> HighlightPalette:
+        return _palette_for_colors(tuple(sorted(colors.items())))
+
+
+@functools.lru_cache(maxsize=8)
+def _palette_for_colors(colors: tuple[tuple[str, str], ...]) -> HighlightPalette:
+    return HighlightPalette(dict(colors))
+
+
+def _utf16_offset(text: str, index: int) -> int:
+    if text.isascii():
+        return index
+    return len(text[:index].encode("utf-16-le")) // 2
+
 
+class BlockError(QTextBlockUserData):
+    def __init__(self, message: str):
+        super().__init__()
+        self.message = message
+
+
+class RecipeHighlighter(QSyntaxHighlighter):
+    ADDED_MARKER = "\u200b"
+    DELETED_MARKER = "\u200c"
+
+    def __init__(self, parent=None, validate: bool = False):
+        super().__init__(parent)
+        self.validate = validate
+        self._outside_step_state = 0
+        self._in_metadata_state = 1
+        self._in_step_state = 2
+        self.colors = None
+        self.palette: HighlightPalette | None = None
+        # Spans of diff lines that changed word by word, by block number.
+        self.changed_spans: dict[int, list[tuple[int, int]]] = {}
+
+    def update_colors(self, colors):
+        # Preference changes that leave the theme alone shouldn't cost a
+        # rehighlight of the whole document.
+        self.colors = colors
+        palette = HighlightPalette.for_colors(colors)
+        if palette is self.palette:
+            return
+        self.palette = palette
         self.rehighlight()
 
     def highlightBlock(self, text: str):
-        if not self.colors or len(text) == 0:
+        palette = self.palette
+        if palette is None:
+            return
+
+        # Block states carry the parse state from line to line, so after an
+        # edit Qt only revisits following blocks until the state settles.
+        previous_state = max(self.previousBlockState(), self._outside_step_state)
+        # Cleared up front, since the branches below that find no error return
+        # early.
+        if self.currentBlockUserData() is not None:
+            self.setCurrentBlockUserData(None)
+        if len(text) == 0:
+            self.setCurrentBlockState(previous_state)
             return
 
+        # Qt's format positions count UTF-16 code units, which differ from
+        # Python string indexes once there's a character outside the BMP.
+        end = _utf16_offset(text, len(text))
         is_delimiter = text.strip() == "---"
-        is_in_metadata = self.previousBlockState() == self._in_metadata_state
+        is_in_metadata = previous_state == self._in_metadata_state
         if is_in_metadata or is_delimiter:
-            self.setFormat(0, len(text), self.metadata_format)
+            self.setFormat(0, end, palette.metadata_format)
             if is_delimiter:
                 if not is_in_metadata:
                     self.setCurrentBlockState(self._in_metadata_state)
@@ -109,33 +174,54 @@ class RecipeHighlighter(QSyntaxHighlighter):
             return
 
         prefix = text[0]
-        if prefix in [self.ADDED_MARKER, self.DELETED_MARKER]:
-            fmt = None
-            prefix_fmt = None
-            if text.startswith(self.ADDED_MARKER):
-                fmt = self.diff_added_format
-                prefix_fmt = self.diff_added_prefix_format
-            elif text.startswith(self.DELETED_MARKER):
-                fmt = self.diff_deleted_format
-                prefix_fmt = self.diff_deleted_prefix_format
-            self.setFormat(0, len(text), fmt)
+        if diff_formats := palette.diff_formats.get(prefix):
+            fmt, prefix_fmt = diff_formats
+            spans = None
+            if self.changed_spans:
+                spans = self.changed_spans.get(self.currentBlock().blockNumber())
+            if spans is None:
+                self.setFormat(0, end, fmt)
+            else:
+                if (line_fmt := palette.line_formats.get(text[1:2])) is not None:
+                    self.setFormat(2, end - 2, line_fmt)
+                for start, length in spans:
+                    span_start = _utf16_offset(text, start)
+                    span_end = _utf16_offset(text, start + length)
+                    self.setFormat(span_start, span_end - span_start, fmt)
             self.setFormat(1, 1, prefix_fmt)
-        elif prefix in ["=", ">", "+", "#", "-"]:
-            fmt = None
-            if prefix == "=":
-                fmt = self.title_format
-            elif prefix == ">":
-                fmt = self.notes_format
-            elif prefix == "+":
-                fmt = self.component_format
-            elif prefix == "#":
-                fmt = self.step_format
-            elif prefix == "-":
-                fmt = self.ingredient_format
-            self.setFormat(0, len(text), fmt)
-            self.setFormat(0, 1, self.prefix_format)
-
-        self.setCurrentBlockState(0)
+        elif (fmt := palette.line_formats.get(prefix)) is not None:
+            self.setFormat(0, end, fmt)
+            self.setFormat(0, 1, palette.prefix_format)
+
+        if not self.validate:
+            self.setCurrentBlockState(self._outside_step_state)
+            return
+
+        state, error = self._validate_line(text.lstrip(), previous_state)
+        self.setCurrentBlockState(state)
+        if error:
+            if (fmt := palette.error_formats.get(prefix)) is not None:
+                self.setFormat(1, end - 1, fmt)
+            else:
+                self.setFormat(0, end, palette.error_format)
+            self.setCurrentBlockUserData(BlockError(error))
+
+    def _validate_line(self, line: str, state: int) -> tuple[int, str | None]:
+        # Mirrors the line rules of Recipe.parse.
+        if not line:
+            return state, None
+        match line[0]:
+            case "#":
+                return self._in_step_state, None
+            case "+":
+                return self._outside_step_state, None
+            case "-":
+                if state != self._in_step_state:
+                    return state, "Ingredients must belong to a step."
+                return state, None
+            case "=" | ">":
+                return state, None
+        return state, "Lines must start with =, >, +, # or -. This line is ignored."
 
 
 class RecipeEditor(QTextEdit):
@@ -144,7 +230,7 @@ class RecipeEditor(QTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.prefs = Preferences.instance()
-        self.highlighter = RecipeHighlighter(self.document())
+        self.highlighter = RecipeHighlighter(self.document(), validate=True)
         self.prefs.preferencesChanged.connect(self.apply_preferences)
         self.document().modificationChanged.connect(self.dirtyStateChanged)
         self.apply_preferences()
@@ -157,10 +243,12 @@ class RecipeEditor(QTextEdit):
             font.setPointSize(self.prefs.data.editor.font_size)
         self.setFont(font)
         colors = self.prefs.get_theme_colors()
-        self.setStyleSheet(
-            f"QTextEdit {{ background-color: {colors['background']}; color: {colors['text']}; }}"
-        )
-        self.highlighter.update_colors(colors)
+        # The colors are cached, so an unchanged theme needs no restyle.
+        if colors is not self.highlighter.colors:
+            self.setStyleSheet(
+                f"QTextEdit {{ background-color: {colors['background']}; color: {colors['text']}; }}"
+            )
+            self.highlighter.update_colors(colors)
 
     def set_content(self, text: str):
         self.setPlainText(text)
@@ -168,6 +256,18 @@ class RecipeEditor(QTextEdit):
     def is_dirty(self) -> bool:
         return self.document().isModified()
 
+    def viewportEvent(self, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.ToolTip:
+            block = self.cursorForPosition(event.pos()).block()
+            error = block.userData()
+            if isinstance(error, BlockError):
+                QToolTip.showText(event.globalPos(), error.message, self)
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().viewportEvent(event)
+
     def insertFromMimeData(self, source: QMimeData):
         if source.hasText():
             self.insertPlainText(source.text())
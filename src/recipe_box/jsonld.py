@@ -1,13 +1,24 @@
+import gzip
 import html
 import json
+import os
 import re
 import unicodedata
+import zlib
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from fractions import Fraction
+from pathlib import Path
 
 import httpx
 from bs4 import BeautifulSoup
 
-from src.recipe_box import Recipe
+from src.recipe_box import Component, Recipe, Step
+from src.recipe_box.library import Library
+
+HTML_SUFFIXES = (".html", ".htm")
+WARC_SUFFIXES = (".warc", ".warc.gz")
 
 
 def recipe_from_url(url: str) -> Recipe:
@@ -23,18 +34,170 @@ def recipe_from_url(url: str) -> Recipe:
         with httpx.Client(timeout=10.0, follow_redirects=True) as client:
             response = client.get(url, headers=headers)
             response.raise_for_status()
-    except httpx.RequestError as e:
+    except httpx.HTTPError as e:
+        # Covers both connection failures and error statuses.
         raise ValueError(f"Failed to fetch URL: {e}") from e
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    return recipe_from_html(response.text)
+
+
+def recipe_from_html(html_text: str) -> Recipe:
+    soup = BeautifulSoup(html_text, "html.parser")
     if not (recipe_json := _extract_recipe_json(soup)):
         raise ValueError("Could not find recipe JSON-LD in the page.")
 
-    recipe_text = _jsonld_to_recipe(recipe_json)
-    if not (parsed_recipe := Recipe.parse(recipe_text)):
-        raise ValueError(f"Failed to parse the generated recipe text:\n\n{recipe_text}")
+    return _jsonld_to_recipe(recipe_json)
+
+
+def import_recipes_from_path(
+    library: Library,
+    path: str | Path,
+    batch_size: int = 100,
+    max_workers: int | None = None,
+) -> tuple[int, int]:
+    imported_count = 0
+    failed_count = 0
+    # Saved files, or the rest of a WARC file, that couldn't be read.
+    failures: list[str] = []
+    batch = []
+    max_workers = max_workers or os.process_cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pages = _iter_saved_pages(Path(path).expanduser(), failures)
+        results = _map_bounded(
+            executor, _recipe_from_saved_page, pages, window=max_workers * 4
+        )
+        for recipe in results:
+            if recipe is None:
+                failed_count += 1
+                continue
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                library.add_recipes(batch)
+                imported_count += len(batch)
+                batch.clear()
+
+    if batch:
+        library.add_recipes(batch)
+        imported_count += len(batch)
+
+    return imported_count, failed_count + len(failures)
+
+
+def _map_bounded(executor, fn, items: Iterable, window: int) -> Iterator:
+    # Executor.map submits the whole iterable up front; keep at most `window`
+    # pages in flight so large archives are never held in memory at once.
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
-    return parsed_recipe
+
+def _recipe_from_saved_page(page: Path | str) -> Recipe | None:
+    try:
+        if isinstance(page, Path):
+            page = page.read_text(encoding="utf-8", errors="replace")
+        return recipe_from_html(page)
+    except (ValueError, OSError) as e:
+        print(f"Warning: Skipping saved page: {e}")
+        return None
+    except Exception as e:
+        # One odd page mustn't stop an import whose earlier batches are
+        # already committed.
+        print(f"Warning: Skipping saved page after an unexpected error: {e!r}")
+        return None
+
+
+def _iter_saved_pages(path: Path, failures: list[str]) -> Iterator[Path | str]:
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file())
+    else:
+        files = [path]
+    for file in files:
+        name = file.name.lower()
+        if name.endswith(HTML_SUFFIXES):
+            yield file
+        elif name.endswith(WARC_SUFFIXES):
+            try:
+                yield from _iter_warc_html(file, failures)
+            except (ValueError, OSError, EOFError) as e:
+                # Records can't be found again after a bad one, so the rest
+                # of the file counts as one failure.
+                print(f"Warning: Skipping the rest of {file}: {e}")
+                failures.append(str(file))
+
+
+def _iter_warc_html(path: Path, failures: list[str]) -> Iterator[str]:
+    opener = gzip.open if path.name.lower().endswith(".gz") else open
+    with opener(path, "rb") as f:
+        while line := f.readline():
+            if not line.strip():
+                continue
+            if not line.startswith(b"WARC/"):
+                raise ValueError(f"Invalid WARC record header in {path}: {line!r}")
+
+            headers = {}
+            while (line := f.readline()).strip():
+                key, _, value = line.decode("utf-8", "replace").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            block = f.read(int(headers.get("content-length", 0)))
+            if headers.get("warc-type") != "response":
+                continue
+            if not headers.get("content-type", "").startswith("application/http"):
+                continue
+
+            try:
+                html_text = _decode_http_response(block)
+            except (ValueError, OSError, EOFError, zlib.error) as e:
+                uri = headers.get("warc-target-uri", path)
+                print(f"Warning: Skipping {uri}: {e}")
+                failures.append(str(uri))
+                continue
+            if html_text is not None:
+                yield html_text
+
+
+def _decode_http_response(block: bytes) -> str | None:
+    head, _, body = block.partition(b"\r\n\r\n")
+    header_lines = head.decode("iso-8859-1").split("\r\n")[1:]
+    headers = {}
+    for line in header_lines:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    content_type = headers.get("content-type", "")
+    if "html" not in content_type:
+        return None
+
+    if "chunked" in headers.get("transfer-encoding", ""):
+        body = _dechunk(body)
+    if headers.get("content-encoding") in ("gzip", "x-gzip"):
+        body = gzip.decompress(body)
+    elif headers.get("content-encoding") == "deflate":
+        body = zlib.decompress(body)
+
+    charset_match = re.search(r"charset=([\w-]+)", content_type)
+    charset = charset_match.group(1) if charset_match else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _dechunk(body: bytes) -> bytes:
+    chunks = []
+    while body:
+        size_line, _, body = body.partition(b"\r\n")
+        size = int(size_line.split(b";")[0] or b"0", 16)
+        if size == 0:
+            break
+        chunks.append(body[:size])
+        body = body[size + 2 :]
+    return b"".join(chunks)
 
 
 def _extract_recipe_json(soup: BeautifulSoup):
@@ -123,63 +286,106 @@ def _clean_html(text: str) -> str:
     return text.strip()
 
 
-def _jsonld_to_recipe(recipe_json: dict) -> str:
-    output_lines = []
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
 
-    metadata = {}
-    if prep_time := recipe_json.get("prepTime"):
-        if human_readable := _parse_iso8601_duration(prep_time):
-            metadata["prep_time"] = human_readable
-    if cook_time := recipe_json.get("cookTime"):
-        if human_readable := _parse_iso8601_duration(cook_time):
-            metadata["cook_time"] = human_readable
-    if recipe_yield := recipe_json.get("recipeYield"):
-        yield_text = str(
-            recipe_yield[0] if isinstance(recipe_yield, list) else recipe_yield
+
+def _field_text(value, field_path: str, multiline: bool = False) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if not isinstance(value, str):
+        raise ValueError(
+            f"Recipe JSON-LD field '{field_path}' is not text: {value!r:.80}"
         )
-        metadata["yield"] = _clean_html(yield_text)
-    if cuisine := recipe_json.get("recipeCuisine"):
-        cuisine_text = cuisine[0] if isinstance(cuisine, list) else cuisine
-        metadata["cuisine"] = _clean_html(cuisine_text)
-    if category := recipe_json.get("recipeCategory"):
-        category_text = category[0] if isinstance(category, list) else category
-        metadata["category"] = _clean_html(category_text)
-
-    if metadata:
-        output_lines.append("---")
-        for key, value in sorted(metadata.items()):
-            output_lines.append(f"{key}: {value}")
-        output_lines.append("---\n")
-
-    if not (title := recipe_json.get("name")):
+
+    text = _clean_html(value)
+    if multiline:
+        return text
+    return " ".join(text.split())
+
+
+def _jsonld_to_recipe(recipe_json: dict) -> Recipe:
+    metadata = {}
+    for key, field_name in (("prep_time", "prepTime"), ("cook_time", "cookTime")):
+        value = recipe_json.get(field_name)
+        # A bare number has no unit, so it can't be read as a duration.
+        if isinstance(value, (int, float)):
+            raise ValueError(
+                f"Recipe JSON-LD field '{field_name}' is not a duration: {value!r}"
+            )
+        if duration := _field_text(value, field_name):
+            if human_readable := _parse_iso8601_duration(duration):
+                metadata[key] = human_readable
+    for key, field_name in (
+        ("yield", "recipeYield"),
+        ("cuisine", "recipeCuisine"),
+        ("category", "recipeCategory"),
+    ):
+        if values := _as_list(recipe_json.get(field_name)):
+            if value := _field_text(values[0], f"{field_name}[0]"):
+                metadata[key] = value
+
+    if not (title := _field_text(recipe_json.get("name"), "name")):
         raise ValueError("Recipe JSON-LD has no 'name' field.")
-    output_lines.append(f"= {_clean_html(title)}\n")
-
-    if description := recipe_json.get("description"):
-        cleaned_description = _clean_html(description)
-        for line in cleaned_description.split("\n"):
-            if line.strip():
-                output_lines.append(f"> {line.strip()}")
-        output_lines.append("")
-
-    if ingredients := recipe_json.get("recipeIngredient", []):
-        output_lines.append("# Gather all ingredients")
-        for ingredient in ingredients:
-            output_lines.append(f"- {_clean_html(ingredient)}")
-        output_lines.append("")
-
-    instructions = recipe_json.get("recipeInstructions", [])
-    for item in instructions:
+
+    description = _field_text(
+        recipe_json.get("description"), "description", multiline=True
+    )
+    if notes := [line.strip() for line in description.split("\n") if line.strip()]:
+        metadata["notes"] = "\n".join(notes)
+
+    components = []
+    component_name = None
+    steps = []
+
+    if ingredients := _as_list(recipe_json.get("recipeIngredient")):
+        ingredient_texts = [
+            text
+            for i, ingredient in enumerate(ingredients)
+            if (text := _field_text(ingredient, f"recipeIngredient[{i}]"))
+        ]
+        steps.append(
+            Step(text="Gather all ingredients", ingredients=ingredient_texts or None)
+        )
+
+    for i, item in enumerate(_as_list(recipe_json.get("recipeInstructions"))):
+        field_path = f"recipeInstructions[{i}]"
+        if not isinstance(item, dict):
+            raise ValueError(
+                f"Recipe JSON-LD field '{field_path}' is not a HowToStep or HowToSection."
+            )
+
         item_type = item.get("@type", "HowToStep")
         if item_type == "HowToStep":
-            if step_text := _clean_html(item.get("text")):
-                output_lines.append(f"# {step_text}\n")
+            if step_text := _field_text(item.get("text"), f"{field_path}.text"):
+                steps.append(Step(text=step_text))
         elif item_type == "HowToSection":
-            if section_name := _clean_html(item.get("name")):
-                output_lines.append(f"+ {section_name}")
-            for step in item.get("itemListElement", []):
-                if step_text := _clean_html(step.get("text")):
-                    output_lines.append(f"# {step_text}\n")
-            output_lines.append("")
-
-    return "\n".join(output_lines).strip()
+            # Unnamed sections keep adding to the current component, and steps
+            # after a section stay in it, as the markup format would read them.
+            if section_name := _field_text(item.get("name"), f"{field_path}.name"):
+                if steps:
+                    components.append(Component(name=component_name, steps=steps))
+                component_name = section_name
+                steps = []
+            for j, step in enumerate(_as_list(item.get("itemListElement"))):
+                step_path = f"{field_path}.itemListElement[{j}]"
+                if not isinstance(step, dict):
+                    raise ValueError(
+                        f"Recipe JSON-LD field '{step_path}' is not a HowToStep."
+                    )
+                if step_text := _field_text(step.get("text"), f"{step_path}.text"):
+                    steps.append(Step(text=step_text))
+
+    if steps:
+        components.append(Component(name=component_name, steps=steps))
+
+    if not components:
+        raise ValueError(
+            "Recipe JSON-LD has no 'recipeIngredient' or 'recipeInstructions'."
+        )
+
+    return Recipe(title=title, metadata=metadata, components=components)
@@ -1,10 +1,38 @@
 from __future__ import annotations
+import os
+import re
 import sqlite3
-from dataclasses import replace
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, replace
 from pathlib import Path
 from src.recipe_box import Recipe
 
 
+def get_db_path() -> Path:
+    if os.name == "nt":
+        appdata = os.getenv("APPDATA")
+        if appdata:
+            return Path(appdata) / "RecipeBox" / "RecipeBox.db"
+    return Path.home() / ".config" / "RecipeBox" / "RecipeBox.db"
+
+
+@dataclass(frozen=True)
+class RecipeSummary:
+    """The parts of a recipe the browser lists it by."""
+
+    id: int
+    title: str
+    category: str
+    draft: str | None = None
+    favorite: str | None = None
+
+    @classmethod
+    def of(cls, recipe: Recipe) -> RecipeSummary:
+        return cls(
+            recipe.id, recipe.title, recipe.category, recipe.draft, recipe.favorite
+        )
+
+
 class Library:
     def __init__(self, db_path: str | Path):
         self._db_path = Path(db_path).expanduser()
@@ -30,6 +58,16 @@ class Library:
             )
             return cursor.lastrowid
 
+    def add_recipes(self, recipes: Iterable[Recipe]) -> list[int]:
+        ids = []
+        with self._conn:
+            for recipe in recipes:
+                cursor = self._conn.execute(
+                    "INSERT INTO recipes (content) VALUES (?)", (recipe.serialize(),)
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
     def get_recipe(self, recipe_id: int) -> Recipe | None:
         cursor = self._conn.execute(
             "SELECT content FROM recipes WHERE id = ?", (recipe_id,)
@@ -37,7 +75,13 @@ class Library:
         row = cursor.fetchone()
         if row is None:
             return None
-        recipe = Recipe.parse(row["content"])
+        try:
+            recipe = Recipe.parse(row["content"])
+        except ValueError as e:
+            # The browser lists recipes by their title and metadata alone, so
+            # it can offer one whose steps don't parse.
+            print(f"Warning: Could not read recipe with ID {recipe_id}: {e}")
+            return None
         return replace(recipe, id=recipe_id)
 
     def update_recipe(self, recipe: Recipe):
@@ -49,20 +93,66 @@ class Library:
                 "UPDATE recipes SET content = ? WHERE id = ?", (content, recipe.id)
             )
 
+    def update_recipes(self, recipes: Iterable[Recipe]):
+        """Updates several recipes in one transaction; if any can't be
+        updated, none are."""
+        rows = []
+        for recipe in recipes:
+            if recipe.id is None:
+                raise ValueError("Recipe must have an ID to be updated.")
+            rows.append((recipe.serialize(), recipe.id))
+        with self._conn:
+            self._conn.executemany("UPDATE recipes SET content = ? WHERE id = ?", rows)
+
     def delete_recipe(self, recipe_id: int):
         with self._conn:
             self._conn.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
 
     def list_recipes(self) -> list[Recipe]:
-        recipes = []
+        return list(self.iter_recipes())
+
+    def iter_recipes(self) -> Iterator[Recipe]:
+        cursor = self._conn.execute("SELECT id, content FROM recipes")
+        return self._parse_rows(cursor)
+
+    def iter_summaries(self) -> Iterator[RecipeSummary]:
+        # The browser only lists titles and metadata, so the steps are left
+        # unparsed.
         cursor = self._conn.execute("SELECT id, content FROM recipes")
-        for row in cursor.fetchall():
+        for recipe in self._parse_rows(cursor, Recipe.parse_header):
+            yield RecipeSummary.of(recipe)
+
+    def search_recipes(self, query: str) -> Iterator[Recipe]:
+        """Yields the recipes whose text contains every word of the query,
+        ignoring the case of ASCII letters."""
+        words = query.split()
+        if not words:
+            return self.iter_recipes()
+        escaped = ["%" + re.sub(r"([\\%_])", r"\\\1", word) + "%" for word in words]
+        cursor = self._conn.execute(
+            "SELECT id, content FROM recipes WHERE "
+            + " AND ".join(["content LIKE ? ESCAPE '\\'"] * len(words)),
+            escaped,
+        )
+        return self._parse_rows(cursor)
+
+    def _parse_rows(
+        self,
+        cursor: sqlite3.Cursor,
+        parse: Callable[[str], Recipe] | None = None,
+    ) -> Iterator[Recipe]:
+        # Looked up per call rather than bound as a default, so the profiler
+        # can wrap it.
+        parse = parse or Recipe.parse
+        for row in cursor:
             try:
-                recipe = Recipe.parse(row["content"])
-                recipes.append(replace(recipe, id=row["id"]))
+                recipe = parse(row["content"])
+                yield replace(recipe, id=row["id"])
             except ValueError as e:
                 print(f"Warning: Skipping malformed recipe with ID {row['id']}: {e}")
-        return recipes
+
+    def count_recipes(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
 
     def close(self):
-        self._conn.close()
\ No newline at end of file
+        self._conn.close()
@@ -1,18 +1,16 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
-import os
-import subprocess
 import sys
-import tempfile
 from dataclasses import replace
+from collections.abc import Callable, Iterable
 from pathlib import Path
+from typing import TextIO
 import datetime
-import zipfile
-import re
 
 import PySide6.QtAsyncio as QtAsyncio
-from PySide6.QtCore import Qt, QSize
+from PySide6.QtCore import Qt, QSize, QTimer
 from PySide6.QtGui import QAction, QKeySequence, QFont
 from PySide6.QtWidgets import (
     QApplication,
@@ -20,32 +18,25 @@ from PySide6.QtWidgets import (
     QInputDialog,
     QMainWindow,
     QMessageBox,
+    QProgressBar,
+    QPushButton,
     QSplitter,
 )
 
-from src.recipe_box.assistant import AssistantDialog
+from src.recipe_box.archive import read_zip_archive, slugify, write_zip_archive
 from src.recipe_box.browser import RecipeBrowser
+from src.recipe_box.compiler import TypstCompiler
 from src.recipe_box.editor import RecipeEditor
-from src.recipe_box.jsonld import recipe_from_url
+from src.recipe_box.telemetry import TelemetryDialog
 from src.recipe_box.theme import MARGIN
-from src.recipe_box.library import Library
+from src.recipe_box.library import Library, RecipeSummary, get_db_path
 from src.recipe_box.models import Recipe
 from src.recipe_box.preferences import Preferences, PreferencesDialog
-from src.recipe_box.rendering import TypstRenderer
+from src.recipe_box.preview import RecipePreview
+from src.recipe_box.profiling import start_profiling
 
-
-def get_db_path() -> Path:
-    if os.name == "nt":
-        appdata = os.getenv("APPDATA")
-        if appdata:
-            return Path(appdata) / "RecipeBox" / "RecipeBox.db"
-    return Path.home() / ".config" / "RecipeBox" / "RecipeBox.db"
-
-
-def slugify(value: str) -> str:
-    value = re.sub(r"[^\w\s-]", "", value).strip().lower()
-    value = re.sub(r"[-\s]+", "-", value)
-    return value
+# Recipes read at startup are added to the browser this many at a time.
+LOAD_CHUNK_SIZE = 500
 
 
 class MainWindow(QMainWindow):
@@ -57,36 +48,65 @@ class MainWindow(QMainWindow):
         self.preferences = Preferences.instance()
         self.original_font = QApplication.instance().font()
         self.preferences.preferencesChanged.connect(self.apply_app_styles)
+        self.preferences.preferencesChanged.connect(self.prune_assistant_clients)
 
         self.current_recipe_id: int | None = None
         self.is_editor_dirty: bool = False
+        self._load_generation = 0
         self.lib = Library(get_db_path())
+        # TODO: Add preference for Typst path
+        self.typst_compiler = TypstCompiler(workspace=get_db_path().parent / "typst")
+        # The preview keeps its own warm watcher, so typing never waits behind
+        # a cookbook export.
+        self.preview_compiler = TypstCompiler(
+            workspace=get_db_path().parent / "typst-preview"
+        )
 
         self.save_action: QAction | None = None
         self.delete_action: QAction | None = None
         self.assistant_action: QAction | None = None
+        self.batch_assistant_action: QAction | None = None
         self.export_recipe_action: QAction | None = None
         self.export_cookbook_action: QAction | None = None
         self.export_library_action: QAction | None = None
+        self.preview_action: QAction | None = None
+        self.import_saved_pages_action: QAction | None = None
 
         self.splitter = QSplitter(self)
         self.setCentralWidget(self.splitter)
         self.recipe_browser = RecipeBrowser()
         self.recipe_editor = RecipeEditor()
+        self.recipe_preview = RecipePreview(self.recipe_editor, self.preview_compiler)
+        self.recipe_preview.setVisible(False)
         self.splitter.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
         self.splitter.addWidget(self.recipe_browser)
         self.splitter.addWidget(self.recipe_editor)
-        self.splitter.setSizes([300, 700])
+        self.splitter.addWidget(self.recipe_preview)
+        self.splitter.setSizes([300, 700, 500])
         self.splitter.setHandleWidth(MARGIN)
         self.setStatusBar(self.statusBar())
 
+        self.is_exporting = False
+        self.export_cancelled = False
+        self.export_progress = QProgressBar()
+        self.export_progress.setRange(0, 0)
+        self.export_progress.setMaximumWidth(150)
+        self.export_progress.setVisible(False)
+        self.cancel_export_button = QPushButton("Cancel")
+        self.cancel_export_button.setVisible(False)
+        self.cancel_export_button.clicked.connect(self.cancel_export)
+        self.statusBar().addPermanentWidget(self.export_progress)
+        self.statusBar().addPermanentWidget(self.cancel_export_button)
+
         self.recipe_browser.recipeSelected.connect(self.display_recipe)
         self.recipe_editor.dirtyStateChanged.connect(self.set_dirty)
 
         self.setup_menu()
-        self.load_recipes()
         self.recipe_editor.setEnabled(False)
         self.update_action_states()
+        # The library is read once the event loop runs, after the window's
+        # first paint.
+        QTimer.singleShot(0, lambda: asyncio.ensure_future(self.stream_recipes()))
         self.apply_app_styles()
 
     def setup_menu(self):
@@ -144,17 +164,42 @@ class MainWindow(QMainWindow):
         )
         library_menu.addAction(import_library_action)
 
+        self.import_saved_pages_action = QAction("Import &Saved Pages...", self)
+        self.import_saved_pages_action.triggered.connect(
+            lambda: asyncio.ensure_future(self.import_saved_pages())
+        )
+        library_menu.addAction(self.import_saved_pages_action)
+
         self.export_library_action = QAction("&Export...", self)
         self.export_library_action.triggered.connect(
             lambda: asyncio.ensure_future(self.export_library())
         )
         library_menu.addAction(self.export_library_action)
 
+        view_menu = menu_bar.addMenu("&View")
+        self.preview_action = QAction("PDF &Preview", self)
+        self.preview_action.setCheckable(True)
+        self.preview_action.setShortcut(QKeySequence("Ctrl+Shift+P"))
+        self.preview_action.toggled.connect(self.recipe_preview.setVisible)
+        view_menu.addAction(self.preview_action)
+
         recipe_menu = menu_bar.addMenu("&Recipe")
         self.assistant_action = QAction("AI Assistant...", self)
         self.assistant_action.triggered.connect(self.open_assistant)
         recipe_menu.addAction(self.assistant_action)
 
+        self.batch_assistant_action = QAction("Batch AI Assistant...", self)
+        self.batch_assistant_action.triggered.connect(self.open_batch_assistant)
+        recipe_menu.addAction(self.batch_assistant_action)
+
+        recipe_menu.addSeparator()
+        assistant_stats_action = QAction("Assistant Statistics...", self)
+        assistant_stats_action.triggered.connect(lambda: TelemetryDialog(self).exec())
+        recipe_menu.addAction(assistant_stats_action)
+        clear_cache_action = QAction("Clear Assistant Cache", self)
+        clear_cache_action.triggered.connect(self.clear_assistant_cache)
+        recipe_menu.addAction(clear_cache_action)
+
         help_menu = menu_bar.addMenu("&Help")
         about_action = QAction("&About", self)
         about_action.triggered.connect(self.show_about_dialog)
@@ -186,10 +231,11 @@ class MainWindow(QMainWindow):
         has_selection = self.current_recipe_id is not None
         self.delete_action.setEnabled(has_selection)
         self.assistant_action.setEnabled(has_selection)
-        self.export_recipe_action.setEnabled(has_selection)
-        has_recipes = bool(self.lib.list_recipes())
-        self.export_cookbook_action.setEnabled(has_recipes)
+        self.export_recipe_action.setEnabled(has_selection and not self.is_exporting)
+        has_recipes = self.lib.count_recipes() > 0
+        self.export_cookbook_action.setEnabled(has_recipes and not self.is_exporting)
         self.export_library_action.setEnabled(has_recipes)
+        self.batch_assistant_action.setEnabled(has_recipes)
 
     async def import_from_url(self):
         url, ok = QInputDialog.getText(self, "Import Recipe", "Enter URL:")
@@ -202,6 +248,8 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage(f"Importing from {url}...")
         QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
+            from src.recipe_box.jsonld import recipe_from_url
+
             imported_recipe = recipe_from_url(url)
             self.recipe_browser.select_recipe(None)
             self.current_recipe_id = None
@@ -316,7 +364,48 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage(f"Deleted '{recipe.title}'", 3000)
             self.update_action_states()
 
+    async def stream_recipes(self):
+        """Fills the browser from a worker thread in chunks, so a large
+        library never holds up the window. A load_recipes call while this
+        runs supersedes it."""
+        self._load_generation += 1
+        generation = self._load_generation
+        loop = asyncio.get_running_loop()
+        self.statusBar().showMessage("Loading recipes...")
+
+        def add_chunk(chunk: list[RecipeSummary]):
+            if generation == self._load_generation:
+                self.recipe_browser.add_recipes(chunk)
+
+        def read_summaries():
+            # SQLite connections can't be shared with this worker thread.
+            library = Library(get_db_path())
+            try:
+                chunk = []
+                for summary in library.iter_summaries():
+                    if generation != self._load_generation:
+                        return
+                    chunk.append(summary)
+                    if len(chunk) >= LOAD_CHUNK_SIZE:
+                        loop.call_soon_threadsafe(add_chunk, chunk)
+                        chunk = []
+                loop.call_soon_threadsafe(add_chunk, chunk)
+            finally:
+                library.close()
+
+        try:
+            await asyncio.to_thread(read_summaries)
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Library Error", f"Could not load the library:\n\n{e}"
+            )
+        finally:
+            if generation == self._load_generation:
+                self.statusBar().clearMessage()
+                self.update_action_states()
+
     def load_recipes(self):
+        self._load_generation += 1
         recipes = self.lib.list_recipes()
         self.recipe_browser.populate(recipes)
         self.update_action_states()
@@ -351,50 +440,100 @@ class MainWindow(QMainWindow):
                 self.load_recipes()
         self.update_action_states()
 
+    def prune_assistant_clients(self):
+        # Until the assistant is first used there are no clients to prune,
+        # and no reason to load instructor.
+        assistant = sys.modules.get("src.recipe_box.assistant")
+        if assistant is not None:
+            assistant.prune_clients(self.preferences.data.ai_providers)
+
+    def clear_assistant_cache(self):
+        from src.recipe_box.assistant import clear_response_cache
+
+        if clear_response_cache():
+            self.statusBar().showMessage("Cleared the assistant cache.", 5000)
+        else:
+            self.statusBar().showMessage("Could not clear the assistant cache.", 5000)
+
     def open_assistant(self):
         if self.current_recipe_id is None:
             self.statusBar().showMessage("Please select a recipe first.", 2000)
             return
 
+        from src.recipe_box.assistant import AssistantDialog
+
         original_text = self.recipe_editor.toPlainText()
         dialog = AssistantDialog(original_text, self)
         dialog.accepted_with_text.connect(self.recipe_editor.setPlainText)
         dialog.exec()
 
-    def run_typst_process(self, typst_source):
+    def open_batch_assistant(self):
+        if not self._prompt_save_if_dirty():
+            return
+
+        recipes = self.lib.list_recipes()
+        categories = sorted({recipe.category for recipe in recipes})
+        current_category = None
+        if self.current_recipe_id is not None:
+            if current_recipe := self.lib.get_recipe(self.current_recipe_id):
+                current_category = current_recipe.category
+        scopes = ["All Recipes", *categories]
+        scope, ok = QInputDialog.getItem(
+            self,
+            "Batch AI Assistant",
+            "Apply to:",
+            scopes,
+            scopes.index(current_category) if current_category else 0,
+            False,
+        )
+        if not ok:
+            return
+        if scope != "All Recipes":
+            recipes = [recipe for recipe in recipes if recipe.category == scope]
+
+        from src.recipe_box.assistant import BatchAssistantDialog
+
+        dialog = BatchAssistantDialog(recipes, self)
+        dialog.accepted_recipes.connect(self.apply_batch_results)
+        dialog.exec()
+
+    def apply_batch_results(self, recipes: list[Recipe]):
+        if not recipes:
+            return
         try:
-            with tempfile.TemporaryDirectory() as tempdir:
-                source_path = Path(tempdir) / "recipe.typ"
-                pdf_path = Path(tempdir) / "recipe.pdf"
-
-                with open(source_path, "w", encoding="utf-8") as f:
-                    f.write(typst_source)
-
-                # TODO: Add preference for Typst path
-                command = [
-                    "typst",
-                    "compile",
-                    str(source_path),
-                    str(pdf_path),
-                ]
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    encoding="utf-8",
-                    check=False,
-                )
+            self.lib.update_recipes(recipes)
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Update Error", f"No recipes were updated:\n\n{e}"
+            )
+            return
 
-                if result.returncode != 0:
-                    return None, f"Typst error: {result.stderr}"
+        self.load_recipes()
+        updated = {recipe.id: recipe for recipe in recipes}
+        if self.current_recipe_id in updated:
+            recipe = updated[self.current_recipe_id]
+            self.recipe_editor.set_content(recipe.serialize())
+            self.setWindowTitle(f"{recipe.title} - Recipe Box")
+        self.recipe_browser.select_recipe(self.current_recipe_id)
+        self.statusBar().showMessage(f"Updated {len(recipes)} recipes.", 5000)
+
+    def run_typst_process(self, write_source: Callable[[TextIO], object]):
+        return self._typst_result(
+            lambda: self.typst_compiler.compile_with(write_source)
+        )
 
-                with open(pdf_path, "rb") as f:
-                    return f.read(), None
+    def _typst_result(
+        self, compile: Callable[[], bytes]
+    ) -> tuple[bytes | None, str | None]:
+        try:
+            return compile(), None
         except FileNotFoundError:
             return (
                 None,
                 "Typst command not found. Please ensure it is in your system's PATH.",
             )
+        except RuntimeError as e:
+            return None, str(e)
         except Exception as e:
             return None, f"An error occurred during PDF generation: {e}"
 
@@ -413,33 +552,12 @@ class MainWindow(QMainWindow):
         if not filepath:
             return
 
-        self.statusBar().showMessage(f"Exporting '{recipe.title}' to PDF...", 3000)
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-
-        try:
-            typst_source = TypstRenderer.render([recipe])
-            pdf_data, error = self.run_typst_process(typst_source)
-
-            if error:
-                QMessageBox.critical(self, "Export Failed", error)
-                self.statusBar().showMessage("Export failed.", 5000)
-            else:
-                with open(filepath, "wb") as f:
-                    f.write(pdf_data)
-                self.statusBar().showMessage(
-                    f"Successfully exported to {Path(filepath).name}", 5000
-                )
-        except Exception as e:
-            QMessageBox.critical(
-                self, "Export Error", f"An unexpected error occurred: {e}"
-            )
-            self.statusBar().showMessage("Export failed.", 5000)
-        finally:
-            QApplication.restoreOverrideCursor()
+        await self._export_pdf(
+            filepath, [recipe], message=f"Exporting '{recipe.title}' to PDF..."
+        )
 
     async def export_cookbook(self):
-        all_recipes = self.lib.list_recipes()
-        if not all_recipes:
+        if not self.lib.count_recipes():
             QMessageBox.information(
                 self,
                 "Export Cookbook",
@@ -468,23 +586,71 @@ class MainWindow(QMainWindow):
         if not filepath:
             return
 
-        self.statusBar().showMessage("Exporting cookbook to PDF...", 3000)
-        QApplication.setOverrideCursor(Qt.WaitCursor)
+        await self._export_pdf(
+            filepath,
+            None,
+            title=title,
+            subtitle=subtitle,
+            message="Exporting cookbook to PDF...",
+        )
 
+    def _build_pdf(
+        self, recipes: list[Recipe] | None, title: str | None, subtitle: str | None
+    ) -> tuple[bytes | None, str | None]:
+        if recipes is not None:
+            return self._compile_recipes(lambda: recipes, len(recipes), title, subtitle)
+
+        # Whole-library exports stream recipes from a connection of their own,
+        # since SQLite connections can't be shared with this worker thread.
+        library = Library(get_db_path())
         try:
-            typst_source = TypstRenderer.render(
-                all_recipes, title=title, subtitle=subtitle
+            return self._compile_recipes(
+                library.iter_recipes, library.count_recipes(), title, subtitle
+            )
+        finally:
+            library.close()
+
+    def _compile_recipes(
+        self,
+        recipes: Callable[[], Iterable[Recipe]],
+        recipe_count: int,
+        title: str | None,
+        subtitle: str | None,
+    ) -> tuple[bytes | None, str | None]:
+        return self._typst_result(
+            lambda: self.typst_compiler.compile_recipes(
+                recipes, recipe_count, title, subtitle
+            )
+        )
+
+    async def _export_pdf(
+        self,
+        filepath: str,
+        recipes: list[Recipe] | None,
+        title: str | None = None,
+        subtitle: str | None = None,
+        message: str = "Exporting to PDF...",
+    ):
+        self.statusBar().showMessage(message)
+        self._set_exporting(True)
+
+        try:
+            # Rendering and compiling run on a worker thread so the window
+            # stays responsive; the library is only touched from this thread.
+            pdf_data, error = await asyncio.to_thread(
+                self._build_pdf, recipes, title, subtitle
             )
-            pdf_data, error = self.run_typst_process(typst_source)
 
-            if error:
+            if self.export_cancelled:
+                self.statusBar().showMessage("Export cancelled.", 5000)
+            elif error:
                 QMessageBox.critical(self, "Export Failed", error)
                 self.statusBar().showMessage("Export failed.", 5000)
             else:
                 with open(filepath, "wb") as f:
                     f.write(pdf_data)
                 self.statusBar().showMessage(
-                    f"Successfully exported cookbook to {Path(filepath).name}", 5000
+                    f"Successfully exported to {Path(filepath).name}", 5000
                 )
         except Exception as e:
             QMessageBox.critical(
@@ -492,36 +658,23 @@ class MainWindow(QMainWindow):
             )
             self.statusBar().showMessage("Export failed.", 5000)
         finally:
-            QApplication.restoreOverrideCursor()
+            self._set_exporting(False)
+
+    def _set_exporting(self, exporting: bool):
+        self.is_exporting = exporting
+        self.export_cancelled = False
+        if exporting:
+            self.typst_compiler.reset_cancel()
+        self.export_progress.setVisible(exporting)
+        self.cancel_export_button.setVisible(exporting)
+        self.cancel_export_button.setEnabled(exporting)
+        self.update_action_states()
 
-    def _create_zip_archive(self, filepath: str, recipes: list[Recipe]):
-        with zipfile.ZipFile(filepath, "w", zipfile.ZIP_DEFLATED) as zf:
-            for recipe in recipes:
-                if recipe.title:
-                    filename = f"{slugify(recipe.title)}.txt"
-                else:
-                    # Fallback for untitled recipes
-                    filename = f"recipe-{recipe.id}.txt"
-                content = recipe.serialize()
-                zf.writestr(filename, content)
-
-    def _read_zip_archive(self, filepath: str) -> tuple[int, int]:
-        imported_count = 0
-        failed_count = 0
-        with zipfile.ZipFile(filepath, "r") as zf:
-            for filename in zf.namelist():
-                if not filename.lower().endswith(".txt"):
-                    continue
-                try:
-                    content = zf.read(filename).decode("utf-8")
-                    if content.strip():
-                        recipe = Recipe.parse(content)
-                        self.lib.add_recipe(recipe)
-                        imported_count += 1
-                except Exception as e:
-                    print(e)
-                    failed_count += 1
-        return imported_count, failed_count
+    def cancel_export(self):
+        self.export_cancelled = True
+        self.cancel_export_button.setEnabled(False)
+        self.statusBar().showMessage("Cancelling export...")
+        self.typst_compiler.cancel()
 
     async def import_library(self):
         if not self._prompt_save_if_dirty():
@@ -536,7 +689,7 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage("Importing library from .zip...", 3000)
         QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            imported_count, failed_count = self._read_zip_archive(filepath)
+            imported_count, failed_count = read_zip_archive(self.lib, filepath)
             self.load_recipes()
 
             summary = f"Imported {imported_count} recipes."
@@ -552,6 +705,49 @@ class MainWindow(QMainWindow):
         finally:
             QApplication.restoreOverrideCursor()
 
+    async def import_saved_pages(self):
+        if not self._prompt_save_if_dirty():
+            return
+
+        directory = QFileDialog.getExistingDirectory(
+            self, "Import Saved HTML Pages and WARC Archives"
+        )
+        if not directory:
+            return
+
+        from src.recipe_box.jsonld import import_recipes_from_path
+
+        def import_pages() -> tuple[int, int]:
+            # SQLite connections can't be shared with this worker thread.
+            library = Library(get_db_path())
+            try:
+                return import_recipes_from_path(library, directory)
+            finally:
+                library.close()
+
+        self.statusBar().showMessage("Importing saved pages...")
+        self.import_saved_pages_action.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.BusyCursor)
+        try:
+            # Parsing runs in a process pool fed from a worker thread, so the
+            # window stays responsive through a large import.
+            imported_count, failed_count = await asyncio.to_thread(import_pages)
+            self.load_recipes()
+
+            summary = f"Imported {imported_count} recipes."
+            if failed_count > 0:
+                summary += f" {failed_count} pages failed to import."
+            self.statusBar().showMessage(summary, 5000)
+            QMessageBox.information(self, "Import Complete", summary)
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Import Error", f"An unexpected error occurred: {e}"
+            )
+            self.statusBar().showMessage("Import failed.", 5000)
+        finally:
+            self.import_saved_pages_action.setEnabled(True)
+            QApplication.restoreOverrideCursor()
+
     async def export_library(self):
         """Exports the entire recipe library to a zip file."""
         all_recipes = self.lib.list_recipes()
@@ -574,7 +770,7 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage("Exporting library to .zip...", 3000)
         QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            self._create_zip_archive(filepath, all_recipes)
+            write_zip_archive(filepath, all_recipes)
             self.statusBar().showMessage(
                 f"Successfully exported library to {Path(filepath).name}", 5000
             )
@@ -587,15 +783,32 @@ class MainWindow(QMainWindow):
             QApplication.restoreOverrideCursor()
 
     def closeEvent(self, event):
+        if self.is_exporting:
+            self.cancel_export()
         if self._prompt_save_if_dirty():
             self.lib.close()
+            self.typst_compiler.close()
+            self.preview_compiler.close()
             event.accept()
         else:
             event.ignore()
 
 
 def main():
-    app = QApplication(sys.argv)
+    # Qt takes its own options from the rest of the command line.
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--profile-output")
+    args, qt_args = parser.parse_known_args(sys.argv[1:])
+    # Run as a script, this module is __main__ rather than
+    # src.recipe_box.main, where the profiling targets look for it.
+    start_profiling(
+        args.profile,
+        args.profile_output,
+        modules={"src.recipe_box.main": sys.modules[__name__]},
+    )
+
+    app = QApplication([sys.argv[0], *qt_args])
     app.setStyle("fusion")
     window = MainWindow()
     window.show()
@@ -65,6 +65,31 @@ class Recipe:
     def content(self) -> str:
         return self.serialize()
 
+    # A title line, as Recipe.parse reads it.
+    _TITLE_REGEX = re.compile(r"^\s*=(.*)$", re.MULTILINE)
+    _METADATA_END_REGEX = re.compile(r"^---$", re.MULTILINE)
+
+    @classmethod
+    def parse_header(cls, recipe_text: str) -> Recipe:
+        """Reads only the title and metadata, as Recipe.parse would, without
+        parsing the steps. The recipe has no components."""
+        text = recipe_text.strip()
+        metadata = {}
+        first_line, _, rest = text.partition("\n")
+        if first_line.strip() == "---" and (
+            end := cls._METADATA_END_REGEX.search(rest)
+        ):
+            for line in rest[: end.start()].split("\n"):
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    metadata[key.strip()] = value.strip()
+            text = rest[end.end() :]
+
+        titles = cls._TITLE_REGEX.findall(text)
+        if not titles or not (title := titles[-1].strip()):
+            raise ValueError("No recipe title.")
+        return cls(title=title, metadata=metadata)
+
     @classmethod
     def parse(cls, recipe_text: str) -> Recipe:
         if not recipe_text.strip():
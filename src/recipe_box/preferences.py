@@ -39,6 +39,7 @@ from src.recipe_box.theme import DEFAULT_THEME, MARGIN
 class AIProvider:
     model: str | None = ""
     api_key: str | None = ""
+    requests_per_minute: int | None = None
 
 
 @dataclass
@@ -98,6 +99,11 @@ class Preferences(QObject):
 
         self.data = AppPreferences()
         self.themes: list[Theme] = []
+        # The resolved theme colors, with the theme setting and system color
+        # scheme they were resolved for.
+        self._theme_colors: (
+            tuple[tuple[str | None, Qt.ColorScheme], dict[str, str]] | None
+        ) = None
 
         self._load_themes()
         self.load()
@@ -107,8 +113,11 @@ class Preferences(QObject):
             app.installEventFilter(self)
 
     def eventFilter(self, watched: QObject, event: QEvent) -> bool:
-        if event.type() == QEvent.Type.ThemeChange:
-            if self.data.theme is None:
+        if event.type() == QEvent.Type.ThemeChange and self.data.theme is None:
+            # Qt sends ThemeChange to every widget, so only pass on the ones
+            # that change the colors.
+            previous = self._theme_colors
+            if previous is None or self.get_theme_colors() is not previous[1]:
                 self.preferencesChanged.emit()
         return super().eventFilter(watched, event)
 
@@ -125,6 +134,7 @@ class Preferences(QObject):
             print(f"Error loading themes: {e}")
             default_themes = deepcopy(DEFAULT_THEME["themes"])
             self.themes = [Theme(**t) for t in default_themes]
+        self._theme_colors = None
 
     def _create_default_themes_file(self):
         try:
@@ -168,11 +178,24 @@ class Preferences(QObject):
             print(f"Error saving preferences: {e}")
 
     def get_theme_colors(self) -> dict[str, str]:
-        theme_name_to_use = self.data.theme
-
-        if not theme_name_to_use:
+        """Returns the chosen theme's colors. They're cached until the choice,
+        the themes or the system color scheme change, so callers get the same
+        dict back until then and shouldn't modify it."""
+        color_scheme = Qt.ColorScheme.Unknown
+        if not self.data.theme:
             app = QApplication.instance()
-            if app and app.styleHints().colorScheme() == Qt.ColorScheme.Dark:
+            if app:
+                color_scheme = app.styleHints().colorScheme()
+        key = (self.data.theme, color_scheme)
+        if self._theme_colors is None or self._theme_colors[0] != key:
+            self._theme_colors = (key, self._resolve_theme_colors(*key))
+        return self._theme_colors[1]
+
+    def _resolve_theme_colors(
+        self, theme_name_to_use: str | None, color_scheme: Qt.ColorScheme
+    ) -> dict[str, str]:
+        if not theme_name_to_use:
+            if color_scheme == Qt.ColorScheme.Dark:
                 theme_name_to_use = "Dark"
             else:
                 theme_name_to_use = "Light"
@@ -198,7 +221,7 @@ class ProviderModel(QAbstractTableModel):
     def __init__(self, providers: list[AIProvider], parent=None):
         super().__init__(parent)
         self._providers = providers
-        self._headers = ["Model", "API Key"]
+        self._headers = ["Model", "API Key", "Requests/min"]
 
     def rowCount(self, parent=QModelIndex()):
         return len(self._providers)
@@ -218,11 +241,15 @@ class ProviderModel(QAbstractTableModel):
                 return provider.model
             if col == 1:
                 return "********" if provider.api_key else ""
+            if col == 2:
+                return provider.requests_per_minute or ""
         elif role == Qt.ItemDataRole.EditRole:
             if col == 0:
                 return provider.model
             if col == 1:
                 return provider.api_key
+            if col == 2:
+                return str(provider.requests_per_minute or "")
         return None
 
     def setData(self, index: QModelIndex, value: str, role=Qt.ItemDataRole.EditRole):
@@ -236,6 +263,11 @@ class ProviderModel(QAbstractTableModel):
             provider.model = value or None
         elif col == 1:
             provider.api_key = value or None
+        elif col == 2:
+            value = value.strip()
+            if value and not value.isdigit():
+                return False
+            provider.requests_per_minute = int(value) if value and int(value) else None
         else:
             return False
 
@@ -390,6 +422,7 @@ class PreferencesDialog(QDialog):
         header = self.provider_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
 
         self.add_button = QPushButton("Add")
         self.remove_button = QPushButton("Remove")
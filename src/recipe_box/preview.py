@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, Qt, QTimer
+from PySide6.QtPdf import QPdfDocument
+from PySide6.QtPdfWidgets import QPdfView
+from PySide6.QtWidgets import QLabel, QTextEdit, QVBoxLayout, QWidget
+
+from src.recipe_box.compiler import TypstCompiler
+from src.recipe_box.models import Recipe
+from src.recipe_box.rendering import TypstRenderer
+from src.recipe_box.theme import MARGIN
+
+
+class RecipePreview(QWidget):
+    """Shows the recipe in an editor as it will be exported, recompiling it
+    a short while after the user stops typing."""
+
+    DEBOUNCE_MS = 500
+
+    def __init__(self, editor: QTextEdit, compiler: TypstCompiler, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.compiler = compiler
+
+        # Each debounced edit bumps the requested generation; a compile whose
+        # generation is no longer current when it finishes is thrown away.
+        self._requested_generation = 0
+        self._shown_generation = 0
+        self._is_rendering = False
+        self._pdf_buffer: QBuffer | None = None
+        self._scroll_position: int | None = None
+
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._layout.setSpacing(MARGIN)
+
+        self._document = QPdfDocument(self)
+        self._document.statusChanged.connect(self._restore_scroll_position)
+        self._view = QPdfView()
+        self._view.setDocument(self._document)
+        self._view.setPageMode(QPdfView.PageMode.MultiPage)
+        self._view.setZoomMode(QPdfView.ZoomMode.FitToWidth)
+
+        self._status_label = QLabel()
+        self._status_label.setWordWrap(True)
+        self._status_label.setTextInteractionFlags(
+            Qt.TextInteractionFlag.TextSelectableByMouse
+        )
+        self._status_label.setVisible(False)
+
+        self._layout.addWidget(self._view)
+        self._layout.addWidget(self._status_label)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.editor.textChanged.connect(self._timer.start)
+
+    def refresh(self):
+        self._timer.stop()
+        self._requested_generation += 1
+        if self.isVisible():
+            asyncio.ensure_future(self._render())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._shown_generation != self._requested_generation:
+            asyncio.ensure_future(self._render())
+
+    async def _render(self):
+        # Only one compile runs at a time. Edits made meanwhile are picked up
+        # by the loop once it finishes, so no render ever queues behind
+        # another that is already out of date.
+        if self._is_rendering:
+            return
+        self._is_rendering = True
+        try:
+            while (
+                self._shown_generation != self._requested_generation
+                and self.isVisible()
+            ):
+                generation = self._requested_generation
+                text = self.editor.toPlainText()
+                pdf_data, error = await asyncio.to_thread(self._build_pdf, text)
+                if generation != self._requested_generation:
+                    continue
+                self._shown_generation = generation
+                if error:
+                    self._show_error(error)
+                elif pdf_data:
+                    self._show_pdf(pdf_data)
+                else:
+                    self._status_label.setVisible(False)
+                    self._document.close()
+        finally:
+            self._is_rendering = False
+
+    def _build_pdf(self, text: str) -> tuple[bytes | None, str | None]:
+        if not text.strip():
+            return None, None
+        try:
+            recipe = Recipe.parse(text)
+        except ValueError as e:
+            return None, f"Preview not updated: {e}"
+        try:
+            return self.compiler.compile(TypstRenderer.render([recipe])), None
+        except FileNotFoundError:
+            return (
+                None,
+                "Typst command not found. Please ensure it is in your system's PATH.",
+            )
+        except RuntimeError as e:
+            return None, str(e)
+
+    def _show_error(self, error: str):
+        # The last good render stays on screen while the recipe is invalid.
+        self._status_label.setText(error)
+        self._status_label.setVisible(True)
+
+    def _show_pdf(self, pdf_data: bytes):
+        self._status_label.setVisible(False)
+        if self._document.status() == QPdfDocument.Status.Ready:
+            self._scroll_position = self._view.verticalScrollBar().value()
+
+        # QPdfDocument reads from the device lazily, so the buffer has to
+        # outlive the load; the previous one is released only after it.
+        previous_buffer = self._pdf_buffer
+        self._pdf_buffer = QBuffer(self)
+        self._pdf_buffer.setData(QByteArray(pdf_data))
+        self._pdf_buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        self._document.load(self._pdf_buffer)
+        if previous_buffer is not None:
+            previous_buffer.deleteLater()
+
+    def _restore_scroll_position(self, status: QPdfDocument.Status):
+        if status == QPdfDocument.Status.Ready and self._scroll_position is not None:
+            self._view.verticalScrollBar().setValue(self._scroll_position)
+            self._scroll_position = None
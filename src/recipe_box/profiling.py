@@ -0,0 +1,225 @@
+"""Opt-in timing of the library, parsing, rendering and compiling paths.
+
+Set RECIPE_BOX_PROFILE=1, or pass --profile, to time the functions in
+TARGETS and print a histogram of each when the process exits. Setting it to
+a file path instead, or passing --profile-output PATH, also records a
+cProfile of the whole run there; tools such as snakeviz or flameprof read
+it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import bisect
+import cProfile
+import functools
+import importlib
+import inspect
+import os
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from types import ModuleType
+from typing import TextIO
+
+PROFILE_ENV = "RECIPE_BOX_PROFILE"
+
+# Functions to time, as module:qualified.name. Modules that haven't been
+# imported when profiling starts are skipped, so profiling the CLI doesn't
+# load Qt.
+TARGETS = [
+    "src.recipe_box.library:Library.add_recipe",
+    "src.recipe_box.library:Library.add_recipes",
+    "src.recipe_box.library:Library.get_recipe",
+    "src.recipe_box.library:Library.update_recipe",
+    "src.recipe_box.library:Library.update_recipes",
+    "src.recipe_box.library:Library.delete_recipe",
+    "src.recipe_box.library:Library.iter_recipes",
+    "src.recipe_box.library:Library.iter_summaries",
+    "src.recipe_box.library:Library.search_recipes",
+    "src.recipe_box.library:Library.count_recipes",
+    "src.recipe_box.models:Recipe.parse",
+    "src.recipe_box.models:Recipe.parse_header",
+    "src.recipe_box.models:Recipe.serialize",
+    "src.recipe_box.browser:RecipeTreeModel.populate",
+    "src.recipe_box.browser:RecipeTreeModel.add_recipes",
+    "src.recipe_box.rendering:TypstRenderer.render",
+    "src.recipe_box.rendering:TypstRenderer.render_to",
+    "src.recipe_box.compiler:TypstCompiler.compile_with",
+    "src.recipe_box.compiler:TypstCompiler.compile_cookbook",
+    "src.recipe_box.main:MainWindow.__init__",
+    "src.recipe_box.main:MainWindow.run_typst_process",
+    "src.recipe_box.main:MainWindow.stream_recipes",
+]
+
+# Histogram bucket upper bounds, in seconds.
+_BUCKETS = [1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0]
+_BUCKET_LABELS = ["<10µs", "<100µs", "<1ms", "<10ms", "<100ms", "<1s", "≥1s"]
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+class Profiler:
+    """Records how long each wrapped function takes per call. Functions that
+    return generators are timed across the whole iteration, and coroutines
+    until they finish."""
+
+    def __init__(self, cprofile_path: str | None = None):
+        self.cprofile_path = cprofile_path
+        self.timings: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+        self._patched: list[tuple[type, str, object]] = []
+        self._cprofile: cProfile.Profile | None = None
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.timings.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def coroutine_wrapper(*args, **kwargs):
+                with self.timed(name):
+                    return await function(*args, **kwargs)
+
+            return coroutine_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                self.record(name, time.perf_counter() - start)
+                raise
+            elapsed = time.perf_counter() - start
+            if inspect.isgenerator(result):
+                return self._timed_iteration(name, result, elapsed)
+            self.record(name, elapsed)
+            return result
+
+        return wrapper
+
+    def _timed_iteration(
+        self, name: str, iterator: Iterator, elapsed: float
+    ) -> Iterator:
+        # Only the time spent producing items counts, not the consumer's.
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            iterator.close()
+            self.record(name, elapsed)
+
+    def install(
+        self,
+        targets: list[str] = TARGETS,
+        modules: Mapping[str, ModuleType] | None = None,
+    ) -> Profiler:
+        """Wraps the targets. modules maps module names to modules to use
+        instead of the imported ones, e.g. for a module running as __main__."""
+        modules = modules or {}
+        for target in targets:
+            module_name, qualified_name = target.split(":")
+            if module_name in modules:
+                owner = modules[module_name]
+            elif module_name in sys.modules:
+                owner = importlib.import_module(module_name)
+            else:
+                continue
+            *path, attribute = qualified_name.split(".")
+            for part in path:
+                owner = getattr(owner, part)
+            original = owner.__dict__[attribute]
+            if isinstance(original, (classmethod, staticmethod)):
+                patched = type(original)(self.wrap(qualified_name, original.__func__))
+            else:
+                patched = self.wrap(qualified_name, original)
+            setattr(owner, attribute, patched)
+            self._patched.append((owner, attribute, original))
+
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def uninstall(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+            self._cprofile = None
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched.clear()
+
+    def report(self, stream: TextIO = sys.stderr):
+        with self._lock:
+            timings = {name: list(values) for name, values in self.timings.items()}
+        stream.write("Profile (slowest total first)\n")
+        for name, values in sorted(timings.items(), key=lambda item: -sum(item[1])):
+            values.sort()
+            p90 = values[min(len(values) - 1, int(len(values) * 0.9))]
+            stream.write(
+                f"\n{name}: {len(values)} calls, total {_format_seconds(sum(values))}, "
+                f"median {_format_seconds(statistics.median(values))}, "
+                f"p90 {_format_seconds(p90)}, max {_format_seconds(values[-1])}\n"
+            )
+            counts = [0] * len(_BUCKET_LABELS)
+            for value in values:
+                counts[bisect.bisect_right(_BUCKETS, value)] += 1
+            widest = max(counts)
+            for label, count in zip(_BUCKET_LABELS, counts):
+                if count:
+                    bar = "#" * max(1, round(40 * count / widest))
+                    stream.write(f"  {label:>7} {count:8} {bar}\n")
+        if self.cprofile_path:
+            stream.write(f"\ncProfile written to {self.cprofile_path}\n")
+
+
+def start_profiling(
+    enabled: bool = False,
+    cprofile_path: str | None = None,
+    modules: Mapping[str, ModuleType] | None = None,
+) -> Profiler | None:
+    """Starts profiling if asked to by the arguments or the RECIPE_BOX_PROFILE
+    environment variable; the report is printed at exit."""
+    setting = os.environ.get(PROFILE_ENV, "")
+    if setting and setting.lower() not in ("0", "false", "no"):
+        enabled = True
+        if setting.lower() not in ("1", "true", "yes"):
+            cprofile_path = cprofile_path or setting
+    if not (enabled or cprofile_path):
+        return None
+    profiler = Profiler(cprofile_path).install(modules=modules)
+
+    def finish():
+        profiler.uninstall()
+        profiler.report()
+
+    atexit.register(finish)
+    return profiler
@@ -1,35 +1,63 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import io
+import itertools
+import os
+import pickle
 import re
-from collections import defaultdict
-from collections.abc import Iterable
+import shutil
+import tempfile
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TextIO
 
 from src.recipe_box import Recipe, Step
 
 
+@dataclass(frozen=True)
+class CookbookChunk:
+    category: str
+    recipes: list[Recipe]
+    starts_category: bool = True
+
+    def outline_entries(self) -> list[tuple[int, str, str | None]]:
+        """The heading level, title and source of each outline entry in the
+        chunk, which is all a merged cookbook needs to know about it."""
+        entries = [(1, self.category, None)] if self.starts_category else []
+        entries.extend((2, recipe.title, recipe.source) for recipe in self.recipes)
+        return entries
+
+
 class TypstRenderer:
-    _FRACTION_SLASH_REGEX = re.compile(r"(?<=\d)/(?=\d)")
-    _MULTIPLICATION_SIGN_REGEX = re.compile(r"(?<=\d)x(?=\d)")
-    _EN_DASH_REGEX = re.compile(r"(?<=\d)-(?=\d)")
+    _PAGE_NUMBER = (
+        "#text(8pt, [#counter(page).display() / #counter(page).final().at(0)])"
+    )
+    _SPOOL_MAX_SIZE = 4 * 1024 * 1024
+    _ENTRY_MARKER = "#context [#metadata(here().page()) <cookbook-entry>]"
+    # One pass over the text: a narrow no-break space before °F, and a
+    # fraction slash, multiplication sign or en dash between digits.
+    _FANCY_REGEX = re.compile(r"°F|(?<=\d)[/x-](?=\d)")
+    _FANCY_REPLACEMENTS = {
+        "°F": "\u202f°F",
+        "/": "\u2044",
+        "x": "\u00d7",
+        "-": "\u2013",
+    }
 
     @staticmethod
+    @functools.lru_cache(maxsize=8192)
     def _fancy(text: str | None) -> str:
         if not text or not text.strip():
             return ""
 
-        narrow_nbsp = "\u202f"
-        fraction_slash = "\u2044"
-        multiplication_sign = "\u00d7"
-        en_dash = "\u2013"
-
-        processed_text = text.replace("°F", f"{narrow_nbsp}°F")
-        processed_text = TypstRenderer._FRACTION_SLASH_REGEX.sub(
-            fraction_slash, processed_text
+        replacements = TypstRenderer._FANCY_REPLACEMENTS
+        return TypstRenderer._FANCY_REGEX.sub(
+            lambda match: replacements[match.group()], text
         )
-        processed_text = TypstRenderer._MULTIPLICATION_SIGN_REGEX.sub(
-            multiplication_sign, processed_text
-        )
-        processed_text = TypstRenderer._EN_DASH_REGEX.sub(en_dash, processed_text)
-
-        return processed_text
 
     @staticmethod
     def _typst_header() -> str:
@@ -114,16 +142,35 @@ class TypstRenderer:
 """.strip()
 
     @staticmethod
-    def _render_single_recipe(recipe: Recipe, title_heading_level: int = 1) -> str:
-        typst = []
+    def _render_single_recipe(
+        recipe: Recipe, title_heading_level: int = 1, page_numbers: bool = True
+    ) -> str:
+        return (
+            TypstRenderer._render_footer(recipe, page_numbers)
+            + "\n\n"
+            + TypstRenderer._render_recipe_body(recipe, title_heading_level)
+        )
+
+    @staticmethod
+    def _render_footer(recipe: Recipe, page_numbers: bool = True) -> str:
+        # Kept out of the recipe body: a `#set page` inside an included
+        # fragment would end with the fragment, before the pages that follow.
         source = recipe.source
+        page_number = TypstRenderer._PAGE_NUMBER if page_numbers else ""
 
         if source and source.strip():
-            footer_content = f"#text(8pt)[{TypstRenderer._fancy(source)}] #h(1fr) #text(8pt, [#counter(page).display() / #counter(page).final().at(0)])"
+            footer_content = (
+                f"#text(8pt)[{TypstRenderer._fancy(source)}] #h(1fr) {page_number}"
+            )
+        elif page_numbers:
+            footer_content = f"#h(1fr) {page_number} #h(1fr)"
         else:
-            footer_content = "#h(1fr) #text(8pt, [#counter(page).display() / #counter(page).final().at(0)]) #h(1fr)"
-        typst.append(f"#set page(footer: context [{footer_content}])")
+            footer_content = ""
+        return f"#set page(footer: context [{footer_content.strip()}])"
 
+    @staticmethod
+    def _render_recipe_body(recipe: Recipe, title_heading_level: int = 1) -> str:
+        typst = []
         title = (
             recipe.title if recipe.title and recipe.title.strip() else "Untitled Recipe"
         )
@@ -157,9 +204,7 @@ class TypstRenderer:
         return "\n\n".join(typst)
 
     @staticmethod
-    def _render_cookbook(
-        recipes: Iterable[Recipe], title: str | None, subtitle: str | None
-    ) -> list[str]:
+    def _render_front_matter(title: str | None, subtitle: str | None) -> list[str]:
         typst = []
 
         if (title and title.strip()) or (subtitle and subtitle.strip()):
@@ -183,46 +228,314 @@ class TypstRenderer:
                 "#counter(page).update(1)",
             ]
         )
+        return typst
+
+    @classmethod
+    def render(
+        cls,
+        recipes: Iterable[Recipe],
+        title: str | None = None,
+        subtitle: str | None = None,
+        fragment_cache: FragmentCache | None = None,
+    ) -> str:
+        buffer = io.StringIO()
+        cls.render_to(buffer, recipes, title, subtitle, fragment_cache)
+        return buffer.getvalue()
+
+    @classmethod
+    def render_to(
+        cls,
+        stream: TextIO,
+        recipes: Iterable[Recipe],
+        title: str | None = None,
+        subtitle: str | None = None,
+        fragment_cache: FragmentCache | None = None,
+    ):
+        recipes = iter(recipes)
+        first = next(recipes, None)
+        second = next(recipes, None) if first is not None else None
+        wrote_part = False
+
+        def write_part(text: str):
+            nonlocal wrote_part
+            if wrote_part:
+                stream.write("\n\n")
+            stream.write(text)
+            wrote_part = True
+
+        write_part(cls._typst_header())
+
+        if first is not None and second is None:
+            if fragment_cache is not None:
+                write_part(fragment_cache.fragment(first))
+            else:
+                write_part(cls._render_single_recipe(first))
+            return
+
+        for part in cls._render_front_matter(title, subtitle):
+            write_part(part)
+
+        if first is None:
+            return
+
+        # Categories are only known once every recipe has been seen, so each
+        # category's recipes are spooled (to disk once large) in input order
+        # and copied out in sorted category order at the end.
+        spools: dict[str, tempfile.SpooledTemporaryFile] = {}
+        try:
+            for recipe in itertools.chain((first, second), recipes):
+                spool = spools.get(recipe.category)
+                if spool is None:
+                    spool = tempfile.SpooledTemporaryFile(
+                        max_size=cls._SPOOL_MAX_SIZE, mode="w+", encoding="utf-8"
+                    )
+                    spools[recipe.category] = spool
+                else:
+                    spool.write("\n\n#pagebreak()\n\n")
+
+                if fragment_cache is not None:
+                    spool.write(fragment_cache.include(recipe, title_heading_level=2))
+                else:
+                    spool.write(
+                        cls._render_single_recipe(recipe, title_heading_level=2)
+                    )
+
+            sorted_categories = sorted(spools)
+            for cat_idx, category in enumerate(sorted_categories):
+                write_part("#v(5cm)")
+                write_part(f"#align(center)[#heading(level: 1)[{category}]]")
+                write_part("#pagebreak()")
+
+                spool = spools[category]
+                spool.seek(0)
+                stream.write("\n\n")
+                shutil.copyfileobj(spool, stream)
 
-        recipes_by_category = defaultdict(list)
-        for recipe in recipes:
-            recipes_by_category[recipe.category].append(recipe)
+                if cat_idx < len(sorted_categories) - 1:
+                    write_part("#pagebreak()")
+        finally:
+            for spool in spools.values():
+                spool.close()
 
-        sorted_categories = sorted(recipes_by_category.items())
+    @classmethod
+    def split_cookbook(
+        cls, recipes: Iterable[Recipe], chunk_size: int = 100
+    ) -> Iterator[CookbookChunk]:
+        """Yields chunks of up to chunk_size recipes from one category, in
+        sorted category order. As in render_to, recipes are spooled per
+        category until every one has been seen, so only one chunk is held in
+        memory at a time."""
+        spools: dict[str, tempfile.SpooledTemporaryFile] = {}
+        counts: Counter[str] = Counter()
+        try:
+            for recipe in recipes:
+                spool = spools.get(recipe.category)
+                if spool is None:
+                    spool = tempfile.SpooledTemporaryFile(max_size=cls._SPOOL_MAX_SIZE)
+                    spools[recipe.category] = spool
+                pickle.dump(recipe, spool)
+                counts[recipe.category] += 1
+
+            for category in sorted(spools):
+                spool = spools[category]
+                spool.seek(0)
+                for start in range(0, counts[category], chunk_size):
+                    size = min(chunk_size, counts[category] - start)
+                    yield CookbookChunk(
+                        category=category,
+                        recipes=[pickle.load(spool) for _ in range(size)],
+                        starts_category=start == 0,
+                    )
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+    @classmethod
+    def render_chunk(
+        cls, chunk: CookbookChunk, fragment_cache: FragmentCache | None = None
+    ) -> str:
+        # Chunks are compiled on their own and stitched together by
+        # render_merged_cookbook, which owns page numbers and the outline.
+        # Each entry marker records the page an entry starts on, plus one
+        # final marker for the last page.
+        typst_parts = [cls._typst_header()]
 
-        for cat_idx, (category, cat_recipes) in enumerate(sorted_categories):
-            typst.extend(
+        if chunk.starts_category:
+            typst_parts.extend(
                 [
+                    cls._ENTRY_MARKER,
                     "#v(5cm)",
-                    f"#align(center)[#heading(level: 1)[{category}]]",
+                    f"#align(center)[#heading(level: 1)[{chunk.category}]]",
                     "#pagebreak()",
                 ]
             )
-            for rec_idx, recipe in enumerate(cat_recipes):
-                typst.append(
-                    TypstRenderer._render_single_recipe(recipe, title_heading_level=2)
-                )
-                is_last_recipe = (
-                    rec_idx == len(cat_recipes) - 1
-                    and cat_idx == len(sorted_categories) - 1
-                )
-                if not is_last_recipe:
-                    typst.append("#pagebreak()")
 
-        return typst
+        for rec_idx, recipe in enumerate(chunk.recipes):
+            footer = cls._render_footer(recipe, page_numbers=False)
+            if fragment_cache is not None:
+                body = fragment_cache.body(recipe, title_heading_level=2)
+            else:
+                body = cls._render_recipe_body(recipe, title_heading_level=2)
+            typst_parts.extend([footer, cls._ENTRY_MARKER, body])
+            if rec_idx < len(chunk.recipes) - 1:
+                typst_parts.append("#pagebreak()")
+
+        typst_parts.append(cls._ENTRY_MARKER)
+        return "\n\n".join(typst_parts)
 
     @classmethod
-    def render(
+    def render_merged_cookbook(
         cls,
-        recipes: list[Recipe],
+        chunk_entries: list[list[tuple[int, str, str | None]]],
+        chunk_entry_pages: list[list[int]],
+        chunk_pdf_names: list[str],
         title: str | None = None,
         subtitle: str | None = None,
     ) -> str:
         typst_parts = [cls._typst_header()]
+        front_matter = cls._render_front_matter(title, subtitle)
+        # The first merged page starts a new page by itself, and resets the
+        # page counter there instead.
+        typst_parts.extend(front_matter[:-2])
 
-        if len(recipes) == 1:
-            typst_parts.append(cls._render_single_recipe(recipes[0]))
-        else:
-            typst_parts.extend(cls._render_cookbook(recipes, title, subtitle))
+        first_page = True
+        for entries, entry_pages, pdf_name in zip(
+            chunk_entries, chunk_entry_pages, chunk_pdf_names
+        ):
+            *start_pages, last_page = entry_pages
+
+            entry_index = 0
+            centered = True
+            for page in range(1, last_page + 1):
+                body = []
+                if first_page:
+                    body.append("#counter(page).update(1)")
+                body.append(
+                    f'#place(top + left, dx: -0.75in, dy: -0.75in, image("{pdf_name}", page: {page}, width: 8.5in, height: 11in))'
+                )
+                while entry_index < len(entries) and start_pages[entry_index] == page:
+                    level, entry_title, source = entries[entry_index]
+                    title_text = (
+                        entry_title
+                        if entry_title and entry_title.strip()
+                        else "Untitled Recipe"
+                    )
+                    body.append(f"#place(hide[#heading(level: {level})[{title_text}]])")
+                    centered = not (source and source.strip())
+                    entry_index += 1
+
+                if first_page:
+                    # As in a single document, the first category page comes
+                    # before any recipe has set a footer.
+                    footer = "none"
+                elif centered:
+                    footer = f"context [#h(1fr) {cls._PAGE_NUMBER} #h(1fr)]"
+                else:
+                    footer = f"context [#h(1fr) {cls._PAGE_NUMBER}]"
+                typst_parts.append(
+                    f"#page(footer: {footer})[\n  " + "\n  ".join(body) + "\n]"
+                )
+                first_page = False
 
         return "\n\n".join(typst_parts)
+
+
+class FragmentCache:
+    """Per-recipe Typst bodies keyed by a hash of the recipe content, held in
+    an in-memory LRU and written to `directory` so cookbooks can `#include`
+    them. `directory` must sit under the Typst project root. The page
+    footer isn't part of the body, since a `#set page` in an included file
+    doesn't outlast it; callers emit it before the body or include."""
+
+    # Bump when TypstRenderer's output changes so stale fragments are ignored.
+    VERSION = 2
+
+    def __init__(
+        self,
+        directory: Path,
+        root: Path,
+        max_entries: int = 4096,
+        max_files: int = 20_000,
+    ):
+        self.directory = Path(directory)
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self._fragments: OrderedDict[str, str] = OrderedDict()
+
+    def body(self, recipe: Recipe, title_heading_level: int = 1) -> str:
+        key = self._key(recipe, title_heading_level)
+        if (body := self._fragments.get(key)) is not None:
+            self._fragments.move_to_end(key)
+            return body
+
+        path = self._path(key)
+        try:
+            body = path.read_text(encoding="utf-8")
+            self._touch(path)
+        except FileNotFoundError:
+            body = TypstRenderer._render_recipe_body(recipe, title_heading_level)
+            self._write(path, body)
+
+        self._fragments[key] = body
+        if len(self._fragments) > self.max_entries:
+            self._fragments.popitem(last=False)
+        return body
+
+    def fragment(
+        self, recipe: Recipe, title_heading_level: int = 1, page_numbers: bool = True
+    ) -> str:
+        footer = TypstRenderer._render_footer(recipe, page_numbers)
+        return f"{footer}\n\n{self.body(recipe, title_heading_level)}"
+
+    def include(
+        self, recipe: Recipe, title_heading_level: int = 1, page_numbers: bool = True
+    ) -> str:
+        key = self._key(recipe, title_heading_level)
+        path = self._path(key)
+        if key not in self._fragments or not self._touch(path):
+            self._fragments.pop(key, None)
+            self.body(recipe, title_heading_level)
+        include_path = path.relative_to(self.root).as_posix()
+        footer = TypstRenderer._render_footer(recipe, page_numbers)
+        return f'{footer}\n\n#include "/{include_path}"'
+
+    def prune(self):
+        """Deletes the least recently used fragment files beyond max_files.
+        A deleted fragment is simply rendered again the next time."""
+        try:
+            files = [
+                (path.stat().st_mtime, path) for path in self.directory.rglob("*.typ")
+            ]
+        except OSError as e:
+            print(f"Warning: Could not prune Typst fragments: {e}")
+            return
+        if len(files) <= self.max_files:
+            return
+        files.sort()
+        for _, path in files[: len(files) - self.max_files]:
+            path.unlink(missing_ok=True)
+            self._fragments.pop(path.stem, None)
+
+    def _key(self, recipe: Recipe, title_heading_level: int) -> str:
+        content = f"{self.VERSION}:{title_heading_level}\n{recipe.serialize()}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.typ"
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        # Marks the file as used for prune(); returns whether it exists.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def _write(path: Path, fragment: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(fragment, encoding="utf-8")
+        os.replace(temp_path, path)
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import sqlite3
+import statistics
+import threading
+import time
+from dataclasses import astuple, dataclass, field, fields
+from pathlib import Path
+
+from PySide6.QtCore import QSize
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QDialog,
+    QDialogButtonBox,
+    QHeaderView,
+    QLabel,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from src.recipe_box.preferences import get_config_dir
+from src.recipe_box.theme import MARGIN
+
+
+@dataclass
+class AssistantCall:
+    """Timings in seconds and token counts for one assistant request. Fields
+    are None when that stage didn't run, e.g. no request for a cached
+    response."""
+
+    model: str
+    started: float = field(default_factory=time.time)
+    streamed: bool = False
+    cached: bool = False
+    client_setup: float | None = None
+    request: float | None = None
+    # For streamed requests, how long until the first partial result.
+    first_response: float | None = None
+    # One per request instructor sent; more than one means the response
+    # failed validation and was retried.
+    attempts: int = 0
+    prompt_tokens: int = 0
+    # As reported by the provider, when it does. Streamed responses don't
+    # report usage, so these stay None for them.
+    usage_prompt_tokens: int | None = None
+    usage_completion_tokens: int | None = None
+    diff_render: float | None = None
+    error: str | None = None
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+
+
+@dataclass(frozen=True)
+class ProviderStats:
+    model: str
+    calls: int
+    cached: int
+    # Streamed calls sent to the provider; they report no completion tokens.
+    streamed: int
+    errors: int
+    median_client_setup: float | None
+    median_request: float | None
+    median_first_response: float | None
+    median_diff_render: float | None
+    retries: int
+    mean_prompt_tokens: float | None
+    mean_completion_tokens: float | None
+
+
+def _median(values: list[float | None]) -> float | None:
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def _mean(values: list[float | None]) -> float | None:
+    values = [value for value in values if value is not None]
+    return statistics.fmean(values) if values else None
+
+
+_COLUMNS = [f.name for f in fields(AssistantCall)]
+
+
+class TelemetryLog:
+    """Keeps the most recent max_entries assistant calls on disk."""
+
+    def __init__(self, db_path: str | Path, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        db_path = Path(db_path).expanduser()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Calls are recorded from worker threads as well as the GUI thread.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS calls "
+                "(id INTEGER PRIMARY KEY, model TEXT NOT NULL, started REAL NOT NULL, "
+                "streamed INTEGER NOT NULL, cached INTEGER NOT NULL, "
+                "client_setup REAL, request REAL, first_response REAL, "
+                "attempts INTEGER NOT NULL, prompt_tokens INTEGER NOT NULL, "
+                "usage_prompt_tokens INTEGER, usage_completion_tokens INTEGER, "
+                "diff_render REAL, error TEXT)"
+            )
+
+    def record(self, call: AssistantCall):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO calls ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                astuple(call),
+            )
+            self._conn.execute(
+                "DELETE FROM calls WHERE id NOT IN "
+                "(SELECT id FROM calls ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def calls(self) -> list[AssistantCall]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM calls ORDER BY id"
+            ).fetchall()
+        return [
+            AssistantCall(*row[:2], bool(row[2]), bool(row[3]), *row[4:])
+            for row in rows
+        ]
+
+    def provider_stats(self) -> list[ProviderStats]:
+        """Per-model summaries, fastest median request first."""
+        by_model: dict[str, list[AssistantCall]] = {}
+        for call in self.calls():
+            by_model.setdefault(call.model, []).append(call)
+
+        stats = []
+        for model, calls in by_model.items():
+            # Cached responses never reached the provider, so they would
+            # flatter its timings.
+            sent = [call for call in calls if not call.cached]
+            stats.append(
+                ProviderStats(
+                    model=model,
+                    calls=len(calls),
+                    cached=len(calls) - len(sent),
+                    streamed=sum(call.streamed for call in sent),
+                    errors=sum(call.error is not None for call in calls),
+                    median_client_setup=_median([c.client_setup for c in sent]),
+                    median_request=_median(
+                        [c.request for c in sent if c.error is None]
+                    ),
+                    median_first_response=_median([c.first_response for c in sent]),
+                    median_diff_render=_median([c.diff_render for c in calls]),
+                    retries=sum(call.retries for call in sent),
+                    mean_prompt_tokens=_mean([c.prompt_tokens for c in sent]),
+                    mean_completion_tokens=_mean(
+                        [c.usage_completion_tokens for c in sent if not c.streamed]
+                    ),
+                )
+            )
+        stats.sort(
+            key=lambda s: (s.median_request is None, s.median_request or 0, s.model)
+        )
+        return stats
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM calls")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_telemetry_log: TelemetryLog | None = None
+_telemetry_log_lock = threading.Lock()
+
+
+def get_telemetry_log() -> TelemetryLog:
+    global _telemetry_log
+    with _telemetry_log_lock:
+        if _telemetry_log is None:
+            _telemetry_log = TelemetryLog(get_config_dir() / "assistant_telemetry.db")
+        return _telemetry_log
+
+
+def record_call(call: AssistantCall):
+    try:
+        get_telemetry_log().record(call)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not record assistant telemetry: {e}")
+
+
+def _format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "–"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.2f} s"
+
+
+def _format_number(value: float | None) -> str:
+    return "–" if value is None else f"{value:.0f}"
+
+
+class TelemetryDialog(QDialog):
+    """Summarizes recorded assistant calls per provider, to compare them."""
+
+    HEADERS = [
+        "Provider",
+        "Calls",
+        "Cached",
+        "Errors",
+        "Client Setup",
+        "Request",
+        "First Result",
+        "Diff Render",
+        "Retries",
+        "Prompt Tokens",
+        "Completion Tokens",
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Assistant Statistics")
+        self.resize(QSize(900, 300))
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(MARGIN, MARGIN, MARGIN, MARGIN)
+        layout.setSpacing(MARGIN)
+        layout.addWidget(
+            QLabel(
+                "Median timings per provider, fastest first. Tokens are "
+                "averages; prompt tokens are estimated before sending, and "
+                "completion tokens are only reported for calls that weren't "
+                "streamed."
+            )
+        )
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.ResizeMode.Stretch
+        )
+        layout.addWidget(self.table)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        clear_button = button_box.addButton(
+            "Clear", QDialogButtonBox.ButtonRole.ResetRole
+        )
+        clear_button.clicked.connect(self.clear)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+
+        self.refresh()
+
+    def refresh(self):
+        try:
+            stats = get_telemetry_log().provider_stats()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Could not read assistant telemetry: {e}")
+            stats = []
+
+        self.table.setRowCount(len(stats))
+        for row, provider in enumerate(stats):
+            if (
+                provider.streamed
+                and provider.streamed == provider.calls - provider.cached
+            ):
+                completion_tokens = "n/a"
+            else:
+                completion_tokens = _format_number(provider.mean_completion_tokens)
+            values = [
+                provider.model,
+                str(provider.calls),
+                str(provider.cached),
+                str(provider.errors),
+                _format_seconds(provider.median_client_setup),
+                _format_seconds(provider.median_request),
+                _format_seconds(provider.median_first_response),
+                _format_seconds(provider.median_diff_render),
+                str(provider.retries),
+                _format_number(provider.mean_prompt_tokens),
+                completion_tokens,
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.table.resizeColumnsToContents()
+
+    def clear(self):
+        try:
+            get_telemetry_log().clear()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Could not clear assistant telemetry: {e}")
+        self.refresh()
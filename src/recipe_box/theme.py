@@ -22,6 +22,7 @@ DEFAULT_THEME = {
                 "diff_added_background": "#bbffbb",
                 "diff_deleted_foreground": "#662222",
                 "diff_deleted_background": "#ffbbbb",
+                "error": "#cc0000",
             },
         },
         {
@@ -40,6 +41,7 @@ DEFAULT_THEME = {
                 "diff_added_background": "#223322",
                 "diff_deleted_foreground": "#cc6666",
                 "diff_deleted_background": "#332222",
+                "error": "#ff5555",
             },
         },
         {
@@ -58,6 +60,7 @@ DEFAULT_THEME = {
                 "diff_added_background": "#003300",
                 "diff_deleted_foreground": "#cc0000",
                 "diff_deleted_background": "#330000",
+                "error": "#f38ba8",
             },
         },
         {
@@ -76,6 +79,7 @@ DEFAULT_THEME = {
                 "diff_added_background": "#e6ffe6",
                 "diff_deleted_foreground": "#aa2222",
                 "diff_deleted_background": "#ffe6e6",
+                "error": "#d20f39",
             },
         },
         {
@@ -94,6 +98,7 @@ DEFAULT_THEME = {
                 "diff_added_background": "#2d3d3a",
                 "diff_deleted_foreground": "#bf616a",
                 "diff_deleted_background": "#3d2d2e",
+                "error": "#bf616a",
             },
         },
     ]
@@ -0,0 +1,280 @@
+import threading
+import time
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+from src.recipe_box import Component, Library, Recipe, Step
+from src.recipe_box import assistant, telemetry
+from src.recipe_box.preferences import AIProvider
+from src.recipe_box.assistant import (
+    PydanticComponent,
+    PydanticRecipe,
+    PydanticStep,
+    RateLimiter,
+    ResponseCache,
+    prepare_request,
+    prompt_assistant,
+    prompt_assistant_batch,
+    stream_assistant,
+)
+
+
+@pytest.fixture(autouse=True)
+def response_cache(monkeypatch, tmp_path):
+    cache = ResponseCache(tmp_path / "assistant_cache.db")
+    monkeypatch.setattr(assistant, "_response_cache", cache)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture(autouse=True)
+def telemetry_log(monkeypatch, tmp_path):
+    log = telemetry.TelemetryLog(tmp_path / "assistant_telemetry.db")
+    monkeypatch.setattr(telemetry, "_telemetry_log", log)
+    yield log
+    log.close()
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """A _MockProvider that every client the assistant creates talks to."""
+    provider = _MockProvider(delay=0)
+    monkeypatch.setattr(assistant.instructor, "from_provider", lambda *a, **k: provider)
+    monkeypatch.setattr(assistant, "_clients", {})
+    return provider
+
+
+RECIPE = Recipe(
+    title="Soup",
+    components=[
+        Component(name="Stock", steps=[Step("Simmer bones.")]),
+        Component(name="Soup", steps=[Step("Add vegetables.")]),
+    ],
+)
+
+
+def _partial(title, components):
+    return PydanticRecipe.model_construct(title=title, components=components)
+
+
+def test_stream_assistant_fills_in_completed_components(provider):
+    stock = PydanticComponent(
+        name="Stock",
+        steps=[PydanticStep(text="Simmer bones for 4 hours.", ingredients=[])],
+    )
+    soup = PydanticComponent(
+        name="Soup", steps=[PydanticStep(text="Add carrots.", ingredients=[])]
+    )
+    partials = [
+        _partial("So", None),
+        _partial("Soup", [stock]),
+        _partial(
+            "Soup", [stock, PydanticComponent.model_construct(name="So", steps=None)]
+        ),
+        _partial("Soup", [stock, soup]),
+    ]
+    provider.chat.completions.create_partial = lambda **kwargs: (p for p in partials)
+
+    results = list(stream_assistant(RECIPE, "Simmer longer", "fake/model", "key"))
+
+    assert results[0] == RECIPE
+    assert results[1] == RECIPE
+    assert results[2].components == [
+        Component(name="Stock", steps=[Step("Simmer bones for 4 hours.")]),
+        RECIPE.components[1],
+    ]
+    assert results[-1].components[1] == Component(
+        name="Soup", steps=[Step("Add carrots.")]
+    )
+
+
+def test_clients_are_reused_until_provider_removed(monkeypatch, provider):
+    # A new client per call, to tell them apart.
+    monkeypatch.setattr(
+        assistant.instructor, "from_provider", lambda *a, **k: SimpleNamespace()
+    )
+
+    client = assistant.get_client("openai/a", "key")
+    assert assistant.get_client("openai/a", "key") is client
+    assert assistant.get_client("openai/a", "other-key") is not client
+
+    assistant.prune_clients([AIProvider("openai/a", "other-key")])
+    assert assistant.get_client("openai/a", "key") is not client
+
+
+class _MockProvider:
+    """Stands in for a provider: echoes the recipe back with an edited
+    title, tracking how many requests are in flight at once."""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, response_model, messages, hooks=None):
+        if hooks is not None:
+            hooks.emit_completion_arguments(messages=messages)
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            recipe_json = messages[0]["content"].split("Recipe:", 1)[1]
+            recipe = response_model.model_validate_json(recipe_json)
+            if recipe.title == "Broken":
+                raise RuntimeError("provider error")
+            return recipe.model_copy(update={"title": recipe.title + " (metric)"})
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_focused_request_sends_and_merges_named_components(monkeypatch, provider):
+    request = prepare_request(RECIPE, "Use less salt in the stock")
+    assert request.component_indexes == [0]
+    assert "Add vegetables." not in request.messages[0]["content"]
+    assert "\n  " not in request.messages[0]["content"]
+    assert 0 < request.prompt_tokens < request.baseline_tokens
+    assert prepare_request(RECIPE, "Halve it").component_indexes is None
+    assert prepare_request(RECIPE, "Halve it", focus=False).tokens_saved > 0
+
+    result = prompt_assistant(RECIPE, "Use less salt in the stock", "fake/m", "key")
+    assert result.title == "Soup (metric)"
+    assert result.components == RECIPE.components
+
+    monkeypatch.setattr(assistant, "PROMPT_TOKEN_BUDGET", 10)
+    with pytest.raises(ValueError):
+        prepare_request(RECIPE, "Halve it")
+
+
+def test_batch_assistant_bounds_concurrency_and_commits(provider, tmp_path):
+    provider.delay = 0.02
+
+    library = Library(tmp_path / "recipes.db")
+    titles = [f"Recipe {i}" for i in range(12)] + ["Broken"]
+    library.add_recipes(replace(RECIPE, title=title) for title in titles)
+    recipes = library.list_recipes()
+
+    results = dict(
+        (recipe.title, result)
+        for recipe, result in prompt_assistant_batch(
+            recipes, "Convert to metric", AIProvider("fake/model", "key"), 3
+        )
+    )
+
+    assert provider.max_in_flight <= 3
+    assert isinstance(results.pop("Broken"), RuntimeError)
+    assert all(result.title == f"{title} (metric)" for title, result in results.items())
+
+    library.update_recipes(results.values())
+    assert sorted(r.title for r in library.list_recipes()) == sorted(
+        [f"{title} (metric)" for title in results] + ["Broken"]
+    )
+    library.close()
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(requests_per_minute=1200)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+    assert time.monotonic() - start >= 3 * limiter.interval * 0.9
+
+
+def test_cancelled_waits_give_their_slots_back():
+    limiter = RateLimiter(requests_per_minute=300)
+    limiter.wait()
+    start = time.monotonic()
+
+    cancel_event = threading.Event()
+    waiters = [
+        threading.Thread(target=limiter.wait, args=(cancel_event,)) for _ in range(5)
+    ]
+    for waiter in waiters:
+        waiter.start()
+    time.sleep(0.05)
+    cancel_event.set()
+    for waiter in waiters:
+        waiter.join()
+    # Already cancelled, so no slot is taken at all.
+    limiter.wait(cancel_event)
+
+    # The next caller only waits out the interval after the one used slot,
+    # not the five cancelled ones.
+    limiter.wait()
+    assert time.monotonic() - start < 3 * limiter.interval
+
+
+def test_response_cache_serves_repeats_and_evicts(provider, response_cache):
+    calls = []
+    create = provider.chat.completions.create
+    provider.chat.completions.create = lambda **kwargs: (
+        calls.append(1) or create(**kwargs)
+    )
+
+    first = assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    again = assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assistant.prompt_assistant(RECIPE, "Imperial", "fake/model", "key")
+    assert first == again
+    assert len(calls) == 2
+
+    response_cache.max_entries = 1
+    assistant.prompt_assistant(RECIPE, "Metric", "other/model", "key")
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assert len(calls) == 4
+
+    response_cache.ttl = 0
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assert len(calls) == 5
+
+
+def test_response_cache_can_be_bypassed_and_cleared(
+    monkeypatch, provider, response_cache, tmp_path
+):
+    calls = []
+    create = provider.chat.completions.create
+    provider.chat.completions.create = lambda **kwargs: (
+        calls.append(1) or create(**kwargs)
+    )
+
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key", use_cache=False)
+    assert len(calls) == 2
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assert len(calls) == 2
+
+    assert assistant.clear_response_cache()
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assert len(calls) == 3
+
+    # A cache directory that can't be created only loses the caching.
+    blocked = tmp_path / "blocked"
+    blocked.write_text("")
+    monkeypatch.setattr(assistant, "_response_cache", None)
+    monkeypatch.setattr(assistant, "get_config_dir", lambda: blocked / "config")
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assert len(calls) == 4
+    assert not assistant.clear_response_cache()
+
+
+def test_prompt_assistant_records_telemetry(provider, telemetry_log):
+    create = provider.create
+
+    def create_after_retry(response_model, messages, hooks=None):
+        # Stands in for instructor re-sending after a failed validation.
+        hooks.emit_completion_arguments(messages=messages)
+        return create(response_model, messages, hooks)
+
+    provider.chat.completions.create = create_after_retry
+
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+    assistant.prompt_assistant(RECIPE, "Metric", "fake/model", "key")
+
+    sent, cached = telemetry_log.calls()
+    assert (sent.model, sent.cached, sent.retries) == ("fake/model", False, 1)
+    assert sent.client_setup is not None and sent.request is not None
+    assert sent.prompt_tokens > 0
+    assert cached.cached and cached.request is None
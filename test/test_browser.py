@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+from src.recipe_box.browser import RecipeTreeModel
+from src.recipe_box.library import Library, RecipeSummary
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def _rows(model: RecipeTreeModel) -> list[tuple[str, list[str]]]:
+    rows = []
+    for i in range(model.rowCount()):
+        category_item = model.item(i)
+        titles = [
+            category_item.child(j).text() for j in range(category_item.rowCount())
+        ]
+        rows.append((category_item.text(), titles))
+    return rows
+
+
+def test_chunked_adds_match_full_populate(app):
+    summaries = [
+        RecipeSummary(1, "Stew", "Soup"),
+        RecipeSummary(2, "Bread", "Baking", draft="yes"),
+        RecipeSummary(3, "Bisque", "Soup"),
+        RecipeSummary(4, "Cake", "Baking"),
+        RecipeSummary(5, "Aioli", "Sauces"),
+        RecipeSummary(6, "Broth", "Soup", draft="yes"),
+    ]
+    populated = RecipeTreeModel()
+    populated.populate(summaries)
+    chunked = RecipeTreeModel()
+    for start in range(0, len(summaries), 2):
+        chunked.add_recipes(summaries[start : start + 2])
+
+    assert (
+        _rows(chunked)
+        == _rows(populated)
+        == [
+            ("Baking", ["Cake", "Bread"]),
+            ("Sauces", ["Aioli"]),
+            ("Soup", ["Bisque", "Stew", "Broth"]),
+        ]
+    )
+    assert chunked.find_item_by_id(5).text() == "Aioli"
+
+
+def test_library_summaries_skip_untitled_recipes(tmp_path):
+    library = Library(tmp_path / "recipes.db")
+    with library._conn:
+        library._conn.executemany(
+            "INSERT INTO recipes (content) VALUES (?)",
+            [
+                ("---\ncategory: Soup\nfavorite: yes\n---\n= Stew\n# Simmer.",),
+                ("# No title.",),
+                ("= Toast\n- bread",),
+            ],
+        )
+
+    assert list(library.iter_summaries()) == [
+        RecipeSummary(1, "Stew", "Soup", favorite="yes"),
+        RecipeSummary(3, "Toast", "Uncategorized"),
+    ]
+    # The summary lists a recipe whose steps don't parse; opening it fails
+    # without raising.
+    assert library.get_recipe(3) is None
+    library.close()
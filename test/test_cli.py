@@ -0,0 +1,121 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+from src.recipe_box import Component, Library, Recipe, Step
+from src.recipe_box import jsonld
+from src.recipe_box.cli import main
+
+RECIPES = [
+    Recipe(
+        title="Tomato Soup",
+        metadata={"category": "Soup"},
+        components=[Component(steps=[Step("Simmer.", ["4 tomatoes", "1 onion"])])],
+    ),
+    Recipe(
+        title="Onion Tart",
+        metadata={"category": "Baking"},
+        components=[Component(steps=[Step("Bake.", ["3 onions"]), Step("Cool.")])],
+    ),
+]
+
+
+def test_zip_round_trip_search_and_stats(tmp_path, capsys):
+    source = tmp_path / "source.db"
+    library = Library(source)
+    library.add_recipes(RECIPES)
+    library.close()
+    archive = tmp_path / "recipes.zip"
+    target = tmp_path / "target.db"
+
+    assert main(["--db", str(source), "export-zip", str(archive)]) == 0
+    assert main(["--db", str(target), "import-zip", str(archive)]) == 0
+    capsys.readouterr()
+
+    assert main(["--db", str(target), "search", "ONION"]) == 0
+    titles = {line.split("\t")[1] for line in capsys.readouterr().out.splitlines()}
+    assert titles == {"Tomato Soup", "Onion Tart"}
+    assert main(["--db", str(target), "search", "onion", "bake", "--json"]) == 0
+    assert [r["title"] for r in json.loads(capsys.readouterr().out)] == ["Onion Tart"]
+    assert main(["--db", str(target), "search", "100%"]) == 0
+    assert capsys.readouterr().out == ""
+
+    assert main(["--db", str(target), "stats", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out) == {
+        "recipes": 2,
+        "components": 2,
+        "steps": 3,
+        "ingredients": 3,
+        "categories": {"Baking": 1, "Soup": 1},
+    }
+
+
+def test_unreadable_inputs_fail_without_aborting(tmp_path, capsys, monkeypatch):
+    not_a_zip = tmp_path / "notes.zip"
+    not_a_zip.write_text("not a zip file")
+    archive = tmp_path / "recipes.zip"
+    db = str(tmp_path / "lib.db")
+    library = Library(db)
+    library.add_recipes(RECIPES)
+    library.close()
+    assert main(["--db", db, "export-zip", str(archive)]) == 0
+
+    assert main(["--db", db, "import-zip", str(not_a_zip), str(archive)]) == 1
+    output = capsys.readouterr()
+    assert "notes.zip" in output.err
+    assert "imported 2 recipes" in output.out
+
+    client = httpx.Client
+    transport = httpx.MockTransport(lambda request: httpx.Response(404))
+    monkeypatch.setattr(
+        jsonld.httpx,
+        "Client",
+        lambda **kwargs: client(transport=transport, **kwargs),
+    )
+    assert main(["--db", db, "import-url", "https://example.com/gone"]) == 1
+    assert "404" in capsys.readouterr().err
+
+
+def test_cli_does_not_import_qt(tmp_path):
+    code = (
+        "import sys; from src.recipe_box.cli import main; "
+        f"main(['--db', {str(tmp_path / 'lib.db')!r}, 'stats']); "
+        "print('PySide6' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+    )
+    assert result.stdout.splitlines()[-1] == "False"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake typst is a POSIX script")
+def test_export_pdf_reports_unwritable_output(tmp_path, capsys):
+    typst = tmp_path / "typst"
+    typst.write_text(
+        f"#!{sys.executable}\nimport sys\nopen(sys.argv[-1], 'wb').write(b'%PDF')\n"
+    )
+    typst.chmod(0o755)
+    db = tmp_path / "library" / "lib.db"
+    library = Library(db)
+    library.add_recipes(RECIPES)
+    library.close()
+
+    output = tmp_path / "missing" / "book.pdf"
+    args = ["--db", str(db), "export-pdf", str(output), "--typst", str(typst)]
+    assert main(args) == 1
+    assert "Could not write" in capsys.readouterr().err
+    # The rendered fragments are kept next to the library they came from.
+    assert (db.parent / "typst-cli" / "fragments").is_dir()
+
+    output.parent.mkdir()
+    assert main(args) == 0
+    assert output.read_bytes() == b"%PDF"
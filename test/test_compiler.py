@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from src.recipe_box import Component, Recipe, Step
+from src.recipe_box.compiler import PARALLEL_COOKBOOK_THRESHOLD, TypstCompiler
+
+FAKE_TYPST = """
+import pathlib, sys, time
+
+with open(pathlib.Path(sys.argv[0]).with_name("calls.log"), "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+
+args = [arg for arg in sys.argv[1:] if arg != "--root" and arg != "."]
+command, source, output = args[:3]
+source, output = pathlib.Path(source), pathlib.Path(output)
+
+def compile_source():
+    text = source.read_text()
+    if "SLOW" in text:
+        time.sleep(60)
+    # Like typst before 0.14, which can't embed PDF pages as images.
+    if "ERROR" in text or 'image("' in text:
+        return False
+    output.write_bytes(b"%PDF " + text.encode())
+    return True
+
+if command == "compile":
+    if not compile_source():
+        sys.exit("error: unexpected ERROR")
+    sys.exit(0)
+
+# Like typst, recompiles whenever the file is written, even unchanged.
+last = None
+while True:
+    stamp = source.stat().st_mtime_ns, source.read_text()
+    if stamp != last:
+        last = stamp
+        status = "successfully in 1ms" if compile_source() else "with errors"
+        print(f"[00:00:00] compiled {status}", flush=True)
+    time.sleep(0.01)
+"""
+
+
+@pytest.fixture
+def fake_typst(tmp_path):
+    script = tmp_path / "typst"
+    script.write_text(f"#!{sys.executable}\n{FAKE_TYPST}")
+    script.chmod(0o755)
+    return str(script)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake typst is a POSIX script")
+def test_compiler_reuses_watch_process(fake_typst):
+    compiler = TypstCompiler(typst_path=fake_typst, startup_timeout=10)
+    try:
+        assert compiler.compile("= One") == b"%PDF = One"
+        watcher = compiler._watch_process
+        assert compiler.compile("= Two") == b"%PDF = Two"
+        assert compiler._watch_process is watcher
+
+        with pytest.raises(RuntimeError, match="unexpected ERROR"):
+            compiler.compile("ERROR")
+        assert compiler.compile("= Three") == b"%PDF = Three"
+        assert compiler._watch_process is watcher
+    finally:
+        compiler.close()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake typst is a POSIX script")
+def test_unchanged_source_is_not_rewritten(fake_typst):
+    compiler = TypstCompiler(typst_path=fake_typst, startup_timeout=10)
+    try:
+        assert compiler.compile("= One") == b"%PDF = One"
+        main_path = compiler.workspace / "main.typ"
+        written = main_path.stat().st_mtime_ns
+        assert compiler.compile("= One") == b"%PDF = One"
+        assert main_path.stat().st_mtime_ns == written
+        assert compiler.compile("= Two") == b"%PDF = Two"
+    finally:
+        compiler.close()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake typst is a POSIX script")
+def test_cancel_kills_running_compile(fake_typst):
+    compiler = TypstCompiler(typst_path=fake_typst, startup_timeout=10)
+    try:
+        compiler.compile("= Warm up")
+        threading.Timer(0.2, compiler.cancel).start()
+        with pytest.raises(RuntimeError, match="cancelled"):
+            compiler.compile("SLOW")
+        compiler.reset_cancel()
+        assert compiler.compile("= After") == b"%PDF = After"
+    finally:
+        compiler.close()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake typst is a POSIX script")
+def test_cancel_while_writing_source_stops_compile(fake_typst):
+    compiler = TypstCompiler(typst_path=fake_typst, startup_timeout=10)
+
+    def write_source(stream):
+        stream.write("= Cancelled")
+        compiler.cancel()
+
+    try:
+        with pytest.raises(RuntimeError, match="cancelled"):
+            compiler.compile_with(write_source)
+        assert not (compiler.workspace / "main.pdf").exists()
+        assert not (compiler.workspace / "oneshot.pdf").exists()
+    finally:
+        compiler.close()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake typst is a POSIX script")
+def test_large_export_skips_chunks_when_typst_cannot_embed_pdfs(fake_typst, tmp_path):
+    recipes = [
+        Recipe(
+            title=f"Soup {i}",
+            metadata={"category": "Soup"},
+            components=[Component(steps=[Step("Simmer.")])],
+        )
+        for i in range(PARALLEL_COOKBOOK_THRESHOLD)
+    ]
+    compiler = TypstCompiler(
+        typst_path=fake_typst, workspace=tmp_path / "workspace", watch=False
+    )
+    try:
+        for _ in range(2):
+            pdf = compiler.compile_recipes(lambda: recipes, len(recipes))
+            # Compiled as one document, including each recipe's fragment.
+            assert pdf.count(b"#include") == len(recipes)
+    finally:
+        compiler.close()
+
+    calls = (Path(fake_typst).parent / "calls.log").read_text().splitlines()
+    # Checked once, and no chunk was compiled only to fail at the merge.
+    assert sum("embed.typ" in call for call in calls) == 1
+    assert not any("chunk-" in call for call in calls)
@@ -0,0 +1,91 @@
+import random
+
+from src.recipe_box.diff import diff_recipe_texts
+from src.recipe_box.editor import RecipeHighlighter
+
+ADDED = RecipeHighlighter.ADDED_MARKER
+DELETED = RecipeHighlighter.DELETED_MARKER
+
+ORIGINAL = """= Pancakes
+
++ Batter
+
+# Whisk the eggs.
+
+- 2 eggs
+- 1 cup milk
+
+# Fold in the flour.
+
+- 1 cup flour
+
++ Cooking
+
+# Fry in a hot pan.
+"""
+
+
+def _sides(diff_text: str) -> tuple[str, str]:
+    old, new = [], []
+    for line in diff_text.split("\n"):
+        if line.startswith(ADDED):
+            new.append(line[1:])
+        elif line.startswith(DELETED):
+            old.append(line[1:])
+        else:
+            old.append(line)
+            new.append(line)
+    return "\n".join(old), "\n".join(new)
+
+
+def test_diff_marks_only_changed_ingredient():
+    modified = ORIGINAL.replace("- 1 cup milk", "- 1 cup oat milk")
+    diff_lines = diff_recipe_texts(ORIGINAL, modified).text.split("\n")
+
+    changed = [line for line in diff_lines if line[:1] in (ADDED, DELETED)]
+    assert changed == [DELETED + "- 1 cup milk", ADDED + "- 1 cup oat milk"]
+
+
+def test_diff_moved_step_keeps_other_lines():
+    modified = ORIGINAL.replace(
+        "# Fold in the flour.\n\n- 1 cup flour\n\n", ""
+    ).replace("# Fry", "# Fold in the flour.\n\n- 1 cup flour\n\n# Fry")
+    diff_text = diff_recipe_texts(ORIGINAL, modified).text
+
+    assert _sides(diff_text) == (ORIGINAL.rstrip("\n"), modified.rstrip("\n"))
+    assert "= Pancakes" in diff_text.split("\n")
+    assert "# Whisk the eggs." in diff_text.split("\n")
+
+
+def test_diff_reconstructs_both_sides():
+    rng = random.Random(0)
+    lines = ORIGINAL.splitlines() * 20
+    for _ in range(50):
+        modified = list(lines)
+        for _ in range(rng.randint(1, 10)):
+            index = rng.randrange(len(modified))
+            match rng.randrange(3):
+                case 0:
+                    del modified[index]
+                case 1:
+                    modified.insert(index, rng.choice(lines))
+                case 2:
+                    modified[index] = f"- {rng.random()}"
+        text1, text2 = "\n".join(lines), "\n".join(modified)
+        assert _sides(diff_recipe_texts(text1, text2).text) == (text1, text2)
+
+
+def test_diff_marks_changed_words_within_a_step():
+    modified = ORIGINAL.replace("# Fry in a hot pan.", "# Fry in a buttered pan.")
+    diff = diff_recipe_texts(ORIGINAL, modified)
+    lines = diff.text.split("\n")
+
+    deleted = lines.index(DELETED + "# Fry in a hot pan.")
+    added = lines.index(ADDED + "# Fry in a buttered pan.")
+    assert [lines[deleted][s : s + n] for s, n in diff.changed_spans[deleted]] == [
+        "hot"
+    ]
+    assert [lines[added][s : s + n] for s, n in diff.changed_spans[added]] == [
+        "buttered"
+    ]
+    assert len(diff.changed_spans) == 2
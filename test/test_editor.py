@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtGui import QTextCursor, QTextDocument
+from PySide6.QtWidgets import QApplication
+from src.recipe_box.diff import diff_recipe_texts
+from src.recipe_box.editor import BlockError, RecipeHighlighter
+from src.recipe_box.theme import DEFAULT_THEME
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def _errors(document: QTextDocument) -> dict[int, str]:
+    errors = {}
+    block = document.begin()
+    while block.isValid():
+        if isinstance(block.userData(), BlockError):
+            errors[block.blockNumber()] = block.userData().message
+        block = block.next()
+    return errors
+
+
+def test_validation_flags_only_invalid_blocks(app):
+    document = QTextDocument()
+    # Documents only report edits to highlighters once they have a layout,
+    # which an editor widget would create.
+    document.documentLayout()
+    document.setPlainText(
+        "---\ncategory: Soup\n\n---\n= Soup\n- salt\n\n# Boil.\n\n- water\n"
+    )
+    highlighter = RecipeHighlighter(document, validate=True)
+    highlighter.update_colors(DEFAULT_THEME["themes"][0]["colors"])
+    # Lets the highlighter's deferred initial pass run.
+    app.processEvents()
+
+    assert _errors(document) == {5: "Ingredients must belong to a step."}
+
+    cursor = QTextCursor(document.findBlockByNumber(5))
+    cursor.insertText("# Salt the pot.\n")
+    assert _errors(document) == {}
+
+    cursor = QTextCursor(document.findBlockByNumber(10))
+    cursor.insertText("+ Garnish\n")
+    assert _errors(document) == {11: "Ingredients must belong to a step."}
+
+
+def _validated_document(app, text: str) -> tuple[QTextDocument, RecipeHighlighter]:
+    document = QTextDocument()
+    document.documentLayout()
+    document.setPlainText(text)
+    highlighter = RecipeHighlighter(document, validate=True)
+    highlighter.update_colors(DEFAULT_THEME["themes"][0]["colors"])
+    app.processEvents()
+    return document, highlighter
+
+
+def test_emptied_line_drops_its_error(app):
+    document, _highlighter = _validated_document(app, "= Soup\n- salt\n# Boil.")
+    assert _errors(document) == {1: "Ingredients must belong to a step."}
+
+    cursor = QTextCursor(document.findBlockByNumber(1))
+    cursor.movePosition(
+        QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor
+    )
+    cursor.removeSelectedText()
+    assert _errors(document) == {}
+
+
+def test_line_moved_into_metadata_drops_its_error(app):
+    document, _highlighter = _validated_document(app, "= Soup\n- salt\n# Boil.")
+    assert _errors(document) == {1: "Ingredients must belong to a step."}
+
+    QTextCursor(document).insertText("---\n")
+    assert _errors(document) == {}
+
+
+def test_changed_word_highlight_counts_utf16_units(app):
+    original = "= Eggs\n# Fry 🍳 in a hot pan."
+    diff = diff_recipe_texts(original, original.replace("hot", "buttered"))
+    document = QTextDocument()
+    document.documentLayout()
+    document.setPlainText(diff.text)
+    highlighter = RecipeHighlighter(document)
+    highlighter.changed_spans = diff.changed_spans
+    highlighter.update_colors(DEFAULT_THEME["themes"][0]["colors"])
+    app.processEvents()
+
+    added = max(diff.changed_spans)
+    block = document.findBlockByNumber(added)
+    changed_background = highlighter.palette.diff_added_format.background()
+    units = block.text().encode("utf-16-le")
+    highlighted = [
+        units[r.start * 2 : (r.start + r.length) * 2].decode("utf-16-le")
+        for r in block.layout().formats()
+        if r.format.background() == changed_background and r.start > 1
+    ]
+    assert highlighted == ["buttered"]
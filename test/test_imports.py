@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_models_import_without_gui_or_assistant_dependencies():
+    """
+    Tests that importing the models from the package leaves Qt, instructor
+    and the importer's dependencies unloaded until they are used.
+    """
+    heavy = ["PySide6", "instructor", "pydantic", "httpx", "bs4"]
+    code = (
+        "import sys; from src.recipe_box import Recipe; "
+        f"print([name for name in {heavy!r} if name in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+    )
+    assert result.stdout.strip() == "[]"
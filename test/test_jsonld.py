@@ -0,0 +1,168 @@
+import gzip
+import json
+
+import pytest
+from src.recipe_box import Library, Recipe, Step
+from src.recipe_box.jsonld import (
+    _jsonld_to_recipe,
+    import_recipes_from_path,
+    recipe_from_html,
+)
+
+
+RECIPE_JSONLD = {
+    "@context": "https://schema.org",
+    "@type": "Recipe",
+    "name": "Pancakes",
+    "recipeCategory": "Breakfast",
+    "recipeIngredient": ["1 cup flour", "1 egg"],
+    "recipeInstructions": [
+        {"@type": "HowToStep", "text": "Whisk everything together."},
+        {"@type": "HowToStep", "text": "Fry in a hot pan."},
+    ],
+}
+
+
+def _page(recipe_json: dict) -> str:
+    return f"""
+<html><head>
+<script type="application/ld+json">{json.dumps(recipe_json)}</script>
+</head><body></body></html>
+"""
+
+
+def _warc_response(html_text: str) -> bytes:
+    body = html_text.encode("utf-8")
+    http = (
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: text/html; charset=utf-8\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+    )
+    return (
+        b"WARC/1.0\r\n"
+        b"WARC-Type: response\r\n"
+        b"Content-Type: application/http; msgtype=response\r\n"
+        b"Content-Length: " + str(len(http)).encode() + b"\r\n\r\n" + http + b"\r\n\r\n"
+    )
+
+
+def test_recipe_from_html():
+    recipe = recipe_from_html(_page(RECIPE_JSONLD))
+    assert recipe.title == "Pancakes"
+    assert recipe.category == "Breakfast"
+    assert recipe.components[0].steps[0].ingredients == ["1 cup flour", "1 egg"]
+
+
+def test_import_recipes_from_directory_and_warc(tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    (pages / "pancakes.html").write_text(_page(RECIPE_JSONLD), encoding="utf-8")
+    (pages / "not-a-recipe.htm").write_text("<html></html>", encoding="utf-8")
+
+    waffles = dict(RECIPE_JSONLD, name="Waffles")
+    crepes = dict(RECIPE_JSONLD, name="Crepes")
+    with gzip.open(pages / "crawl.warc.gz", "wb") as f:
+        f.write(_warc_response(_page(waffles)))
+        f.write(_warc_response(_page(crepes)))
+
+    library = Library(tmp_path / "recipes.db")
+    imported, failed = import_recipes_from_path(
+        library, pages, batch_size=2, max_workers=2
+    )
+
+    assert (imported, failed) == (3, 1)
+    titles = sorted(r.title for r in library.list_recipes())
+    assert titles == ["Crepes", "Pancakes", "Waffles"]
+    library.close()
+
+
+def test_malformed_warc_counts_as_failed_and_import_continues(tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    waffles = dict(RECIPE_JSONLD, name="Waffles")
+    (pages / "a.warc").write_bytes(
+        _warc_response(_page(waffles)) + b"garbage\r\n" + _warc_response("")
+    )
+    (pages / "b.html").write_text(_page(RECIPE_JSONLD), encoding="utf-8")
+
+    library = Library(tmp_path / "recipes.db")
+    imported, failed = import_recipes_from_path(
+        library, pages, batch_size=1, max_workers=1
+    )
+
+    assert (imported, failed) == (2, 1)
+    titles = sorted(r.title for r in library.list_recipes())
+    assert titles == ["Pancakes", "Waffles"]
+    library.close()
+
+
+def test_malformed_pages_count_as_failed_and_import_continues(tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    (pages / "pancakes.html").write_text(_page(RECIPE_JSONLD), encoding="utf-8")
+    (pages / "numeric-time.html").write_text(
+        _page(dict(RECIPE_JSONLD, name="Waffles", prepTime=15)), encoding="utf-8"
+    )
+    # Nested deeper than the JSON decoder can recurse.
+    (pages / "nested.html").write_text(
+        f'<script type="application/ld+json">{"[" * 100_000}</script>',
+        encoding="utf-8",
+    )
+    (pages / "crepes.html").write_text(
+        _page(dict(RECIPE_JSONLD, name="Crepes")), encoding="utf-8"
+    )
+
+    library = Library(tmp_path / "recipes.db")
+    imported, failed = import_recipes_from_path(
+        library, pages, batch_size=1, max_workers=2
+    )
+
+    assert (imported, failed) == (2, 2)
+    titles = sorted(r.title for r in library.list_recipes())
+    assert titles == ["Crepes", "Pancakes"]
+    library.close()
+
+
+def test_jsonld_sections_build_named_components():
+    recipe_json = dict(
+        RECIPE_JSONLD,
+        recipeInstructions=[
+            {"@type": "HowToStep", "text": "Preheat the oven."},
+            {
+                "@type": "HowToSection",
+                "name": "Batter",
+                "itemListElement": [{"@type": "HowToStep", "text": "Mix."}],
+            },
+        ],
+    )
+    recipe = _jsonld_to_recipe(recipe_json)
+
+    assert [c.name for c in recipe.components] == [None, "Batter"]
+    first, batter = recipe.components
+    assert first.steps[0] == Step("Gather all ingredients", ["1 cup flour", "1 egg"])
+    assert first.steps[1] == Step("Preheat the oven.")
+    assert batter.steps == [Step("Mix.")]
+    assert Recipe.parse(recipe.serialize()) == recipe
+
+
+def test_jsonld_error_names_offending_field():
+    recipe_json = dict(
+        RECIPE_JSONLD,
+        recipeInstructions=[
+            {"@type": "HowToSection", "name": "Batter", "itemListElement": [["Mix."]]}
+        ],
+    )
+    with pytest.raises(
+        ValueError, match=r"recipeInstructions\[0\]\.itemListElement\[0\]"
+    ):
+        _jsonld_to_recipe(recipe_json)
+
+
+def test_jsonld_durations_must_be_text():
+    recipe = _jsonld_to_recipe(dict(RECIPE_JSONLD, prepTime="PT1H15M"))
+    assert recipe.metadata["prep_time"] == "1 hour 15 minutes"
+
+    with pytest.raises(ValueError, match="prepTime"):
+        _jsonld_to_recipe(dict(RECIPE_JSONLD, prepTime=15))
+    with pytest.raises(ValueError, match="cookTime"):
+        _jsonld_to_recipe(dict(RECIPE_JSONLD, cookTime={"value": "PT5M"}))
@@ -111,3 +111,30 @@ def test_recipe_with_no_title_raises_error():
 """
     with pytest.raises(ValueError, match="No recipe title."):
         Recipe.parse(recipe_text)
+
+
+def test_parse_header_reads_title_and_metadata_only():
+    """
+    Tests that parse_header reads the same title and metadata as parse,
+    without the steps.
+    """
+    recipe_text = """
+---
+category: Soup
+draft: yes
+---
+= Stew
+> Better the next day.
+# Simmer
+- 1 onion
+"""
+    header = Recipe.parse_header(recipe_text)
+    recipe = Recipe.parse(recipe_text)
+    assert header.title == recipe.title
+    assert header.category == "Soup" and header.draft == "yes"
+    assert header.components == []
+
+    # Ingredients outside a step only fail the full parse.
+    assert Recipe.parse_header("= Toast\n- bread").title == "Toast"
+    with pytest.raises(ValueError, match="No recipe title."):
+        Recipe.parse_header("---\ncategory: Soup\n---\n# Simmer")
@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from src.recipe_box import preferences
+from src.recipe_box.preferences import Preferences
+from src.recipe_box.theme import DEFAULT_THEME
+
+
+@pytest.fixture
+def prefs(tmp_path, monkeypatch):
+    QApplication.instance() or QApplication([])
+    monkeypatch.setattr(preferences, "get_config_dir", lambda: tmp_path)
+    return Preferences()
+
+
+def test_theme_colors_are_cached_until_the_theme_changes(prefs):
+    colors = prefs.get_theme_colors()
+    assert prefs.get_theme_colors() is colors
+
+    prefs.data.theme = "Dark"
+    dark = prefs.get_theme_colors()
+    assert dark is not colors
+    assert dark == DEFAULT_THEME["themes"][1]["colors"]
+    assert prefs.get_theme_colors() is dark
+
+
+def test_reloading_themes_resolves_colors_again(prefs, tmp_path):
+    prefs.data.theme = "Light"
+    colors = prefs.get_theme_colors()
+
+    themes = json.loads((tmp_path / "themes.json").read_text(encoding="utf-8"))
+    themes["themes"][0]["colors"]["text"] = "#123456"
+    (tmp_path / "themes.json").write_text(json.dumps(themes), encoding="utf-8")
+    prefs._load_themes()
+
+    assert prefs.get_theme_colors() is not colors
+    assert prefs.get_theme_colors()["text"] == "#123456"
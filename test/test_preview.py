@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication, QTextEdit
+from src.recipe_box.preview import RecipePreview
+
+
+class _FakeCompiler:
+    """Returns the source's title line as the PDF. Compiles block while
+    `hold` is cleared, so a test can edit during a compile."""
+
+    def __init__(self):
+        self.sources: list[str] = []
+        self.hold = threading.Event()
+        self.hold.set()
+        self.started = threading.Event()
+
+    def compile(self, source: str) -> bytes:
+        self.sources.append(source)
+        self.started.set()
+        self.hold.wait(5)
+        title = next(line for line in source.splitlines() if "#heading" in line)
+        return title.encode()
+
+
+@pytest.fixture
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def preview(app, monkeypatch):
+    monkeypatch.setattr(RecipePreview, "DEBOUNCE_MS", 20)
+    editor = QTextEdit()
+    compiler = _FakeCompiler()
+    preview = RecipePreview(editor, compiler)
+    shown: list[bytes] = []
+    monkeypatch.setattr(preview, "_show_pdf", shown.append)
+    preview.show()
+    yield preview, editor, compiler, shown
+    preview.close()
+    editor.deleteLater()
+
+
+async def _process_events(app, condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        await asyncio.sleep(0.01)
+
+
+def test_edits_are_debounced_into_one_render(app, preview):
+    preview, editor, compiler, shown = preview
+
+    async def run():
+        for title in ("One", "Two", "Three"):
+            editor.setPlainText(f"= {title}\n# Toast.")
+        await _process_events(app, lambda: shown)
+        # Give a second, unwanted render a chance to show up.
+        await asyncio.sleep(0.1)
+        app.processEvents()
+
+    asyncio.run(run())
+
+    assert len(compiler.sources) == 1
+    assert len(shown) == 1 and b"Three" in shown[0]
+
+
+def test_render_finishing_after_a_newer_edit_is_dropped(app, preview):
+    preview, editor, compiler, shown = preview
+
+    async def run():
+        compiler.hold.clear()
+        editor.setPlainText("= Old\n# Toast.")
+        await _process_events(app, compiler.started.is_set)
+
+        # Edit while the first compile is still running, then let it finish.
+        editor.setPlainText("= New\n# Toast.")
+        preview.refresh()
+        compiler.hold.set()
+        await _process_events(app, lambda: shown)
+
+    asyncio.run(run())
+
+    assert ["Old" in s for s in compiler.sources] == [True, False]
+    assert len(shown) == 1 and b"New" in shown[0]
@@ -0,0 +1,59 @@
+import io
+import types
+
+from src.recipe_box import Component, Library, Recipe, Step
+from src.recipe_box.profiling import Profiler
+
+RECIPE = Recipe(title="Toast", components=[Component(steps=[Step("Toast.")])])
+
+
+def test_profiler_times_targets_and_restores_them(tmp_path):
+    original_parse = Recipe.__dict__["parse"]
+    library = Library(tmp_path / "library.db")
+    library.add_recipes([RECIPE, RECIPE])
+
+    profiler = Profiler(cprofile_path=str(tmp_path / "run.prof")).install(
+        [
+            "src.recipe_box.models:Recipe.parse",
+            "src.recipe_box.library:Library.iter_recipes",
+            "src.recipe_box.not_imported:Thing.method",
+        ]
+    )
+    try:
+        assert [recipe.title for recipe in library.iter_recipes()] == [
+            "Toast",
+            "Toast",
+        ]
+    finally:
+        profiler.uninstall()
+        library.close()
+
+    assert len(profiler.timings["Recipe.parse"]) == 2
+    # The generator is timed once, across its whole iteration.
+    assert len(profiler.timings["Library.iter_recipes"]) == 1
+    assert Recipe.__dict__["parse"] is original_parse
+    assert (tmp_path / "run.prof").exists()
+
+    report = io.StringIO()
+    profiler.report(report)
+    assert "Recipe.parse: 2 calls" in report.getvalue()
+
+
+def test_profiler_finds_targets_in_a_module_running_as_main():
+    class MainWindow:
+        def stream_recipes(self):
+            yield from range(3)
+
+    main_module = types.ModuleType("__main__")
+    main_module.MainWindow = MainWindow
+
+    profiler = Profiler().install(
+        ["src.recipe_box.main:MainWindow.stream_recipes"],
+        modules={"src.recipe_box.main": main_module},
+    )
+    try:
+        assert list(MainWindow().stream_recipes()) == [0, 1, 2]
+    finally:
+        profiler.uninstall()
+
+    assert len(profiler.timings["MainWindow.stream_recipes"]) == 1
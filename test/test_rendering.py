@@ -0,0 +1,273 @@
+import io
+import os
+import time
+
+import pytest
+from src.recipe_box import Component, Recipe, Step
+from src.recipe_box.rendering import FragmentCache, TypstRenderer
+
+
+def _recipe(title: str, category: str, source: str | None = None) -> Recipe:
+    metadata = {"category": category}
+    if source:
+        metadata["source"] = source
+    return Recipe(
+        title=title,
+        metadata=metadata,
+        components=[Component(steps=[Step("Mix.", ["1 egg"])])],
+    )
+
+
+def test_split_cookbook_chunks_categories():
+    recipes = [_recipe(f"Soup {i}", "Soups") for i in range(5)]
+    recipes.append(_recipe("Cake", "Desserts"))
+
+    chunks = list(TypstRenderer.split_cookbook(iter(recipes), chunk_size=2))
+
+    assert [(c.category, len(c.recipes), c.starts_category) for c in chunks] == [
+        ("Desserts", 1, True),
+        ("Soups", 2, True),
+        ("Soups", 2, False),
+        ("Soups", 1, False),
+    ]
+    assert [r for c in chunks for r in c.recipes] == recipes[-1:] + recipes[:-1]
+
+
+def test_merged_cookbook_places_chunk_pages_and_outline_entries():
+    chunks = list(
+        TypstRenderer.split_cookbook(
+            [
+                _recipe("Cake", "Desserts", source="example.com"),
+                _recipe("Pie", "Desserts"),
+            ]
+        )
+    )
+    chunk_source = TypstRenderer.render_chunk(chunks[0])
+    assert chunk_source.count("<cookbook-entry>") == 4
+    assert "#counter(page).display()" not in chunk_source
+
+    # Category page 1, Cake on pages 2-3, Pie on page 4.
+    merged = TypstRenderer.render_merged_cookbook(
+        [chunks[0].outline_entries()], [[1, 2, 4, 4]], ["chunk-0.pdf"], title="Book"
+    )
+
+    pages = merged.split("#page(footer:")[1:]
+    assert len(pages) == 4
+    assert "#counter(page).update(1)" in pages[0]
+    # The first category page has no footer, as in a single document.
+    assert pages[0].startswith(" none)")
+    assert all(page.startswith(" context") for page in pages[1:])
+    assert "#heading(level: 1)[Desserts]" in pages[0]
+    assert "#heading(level: 2)[Cake]" in pages[1]
+    assert "#heading" not in pages[2]
+    assert '"chunk-0.pdf", page: 3' in pages[2]
+    assert "#heading(level: 2)[Pie]" in pages[3]
+    # Pages of a recipe with a source leave room for it on the left.
+    assert pages[2].count("#h(1fr)") == 1
+    assert pages[3].count("#h(1fr)") == 2
+
+
+def test_fragment_cache_reuses_fragments_across_instances(tmp_path):
+    recipe = _recipe("Cake", "Desserts")
+    cache = FragmentCache(tmp_path / "fragments", root=tmp_path)
+
+    include = cache.include(recipe, title_heading_level=2)
+    footer, include = include.split("\n\n")
+    assert footer == TypstRenderer._render_footer(recipe)
+    assert include.startswith('#include "/fragments/')
+    fragment_path = tmp_path / include.split('"')[1].lstrip("/")
+    assert fragment_path.read_text() == TypstRenderer._render_recipe_body(
+        recipe, title_heading_level=2
+    )
+
+    fragment_path.write_text("cached")
+    fresh_cache = FragmentCache(tmp_path / "fragments", root=tmp_path)
+    assert fresh_cache.fragment(recipe, title_heading_level=2) == f"{footer}\n\ncached"
+    assert "cached" not in fresh_cache.fragment(recipe)
+
+    source = TypstRenderer.render(
+        [recipe, _recipe("Pie", "Desserts")], fragment_cache=fresh_cache
+    )
+    assert source.count("#include") == 2
+
+
+def test_render_to_streams_same_output_as_render(monkeypatch):
+    recipes = [
+        _recipe("Soup", "Soups", source="example.com"),
+        _recipe("Cake", "Desserts"),
+        _recipe("Stew", "Soups"),
+    ]
+    expected = TypstRenderer.render(recipes, title="Book", subtitle="Vol. 1")
+
+    # Force every category spool to roll over to disk.
+    monkeypatch.setattr(TypstRenderer, "_SPOOL_MAX_SIZE", 1)
+    stream = io.StringIO()
+    TypstRenderer.render_to(stream, iter(recipes), title="Book", subtitle="Vol. 1")
+
+    assert stream.getvalue() == expected
+    assert expected.index("[Desserts]") < expected.index("[Soups]")
+
+
+def test_fragment_cache_prunes_least_recently_used_files(tmp_path):
+    cache = FragmentCache(tmp_path / "fragments", root=tmp_path, max_files=2)
+    recipes = [_recipe(name, "Desserts") for name in ("Cake", "Pie", "Tart")]
+    paths = []
+    for age, recipe in zip((3, 2, 1), recipes):
+        include = cache.include(recipe)
+        path = tmp_path / include.split('"')[1].lstrip("/")
+        os.utime(path, (time.time() - 60 * age,) * 2)
+        paths.append(path)
+    # Using Cake again makes Pie the least recently used.
+    cache.include(recipes[0])
+
+    cache.prune()
+
+    assert [path.exists() for path in paths] == [True, False, True]
+    assert "#include" in cache.include(recipes[1])
+
+
+def test_cookbook_with_fragments_compiles_with_page_footers(tmp_path):
+    typst = pytest.importorskip("typst")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtPdf import QPdfDocument
+
+    QApplication.instance() or QApplication([])
+    recipes = [
+        _recipe("Cake", "Desserts"),
+        _recipe("Soup", "Soups", source="example.com"),
+    ]
+    cache = FragmentCache(tmp_path / "fragments", root=tmp_path)
+
+    pages = []
+    for fragment_cache in (None, cache):
+        source = TypstRenderer.render(
+            recipes, title="Book", fragment_cache=fragment_cache
+        )
+        (tmp_path / "main.typ").write_text(source, encoding="utf-8")
+        pdf_path = tmp_path / "main.pdf"
+        pdf_path.write_bytes(
+            typst.compile(str(tmp_path / "main.typ"), root=str(tmp_path))
+        )
+        document = QPdfDocument(None)
+        document.load(str(pdf_path))
+        pages.append(
+            [document.getAllText(i).text() for i in range(document.pageCount())]
+        )
+        document.close()
+
+    uncached, cached = pages
+    assert cached == uncached
+    # Title, contents, then Desserts, Cake, Soups and Soup numbered 1 to 4.
+    # Every page after the first recipe, dividers too, shows its number.
+    assert len(cached) == 6
+    for number, text in enumerate(cached[3:], start=2):
+        assert text.rstrip().endswith(f"{number} / 4")
+    assert "example.com" in cached[5]
+
+
+def test_render_to_writes_expected_single_recipe():
+    recipe = Recipe(
+        title="Toast",
+        metadata={"source": "example.com"},
+        components=[Component(steps=[Step("Toast 2-3 minutes.", ["1/2 loaf"])])],
+    )
+    stream = io.StringIO()
+    TypstRenderer.render_to(stream, [recipe])
+
+    expected = """\
+#set list(spacing: 0.65em)
+#set text(font: "Libertinus Serif", size: 11pt)
+#set page("us-letter", margin: (top: 0.75in, bottom: 1in, left: 0.75in, right: 0.75in))
+#set enum(spacing: 1.5em)
+
+#set page(footer: context [#text(8pt)[example.com] #h(1fr) #text(8pt, [#counter(page).display() / #counter(page).final().at(0)])])
+
+#heading(level: 1)[Toast]
+
+#v(1.5em)
+#line(length: 100%, stroke: 0.5pt)
+#v(1.5em)
+
+#grid(
+  columns: (2fr, 1fr),
+  gutter: 3em,
+  [
+    #enum.item(1)[Toast 2–3 minutes.]
+  ],
+  [
+    #if true {
+      block(
+        breakable: false,
+        list(
+          spacing: 1em,
+          [1⁄2 loaf]
+        )
+      )
+    }
+  ]
+)"""
+    assert stream.getvalue() == expected
+
+
+def test_render_to_writes_expected_cookbook(monkeypatch):
+    monkeypatch.setattr(
+        TypstRenderer,
+        "_render_recipe_body",
+        staticmethod(lambda recipe, level=1: f"BODY {recipe.title} {level}"),
+    )
+    monkeypatch.setattr(TypstRenderer, "_PAGE_NUMBER", "N")
+    recipes = [
+        _recipe("Soup", "Soups"),
+        _recipe("Cake", "Desserts", source="example.com"),
+        _recipe("Stew", "Soups"),
+    ]
+    stream = io.StringIO()
+    TypstRenderer.render_to(stream, recipes, title="Book")
+
+    expected = """\
+#v(5cm)
+
+#align(center)[#text(size: 22pt)[#heading(level: 1, outlined: false)[Book]]]
+
+#pagebreak()
+
+#align(center)[#heading(level: 1, outlined: false)[Contents]]
+
+#v(1cm)
+
+#outline(title: none, depth: 2)
+
+#pagebreak()
+
+#counter(page).update(1)
+
+#v(5cm)
+
+#align(center)[#heading(level: 1)[Desserts]]
+
+#pagebreak()
+
+#set page(footer: context [#text(8pt)[example.com] #h(1fr) N])
+
+BODY Cake 2
+
+#pagebreak()
+
+#v(5cm)
+
+#align(center)[#heading(level: 1)[Soups]]
+
+#pagebreak()
+
+#set page(footer: context [#h(1fr) N #h(1fr)])
+
+BODY Soup 2
+
+#pagebreak()
+
+#set page(footer: context [#h(1fr) N #h(1fr)])
+
+BODY Stew 2"""
+    body = stream.getvalue().split("\n\n", 1)[1]
+    assert body == expected
@@ -0,0 +1,29 @@
+from src.recipe_box.telemetry import AssistantCall, TelemetryLog
+
+
+def test_provider_stats_rank_fastest_first(tmp_path):
+    log = TelemetryLog(tmp_path / "telemetry.db", max_entries=5)
+    for request in (2.0, 4.0, 3.0):
+        log.record(AssistantCall("slow/model", request=request, prompt_tokens=100))
+    log.record(AssistantCall("fast/model", request=0.5, attempts=3))
+    log.record(AssistantCall("fast/model", cached=True))
+    log.record(AssistantCall("fast/model", request=9.0, error="timeout"))
+    log.record(
+        AssistantCall("slow/model", streamed=True, request=5.0, prompt_tokens=100)
+    )
+
+    # The two oldest calls were evicted.
+    assert len(log.calls()) == 5
+    fast, slow = log.provider_stats()
+    assert (fast.model, fast.calls, fast.cached, fast.errors) == (
+        "fast/model",
+        3,
+        1,
+        1,
+    )
+    assert fast.median_request == 0.5
+    assert fast.retries == 2
+    assert slow.median_request == 4.0
+    assert slow.mean_prompt_tokens == 100
+    assert (slow.streamed, fast.streamed) == (1, 0)
+    log.close()